@@ -7,6 +7,126 @@ class Settings(BaseSettings):
     ALLOWED_ORIGINS: str = "http://localhost:3000"
     ENV: str = "local"
 
+    # Connection pool profile per process role ("api", "scraper", "trainer").
+    # DB_POOL_ROLE selects the profile of the default engine for this process.
+    DB_POOL_ROLE: str = "api"
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_TIMEOUT_S: int = 30
+    DB_API_POOL_SIZE: int = 10
+    DB_API_MAX_OVERFLOW: int = 10
+    DB_API_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_SCRAPER_POOL_SIZE: int = 3
+    DB_SCRAPER_MAX_OVERFLOW: int = 2
+    DB_SCRAPER_STATEMENT_TIMEOUT_MS: int = 60000
+    DB_TRAINER_POOL_SIZE: int = 2
+    DB_TRAINER_MAX_OVERFLOW: int = 0
+    DB_TRAINER_STATEMENT_TIMEOUT_MS: int = 0  # 0 = no server-side timeout
+
+    # Google Places API key for scraping (optional; Selenium is used without it)
+    GOOGLE_MAPS_API_KEY: str = ""
+
+    # Region crawls: quadtree tiles are split while nearby searches hit the result cap
+    CRAWL_RESULT_CAP: int = 60
+    CRAWL_MAX_DEPTH: int = 6
+    CRAWL_MIN_TILE_M: float = 150.0
+
+    # Crawl frontier: worker threads, Places calls per rolling 24h, refresh
+    # interval (multiplied by region priority), claim lease and retry limit
+    CRAWL_WORKERS: int = 4
+    CRAWL_DAILY_API_BUDGET: int = 5000
+    CRAWL_REFRESH_HOURS: float = 24.0
+    CRAWL_LEASE_S: int = 900
+    CRAWL_MAX_ATTEMPTS: int = 5
+
+    # Incremental re-scraping: known businesses are only re-fetched for field
+    # groups older than these ages (days); ratings also refresh from search results
+    SCRAPE_INCREMENTAL: bool = True
+    FRESHNESS_RATINGS_DAYS: float = 7
+    FRESHNESS_HOURS_DAYS: float = 30
+    FRESHNESS_CONTACT_DAYS: float = 30
+    FRESHNESS_PROFILE_DAYS: float = 90
+
+    # Analysis records are persisted by a write-behind buffer; set
+    # ANALYSIS_WRITE_DURABLE to commit each row before the response returns.
+    ANALYSIS_WRITE_DURABLE: bool = False
+    ANALYSIS_WRITE_BATCH_SIZE: int = 50
+    ANALYSIS_WRITE_FLUSH_INTERVAL_S: float = 2.0
+    ANALYSIS_WRITE_QUEUE_SIZE: int = 1000
+    ANALYSIS_ID_BLOCK_SIZE: int = 100
+    # Failed background batches are retried, then kept in a bounded dead-letter log
+    ANALYSIS_WRITE_MAX_RETRIES: int = 3
+    ANALYSIS_DEAD_LETTER_SIZE: int = 1000
+
+    # Location score cache (quantized to grid cells of SCORE_CACHE_CELL_M meters)
+    SCORE_CACHE_CELL_M: float = 25.0
+    SCORE_CACHE_TTL_S: float = 600.0
+    SCORE_CACHE_MAX_ENTRIES: int = 10000
+
+    # Feature-vector memoization in FeatureEngineer (points rounded to ~1 m)
+    FEATURE_CACHE_SIZE: int = 5000
+    FEATURE_CACHE_PRECISION: int = 5
+    # Seconds between polls of the shared data-change log (writes from other processes)
+    DATA_EPOCH_POLL_S: float = 2.0
+
+    # Ring features read per-cell business rollups instead of scanning businesses
+    FEATURE_CELL_AGGREGATES: bool = True
+    CELL_AGGREGATE_SIZE_DEG: float = 0.001  # ~111 m north-south
+
+    # Gridded demographic layers (grid.npy + grid.json, see services/demographics.py)
+    DEMOGRAPHICS_DIR: str = "data/demographics"
+
+    # OSM environment layers (parks, transit stops, coastline, roads)
+    ENVIRONMENT_LAYERS_DIR: str = "data/environment"
+    ENVIRONMENT_MAX_DISTANCE_M: float = 5000.0
+
+    # Nearest-neighbor distance features from per-category KD-trees
+    FEATURE_KNN: bool = True
+    KNN_REBUILD_MIN_INTERVAL_S: float = 60.0
+    KNN_MAX_DISTANCE_M: float = 20000.0  # reported when a category has no businesses
+
+    # Precomputed feature vectors of existing businesses (see services/feature_store.py)
+    FEATURE_STORE_DIR: str = "data/feature_store"
+    FEATURE_STORE_TRAINING: bool = True
+
+    # Businesses per streamed chunk when building training sets
+    TRAINING_CHUNK_SIZE: int = 500
+
+    # Incremental (warm-start) training of gradient-boosted models
+    INCREMENTAL_MIN_SAMPLES: int = 20  # fewer changed businesses: keep the model as is
+    INCREMENTAL_MAX_NEW_FRACTION: float = 0.5  # more new data than this share: full retrain
+    INCREMENTAL_BOOST_ROUNDS: int = 50
+    TRAINING_DRIFT_THRESHOLD: float = 0.5  # mean standardized shift of feature means
+
+    # Score with exported tree arrays / native boosters instead of model.predict
+    COMPILED_INFERENCE: bool = True
+
+    # Standalone prediction server (prediction_server.py); empty runs models in-process.
+    # "http://127.0.0.1:8100" or "unix:///tmp/lokascore-predict.sock"
+    PREDICTION_SERVER_URL: str = ""
+    PREDICTION_SERVER_TIMEOUT_S: float = 30.0
+
+    # Concurrent scoring / sentiment requests are collected for up to
+    # MICRO_BATCH_MAX_WAIT_MS and run as one model call (in-process and in the server);
+    # up to MICRO_BATCH_MAX_CONCURRENCY batches run at once
+    MICRO_BATCHING: bool = True
+    MICRO_BATCH_MAX_SIZE: int = 32
+    MICRO_BATCH_MAX_WAIT_MS: float = 5.0
+    MICRO_BATCH_MAX_CONCURRENCY: int = 4
+
+    # Review sentiment model: bert | bert_int8 (dynamically quantized) | linear | lexicon
+    # (compare with scripts/benchmark_sentiment.py)
+    SENTIMENT_BACKEND: str = "bert"
+    SENTIMENT_BATCH_SIZE: int = 16  # reviews per transformer forward pass
+    SENTIMENT_LINEAR_MODEL_PATH: str = "models/sentiment_linear.joblib"
+
+    # Reviews are routed by detected language: tr -> SENTIMENT_BACKEND, en -> VADER,
+    # others -> SENTIMENT_MULTILINGUAL_MODEL (set "" to leave them unscored)
+    SENTIMENT_LANGUAGE_ROUTING: bool = True
+    SENTIMENT_MULTILINGUAL_MODEL: str = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+
+    # Unprocessed reviews scored per transaction when updating business sentiment aggregates
+    SENTIMENT_PROCESS_CHUNK_SIZE: int = 500
+
     @property
     def allowed_origins_list(self) -> List[str]:
         return [o.strip() for o in self.ALLOWED_ORIGINS.split(",") if o.strip()]
@@ -1,14 +1,74 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from geoalchemy2 import load_spatialite  # not used with PostGIS but keeps geo types available
-from typing import Generator
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, Generator
 from .config import settings
 
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+POOL_ROLES = ("api", "scraper", "trainer")
+
+@dataclass(frozen=True)
+class PoolProfile:
+    """Connection pool sizing and server-side limits for one process role"""
+    role: str
+    pool_size: int
+    max_overflow: int
+    statement_timeout_ms: int
+    pool_recycle: int
+    pool_timeout: int
+
+    @classmethod
+    def for_role(cls, role: str) -> "PoolProfile":
+        if role not in POOL_ROLES:
+            raise ValueError(f"Unknown pool role: {role} (expected one of {', '.join(POOL_ROLES)})")
+        prefix = f"DB_{role.upper()}"
+        return cls(
+            role=role,
+            pool_size=getattr(settings, f"{prefix}_POOL_SIZE"),
+            max_overflow=getattr(settings, f"{prefix}_MAX_OVERFLOW"),
+            statement_timeout_ms=getattr(settings, f"{prefix}_STATEMENT_TIMEOUT_MS"),
+            pool_recycle=settings.DB_POOL_RECYCLE_S,
+            pool_timeout=settings.DB_POOL_TIMEOUT_S,
+        )
+
+    def engine_kwargs(self) -> Dict:
+        kwargs = {
+            "pool_pre_ping": True,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_recycle": self.pool_recycle,
+            "pool_timeout": self.pool_timeout,
+        }
+        if self.statement_timeout_ms > 0:
+            # Enforced by PostgreSQL per statement, so a runaway query frees its connection
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={self.statement_timeout_ms}"}
+        return kwargs
+
+_engines: Dict[str, Engine] = {}
+_sessionmakers: Dict[str, sessionmaker] = {}
+
+def get_engine(role: str = settings.DB_POOL_ROLE) -> Engine:
+    """Engine with its own connection pool for the given role (created once per process)"""
+    if role not in _engines:
+        _engines[role] = create_engine(str(settings.DATABASE_URL), **PoolProfile.for_role(role).engine_kwargs())
+    return _engines[role]
+
+def get_sessionmaker(role: str = settings.DB_POOL_ROLE) -> sessionmaker:
+    if role not in _sessionmakers:
+        _sessionmakers[role] = sessionmaker(autocommit=False, autoflush=False, bind=get_engine(role))
+    return _sessionmakers[role]
+
+engine = get_engine()
+SessionLocal = get_sessionmaker()
+
+# Separate pools so scraping and training work can never exhaust the API pool
+ScraperSessionLocal = get_sessionmaker("scraper")
+TrainerSessionLocal = get_sessionmaker("trainer")
 
 def get_db() -> Generator:
     db = SessionLocal()
@@ -18,8 +78,65 @@ def get_db() -> Generator:
         db.close()
 
 
+def _async_database_url(url) -> str:
+    """Point the configured URL at psycopg 3, which serves both sync and async engines"""
+    url = make_url(str(url))
+    if url.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+psycopg")
+    return url.render_as_string(hide_password=False)
+
+# Async engine for read-heavy `async def` routes so DB I/O does not block the event loop
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    **PoolProfile.for_role(settings.DB_POOL_ROLE).engine_kwargs()
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _pool_stats(pool, profile: PoolProfile) -> Dict:
+    return {
+        "pool_size": profile.pool_size,
+        "max_overflow": profile.max_overflow,
+        "statement_timeout_ms": profile.statement_timeout_ms,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+def pool_metrics() -> Dict[str, Dict]:
+    """Current connection usage of every pool created in this process"""
+    metrics = {
+        f"sync:{role}": _pool_stats(eng.pool, PoolProfile.for_role(role))
+        for role, eng in _engines.items()
+    }
+    metrics[f"async:{settings.DB_POOL_ROLE}"] = _pool_stats(
+        async_engine.sync_engine.pool, PoolProfile.for_role(settings.DB_POOL_ROLE)
+    )
+    return metrics
+
+
 def ensure_postgis_and_schema():
     with engine.connect() as conn:
         # Enable PostGIS extension (safe if already exists)
         conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis;"))
         conn.commit()
+
+
+# Columns added to existing tables after their first release; create_all only
+# creates missing tables, so these are applied idempotently at startup.
+SCHEMA_UPGRADES = (
+    ("ml_models", "feature_schema_version", "INTEGER"),
+    ("ml_models", "feature_stats", "JSON"),
+    ("ml_models", "parent_model_id", "INTEGER REFERENCES ml_models(id)"),
+    ("ml_models", "training_mode", "VARCHAR(20)"),
+    ("businesses", "field_scraped_at", "JSON"),
+)
+
+def ensure_schema_upgrades():
+    with engine.begin() as conn:
+        for table, column, ddl in SCHEMA_UPGRADES:
+            conn.execute(text(f"ALTER TABLE IF EXISTS {table} ADD COLUMN IF NOT EXISTS {column} {ddl}"))
@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config import settings
-from db import Base, engine, ensure_postgis_and_schema
+from db import Base, engine, async_engine, ensure_postgis_and_schema, ensure_schema_upgrades, pool_metrics
 import models  # noqa: F401  # ensure models are imported for metadata
+from services.analysis_writer import analysis_writer
+from services.cell_aggregates import ensure_cell_aggregates
+from services.prediction_client import prediction_client
+from services.batched_inference import score_batcher, sentiment_batcher
 from routers import analyze, scraping, ml_analysis, regions
 
 app = FastAPI(
@@ -26,6 +30,18 @@ app.add_middleware(
 def on_startup():
     ensure_postgis_and_schema()
     Base.metadata.create_all(bind=engine)
+    ensure_schema_upgrades()
+    ensure_cell_aggregates()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await score_batcher.close()
+    await sentiment_batcher.close()
+    analysis_writer.close()
+    if prediction_client is not None:
+        await prediction_client.close()
+    await async_engine.dispose()
 
 
 @app.get("/health")
@@ -43,6 +59,11 @@ def health():
         ]
     }
 
+@app.get("/health/db")
+def health_db():
+    """Connection pool usage per process role"""
+    return {"pools": pool_metrics()}
+
 @app.get("/")
 def root():
     return {
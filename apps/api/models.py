@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Float, DateTime, Text, Boolean, 
-    JSON, ForeignKey, Index, UniqueConstraint
+    JSON, ForeignKey, Index, UniqueConstraint, BigInteger
 )
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -107,6 +107,7 @@ class Business(Base):
     # Scraping Metadata
     source = Column(String(64), default="google_maps")
     last_scraped = Column(DateTime(timezone=True))
+    field_scraped_at = Column(JSON)  # {"ratings": iso timestamp, "hours": ...}, see services/freshness.py
     scraping_attempts = Column(Integer, default=0)
     data_completeness = Column(Float, default=0.0)  # 0-1 score
     
@@ -123,6 +124,21 @@ class Business(Base):
     photos = relationship("BusinessPhoto", back_populates="business", cascade="all, delete-orphan")
     environmental_features = relationship("EnvironmentalFeature", back_populates="business")
 
+class BusinessCellAggregate(Base):
+    """Per grid cell × business type rollups of active businesses (maintained by a DB trigger)"""
+    __tablename__ = "business_cell_aggregates"
+    
+    # Cell index on a fixed lat/lng grid: floor(lng / size), floor(lat / size)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    business_type = Column(Enum(BusinessType), primary_key=True)
+    
+    business_count = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)  # businesses with a rating
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    review_count_n = Column(Integer, nullable=False, default=0)  # businesses with a review_count
+    review_count_sum = Column(Integer, nullable=False, default=0)
+
 class BusinessReview(Base):
     """Google Reviews data for sentiment analysis"""
     __tablename__ = "business_reviews"
@@ -154,6 +170,21 @@ class BusinessReview(Base):
     # Relationships
     business = relationship("Business", back_populates="reviews")
 
+class BusinessSentimentAggregate(Base):
+    """Running review sentiment totals per business (updated as reviews are processed)"""
+    __tablename__ = "business_sentiment_aggregates"
+    
+    business_id = Column(Integer, ForeignKey("businesses.id", ondelete="CASCADE"), primary_key=True)
+    
+    review_count = Column(Integer, nullable=False, default=0)  # processed reviews with text
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    positive_count = Column(Integer, nullable=False, default=0)
+    negative_count = Column(Integer, nullable=False, default=0)
+    neutral_count = Column(Integer, nullable=False, default=0)
+    topic_counts = Column(JSON, nullable=False, default=dict)  # {"service": 12, ...}
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class BusinessPhoto(Base):
     """Photos from Google Maps for visual analysis"""
     __tablename__ = "business_photos"
@@ -253,6 +284,61 @@ class ScrapingJob(Base):
     # Relationships
     region = relationship("Region", back_populates="scraping_jobs")
 
+class DataChange(Base):
+    """Log of business data changes, polled by every process to advance its data epoch (services/data_epoch.py)"""
+    __tablename__ = "data_changes"
+    
+    id = Column(BigInteger, primary_key=True)
+    lat = Column(Float)  # changed business location, when known
+    lng = Column(Float)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class CrawlWorkUnit(Base):
+    """One (region, tile, query) entry of the persistent crawl frontier"""
+    __tablename__ = "crawl_work_units"
+    __table_args__ = (
+        UniqueConstraint("region_id", "query", "depth", "south", "west", name="uq_crawl_unit_tile"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    region_id = Column(Integer, ForeignKey("regions.id", ondelete="CASCADE"), nullable=False, index=True)
+    query = Column(String(255), nullable=False)
+    
+    # Tile bounds (degrees) and quadtree depth
+    south = Column(Float, nullable=False)
+    west = Column(Float, nullable=False)
+    north = Column(Float, nullable=False)
+    east = Column(Float, nullable=False)
+    depth = Column(Integer, nullable=False, default=0)
+    
+    # "pending", "running", "done", "split" (replaced by its children), "failed"
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    claimed_at = Column(DateTime(timezone=True))
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    
+    # Crawl history used for scheduling
+    last_crawled_at = Column(DateTime(timezone=True))
+    next_due_at = Column(DateTime(timezone=True), index=True)
+    last_result_count = Column(Integer)
+    last_new_places = Column(Integer)
+    last_api_calls = Column(Integer, nullable=False, default=0)
+    yield_estimate = Column(Float)  # smoothed new places per API call
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class CrawlApiUsage(Base):
+    """Append-only ledger of Places API calls spent by crawl work units (daily budget)"""
+    __tablename__ = "crawl_api_usage"
+    
+    id = Column(BigInteger, primary_key=True)
+    unit_id = Column(Integer, ForeignKey("crawl_work_units.id", ondelete="SET NULL"), nullable=True)
+    region_id = Column(Integer, ForeignKey("regions.id", ondelete="CASCADE"), nullable=True)
+    api_calls = Column(Integer, nullable=False)
+    succeeded = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
 class MLModel(Base):
     """ML models for location scoring and prediction"""
     __tablename__ = "ml_models"
@@ -280,6 +366,10 @@ class MLModel(Base):
     # Model Files
     model_file_path = Column(String(500))
     feature_names = Column(JSON)
+    feature_schema_version = Column(Integer)  # declared feature schema the model was trained on
+    feature_stats = Column(JSON)  # per-feature mean/std/median/min/max of the training set
+    parent_model_id = Column(Integer, ForeignKey("ml_models.id"), nullable=True)  # warm-start lineage
+    training_mode = Column(String(20))  # "full" or "incremental"
     feature_importance = Column(JSON)
     
     # Status
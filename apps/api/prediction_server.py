@@ -0,0 +1,76 @@
+"""
+LOKASCORE prediction server
+
+Owns the location scoring models and the sentiment pipeline in one process so
+API workers stay lightweight. Concurrent requests are micro-batched into one
+model call. Point the API at it with PREDICTION_SERVER_URL.
+
+Run (from apps/api):
+    uvicorn prediction_server:app --host 127.0.0.1 --port 8100
+    uvicorn prediction_server:app --uds /tmp/lokascore-predict.sock
+"""
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from models import BusinessType
+from services.analysis_writer import analysis_writer
+from services.batched_inference import score_batcher, score_location, sentiment_batcher
+from services.ml_pipeline import scoring_model
+
+app = FastAPI(
+    title="LOKASCORE Prediction Server",
+    version="2.0.0",
+    docs_url="/docs",
+    redoc_url=None
+)
+
+class ScoreRequest(BaseModel):
+    lat: float
+    lng: float
+    business_type: str
+    radius: int = 500
+
+def _jsonable(value):
+    """Plain Python types for results holding numpy scalars"""
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await score_batcher.close()
+    await sentiment_batcher.close()
+    analysis_writer.close()
+
+
+@app.post("/score")
+async def score(request: ScoreRequest):
+    try:
+        BusinessType(request.business_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid business type: {request.business_type}")
+
+    result = await score_location(request.lat, request.lng, request.business_type, request.radius)
+    return _jsonable(result)
+
+@app.post("/sentiment/{business_id}")
+async def sentiment(business_id: int):
+    result = await sentiment_batcher.submit(business_id)
+    return _jsonable(result)
+
+@app.get("/health")
+def health():
+    return {
+        "status": "healthy",
+        "service": "LOKASCORE prediction server",
+        "loaded_models": sorted(scoring_model.models),
+        "batching": {
+            "score": score_batcher.stats(),
+            "sentiment": sentiment_batcher.stats()
+        }
+    }
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy import text
-from sqlalchemy.orm import Session
-from ..db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+from ..db import get_async_db
 
 router = APIRouter(prefix="/analyze", tags=["analyze"])
 
+MAX_MATRIX_RINGS = 10
+MAX_MATRIX_CATEGORIES = 20
+MAX_MATRIX_RADIUS = 5000  # meters
+
 class BasicAnalyzeResponse(BaseModel):
     competitors_250m: int
     competitors_500m: int
@@ -13,43 +18,63 @@ class BasicAnalyzeResponse(BaseModel):
     nearby_parks: int
     summary: str
 
-@router.get("/basic", response_model=BasicAnalyzeResponse)
-def analyze_basic(
-    lat: float = Query(..., description="Latitude"),
-    lng: float = Query(..., description="Longitude"),
-    radius: int = Query(500, description="Radius meters for main analysis"),
-    type: str = Query("cafe", description="Business type to analyze"),
-    db: Session = Depends(get_db),
-):
-    # Use geography for accurate meter-based buffers
+class RingCategoryMatrixResponse(BaseModel):
+    rings: List[int]
+    categories: List[str]
+    counts: Dict[str, Dict[str, int]]  # {"250": {"cafe": 3, "school": 1}, ...}
+
+async def _count_ring_category_matrix(
+    db: AsyncSession, lat: float, lng: float, rings: List[int], categories: List[str]
+) -> Dict[int, Dict[str, int]]:
+    """
+    Count places per (ring, category) in a single spatial pass.
+
+    Places inside the largest ring are fetched once with their distance to the
+    point; every ring is then a cheap `distance <= radius` join on that set.
+    """
     sql = text(
         """
         WITH point AS (
-            SELECT ST_SetSRID(ST_MakePoint(:lng, :lat), 4326) AS geom
+            SELECT ST_Transform(ST_SetSRID(ST_MakePoint(:lng, :lat), 4326), 3857) AS g
         ),
-        buf250 AS (
-            SELECT ST_Buffer(ST_Transform(geom, 3857), 250) AS g FROM point
-        ),
-        buf500 AS (
-            SELECT ST_Buffer(ST_Transform(geom, 3857), 500) AS g FROM point
+        nearby AS (
+            SELECT p.category, ST_Distance(ST_Transform(p.geom, 3857), pt.g) AS d
+            FROM places p, point pt
+            WHERE p.category = ANY(:categories)
+            AND ST_DWithin(ST_Transform(p.geom, 3857), pt.g, :max_radius)
         )
-        SELECT
-            -- competitors in 250m
-            (SELECT COUNT(*) FROM places p, buf250 b
-             WHERE p.category = :type AND ST_Intersects(ST_Transform(p.geom, 3857), b.g)) AS comp_250,
-            -- competitors in 500m
-            (SELECT COUNT(*) FROM places p, buf500 b
-             WHERE p.category = :type AND ST_Intersects(ST_Transform(p.geom, 3857), b.g)) AS comp_500,
-            -- schools in 500m
-            (SELECT COUNT(*) FROM places p, buf500 b
-             WHERE p.category = 'school' AND ST_Intersects(ST_Transform(p.geom, 3857), b.g)) AS school_cnt,
-            -- parks in 500m
-            (SELECT COUNT(*) FROM places p, buf500 b
-             WHERE p.category = 'park' AND ST_Intersects(ST_Transform(p.geom, 3857), b.g)) AS park_cnt;
+        SELECT r.radius, n.category, COUNT(*) AS cnt
+        FROM nearby n
+        JOIN unnest(CAST(:rings AS integer[])) AS r(radius) ON n.d <= r.radius
+        GROUP BY r.radius, n.category;
         """
     )
-    row = db.execute(sql, {"lat": lat, "lng": lng, "type": type}).one()
-    comp250, comp500, schools, parks = row
+    result = await db.execute(sql, {
+        "lat": lat,
+        "lng": lng,
+        "categories": categories,
+        "rings": rings,
+        "max_radius": max(rings),
+    })
+    rows = result.fetchall()
+
+    # Fill the full matrix so absent combinations are explicit zeros
+    matrix = {r: {c: 0 for c in categories} for r in rings}
+    for radius, category, cnt in rows:
+        matrix[radius][category] = cnt
+    return matrix
+
+@router.get("/basic", response_model=BasicAnalyzeResponse)
+async def analyze_basic(
+    lat: float = Query(..., description="Latitude"),
+    lng: float = Query(..., description="Longitude"),
+    radius: int = Query(500, description="Radius meters for main analysis"),
+    type: str = Query("cafe", description="Business type to analyze"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    matrix = await _count_ring_category_matrix(db, lat, lng, [250, 500], [type, "school", "park"])
+    comp250 = matrix[250][type]
+    comp500, schools, parks = matrix[500][type], matrix[500]["school"], matrix[500]["park"]
     summary = f"Bu alanda {comp500} {type}, {schools} okul, {parks} park bulunmaktadır."
     return BasicAnalyzeResponse(
         competitors_250m=comp250,
@@ -58,3 +83,39 @@ def analyze_basic(
         nearby_parks=parks,
         summary=summary,
     )
+
+@router.get("/matrix", response_model=RingCategoryMatrixResponse)
+async def analyze_ring_category_matrix(
+    lat: float = Query(..., description="Latitude"),
+    lng: float = Query(..., description="Longitude"),
+    rings: List[int] = Query([250, 500], description="Ring radii in meters"),
+    categories: List[str] = Query(["cafe", "school", "park"], description="Place categories to count"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Count places for every ring × category combination in one call.
+
+    Example: /analyze/matrix?lat=36.8851&lng=30.7056&rings=250&rings=500&categories=cafe&categories=school
+    """
+    rings = sorted(set(rings))
+    categories = list(dict.fromkeys(categories))
+
+    if not rings or not categories:
+        raise HTTPException(status_code=400, detail="At least one ring and one category are required")
+    if len(rings) > MAX_MATRIX_RINGS or len(categories) > MAX_MATRIX_CATEGORIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_MATRIX_RINGS} rings and {MAX_MATRIX_CATEGORIES} categories are allowed"
+        )
+    if rings[0] <= 0 or rings[-1] > MAX_MATRIX_RADIUS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ring radii must be between 1 and {MAX_MATRIX_RADIUS} meters"
+        )
+
+    matrix = await _count_ring_category_matrix(db, lat, lng, rings, categories)
+    return RingCategoryMatrixResponse(
+        rings=rings,
+        categories=categories,
+        counts={str(r): counts for r, counts in matrix.items()},
+    )
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
-from ..db import get_db
+from ..config import settings
+from ..db import get_db, get_async_db
 from ..models import Analysis, MLModel, Business, BusinessReview, BusinessType
 from ..services.ml_pipeline import scoring_model, sentiment_analyzer, feature_engineer
+from ..services.feature_store import feature_store
+from ..services.prediction_client import prediction_client
+from ..services.batched_inference import score_batcher, score_location, sentiment_batcher
 
 router = APIRouter(prefix="/ml", tags=["AI & Machine Learning"])
 
@@ -30,6 +37,7 @@ class ModelTrainingRequest(BaseModel):
     business_type: str
     region_id: Optional[int] = None
     model_name: Optional[str] = None
+    mode: str = "auto"  # "auto": warm-start the active model when possible, "full": retrain
 
 class ModelTrainingResponse(BaseModel):
     success: bool
@@ -49,10 +57,7 @@ class SentimentAnalysisResponse(BaseModel):
     sentiment_score: float
 
 @router.post("/analyze-location", response_model=LocationAnalysisResponse)
-async def analyze_location_with_ai(
-    request: LocationAnalysisRequest,
-    db: Session = Depends(get_db)
-):
+async def analyze_location_with_ai(request: LocationAnalysisRequest):
     """
     🤖 AI-powered location analysis
     
@@ -72,12 +77,25 @@ async def analyze_location_with_ai(
                 detail=f"Invalid business type: {request.business_type}"
             )
         
-        # Run AI analysis
-        result = scoring_model.predict_location_score(
-            lat=request.lat,
-            lng=request.lng,
-            business_type=request.business_type
-        )
+        if prediction_client is not None:
+            # Models live in the shared prediction server
+            result = await prediction_client.score_location(
+                request.lat, request.lng, request.business_type, request.radius
+            )
+        elif settings.MICRO_BATCHING:
+            # Scored together with concurrent requests in one model call
+            result = await score_location(
+                request.lat, request.lng, request.business_type, request.radius
+            )
+        else:
+            # Run AI analysis off the event loop (feature queries and inference are blocking)
+            result = await run_in_threadpool(
+                scoring_model.predict_location_score,
+                lat=request.lat,
+                lng=request.lng,
+                business_type=request.business_type,
+                radius=request.radius
+            )
         
         processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
         
@@ -117,6 +135,9 @@ async def train_location_model(
                 detail=f"Invalid business type: {request.business_type}"
             )
         
+        if request.mode not in ("auto", "full"):
+            raise HTTPException(status_code=400, detail=f"Invalid training mode: {request.mode}")
+        
         # Check if we have enough data
         business_count = db.query(Business).filter(
             Business.business_type == business_type_enum,
@@ -134,7 +155,8 @@ async def train_location_model(
         background_tasks.add_task(
             _train_model_background, 
             request.business_type, 
-            request.region_id
+            request.region_id,
+            request.mode
         )
         
         return ModelTrainingResponse(
@@ -160,19 +182,19 @@ async def train_location_model(
         )
 
 @router.get("/models", response_model=List[Dict])
-def get_trained_models(
+async def get_trained_models(
     business_type: Optional[str] = Query(None),
     is_active: bool = Query(True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get list of trained ML models"""
     
-    query = db.query(MLModel).filter(MLModel.is_active == is_active)
+    query = select(MLModel).where(MLModel.is_active == is_active)
     
     if business_type:
-        query = query.filter(MLModel.name.contains(business_type))
+        query = query.where(MLModel.name.contains(business_type))
     
-    models = query.order_by(MLModel.created_at.desc()).all()
+    models = (await db.scalars(query.order_by(MLModel.created_at.desc()))).all()
     
     return [
         {
@@ -185,6 +207,8 @@ def get_trained_models(
             "training_data_size": model.training_data_size,
             "feature_count": model.feature_count,
             "is_production": model.is_production,
+            "training_mode": model.training_mode,
+            "parent_model_id": model.parent_model_id,
             "trained_at": model.trained_at,
             "performance_metrics": {
                 "accuracy": model.accuracy,
@@ -198,7 +222,8 @@ def get_trained_models(
 @router.post("/analyze-sentiment/{business_id}", response_model=SentimentAnalysisResponse)
 async def analyze_business_sentiment(
     business_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    async_db: AsyncSession = Depends(get_async_db)
 ):
     """
     😊 Analyze business review sentiments with AI
@@ -208,14 +233,14 @@ async def analyze_business_sentiment(
     """
     
     # Check if business exists
-    business = db.query(Business).filter(Business.id == business_id).first()
+    business = await async_db.get(Business, business_id)
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
     
     # Check if business has reviews
-    review_count = db.query(BusinessReview).filter(
-        BusinessReview.business_id == business_id
-    ).count()
+    review_count = await async_db.scalar(
+        select(func.count(BusinessReview.id)).where(BusinessReview.business_id == business_id)
+    )
     
     if review_count == 0:
         raise HTTPException(
@@ -225,7 +250,12 @@ async def analyze_business_sentiment(
     
     try:
         # Perform sentiment analysis
-        result = sentiment_analyzer.analyze_business_reviews(business_id, db)
+        if prediction_client is not None:
+            result = await prediction_client.analyze_sentiment(business_id)
+        elif settings.MICRO_BATCHING:
+            result = await sentiment_batcher.submit(business_id)
+        else:
+            result = await run_in_threadpool(sentiment_analyzer.analyze_business_reviews, business_id, db)
         
         return SentimentAnalysisResponse(
             business_id=business_id,
@@ -306,27 +336,83 @@ def get_location_features(
             detail=f"Feature generation failed: {str(e)}"
         )
 
+@router.post("/feature-store/refresh")
+async def refresh_feature_store(
+    background_tasks: BackgroundTasks,
+    business_types: Optional[List[str]] = Query(None, description="Business types to refresh (default: all)"),
+    full: bool = Query(False, description="Recompute every business instead of only changed neighbourhoods")
+):
+    """
+    🗄️ Refresh precomputed feature vectors of existing businesses
+    
+    Incremental by default: only businesses near rows changed since the last
+    build are recomputed. Intended to be called on a schedule.
+    """
+    types = business_types or [bt.value for bt in BusinessType]
+    for bt in types:
+        try:
+            BusinessType(bt)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid business type: {bt}")
+    
+    background_tasks.add_task(_refresh_feature_store_background, types, full)
+    return {"status": "started", "business_types": types, "mode": "full" if full else "incremental"}
+
+@router.get("/feature-store", response_model=Dict[str, Any])
+def get_feature_store_status():
+    """Build info of the stored feature vectors per business type"""
+    status = {}
+    for bt in BusinessType:
+        stored = feature_store.load(bt.value)
+        if stored is not None:
+            status[bt.value] = {k: v for k, v in stored.manifest.items() if k != 'columns'}
+    return {"business_types": status}
+
+@router.post("/process-reviews")
+async def process_reviews(
+    background_tasks: BackgroundTasks,
+    limit: Optional[int] = Query(None, ge=1, description="Process at most this many reviews")
+):
+    """
+    💬 Score unprocessed reviews and update business sentiment aggregates
+    
+    Intended to run after scraping so sentiment summaries and region rollups
+    are served from the stored aggregates.
+    """
+    background_tasks.add_task(_process_reviews_background, limit)
+    return {"status": "started", "limit": limit}
+
+@router.get("/batching", response_model=Dict[str, Any])
+async def get_batching_stats():
+    """Micro-batching statistics of in-process scoring and sentiment inference"""
+    return {
+        "enabled": settings.MICRO_BATCHING,
+        "prediction_server": prediction_client is not None,
+        "score": score_batcher.stats(),
+        "sentiment": sentiment_batcher.stats()
+    }
+
 @router.get("/analyses", response_model=List[Dict])
-def get_recent_analyses(
+async def get_recent_analyses(
     business_type: Optional[str] = Query(None),
     limit: int = Query(20, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get recent AI analyses"""
     
-    query = db.query(Analysis).order_by(Analysis.created_at.desc())
+    query = select(Analysis).order_by(Analysis.created_at.desc())
     
     if business_type:
         try:
             business_type_enum = BusinessType(business_type)
-            query = query.filter(Analysis.business_type == business_type_enum)
+            query = query.where(Analysis.business_type == business_type_enum)
         except ValueError:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Invalid business type: {business_type}"
             )
     
-    analyses = query.limit(limit).all()
+    analyses = (await db.scalars(query.limit(limit))).all()
     
     return [
         {
@@ -349,10 +435,10 @@ def get_recent_analyses(
     ]
 
 @router.get("/analysis/{analysis_id}", response_model=Dict)
-def get_analysis_detail(analysis_id: int, db: Session = Depends(get_db)):
+async def get_analysis_detail(analysis_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get detailed analysis results"""
     
-    analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+    analysis = await db.get(Analysis, analysis_id)
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
     
@@ -388,11 +474,31 @@ def get_analysis_detail(analysis_id: int, db: Session = Depends(get_db)):
         }
     }
 
-async def _train_model_background(business_type: str, region_id: Optional[int]):
+async def _train_model_background(business_type: str, region_id: Optional[int], mode: str = "auto"):
     """Background task for model training"""
     try:
-        result = scoring_model.train_model(business_type, region_id)
+        result = scoring_model.train_model(business_type, region_id, mode=mode)
         # In production, you might want to send notifications or update job status
         print(f"Model training completed for {business_type}: {result}")
     except Exception as e:
-        print(f"Model training failed for {business_type}: {e}")
\ No newline at end of file
+        print(f"Model training failed for {business_type}: {e}")
+
+def _refresh_feature_store_background(business_types: List[str], full: bool):
+    """Background task for feature store refresh"""
+    for bt in business_types:
+        try:
+            if full:
+                result = feature_store.rebuild(bt, feature_engineer)
+            else:
+                result = feature_store.refresh(bt, feature_engineer)
+            print(f"Feature store refreshed for {bt}: {result}")
+        except Exception as e:
+            print(f"Feature store refresh failed for {bt}: {e}")
+
+def _process_reviews_background(limit: Optional[int]):
+    """Background task for review sentiment processing"""
+    try:
+        processed = sentiment_analyzer.process_pending_reviews(limit=limit)
+        print(f"Review sentiment processed: {processed} reviews")
+    except Exception as e:
+        print(f"Review sentiment processing failed: {e}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -6,9 +6,10 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 import json
 
-from ..db import get_db
+from ..db import get_db, ScraperSessionLocal
 from ..models import Region, Business, ScrapingJob, JobStatus
-from ..services.google_scraper import scraper
+from ..services import orchestrator, crawl_scheduler
+from ..services.sentiment_aggregates import sentiment_rollup
 
 router = APIRouter(prefix="/regions", tags=["Region Management"])
 
@@ -58,6 +59,9 @@ class RegionDataCollectionRequest(BaseModel):
     max_reviews_per_business: int = Field(default=50, ge=5, le=200)
     scrape_environmental_data: bool = Field(default=True)
 
+class CrawlFrontierSeedRequest(BaseModel):
+    search_queries: List[str] = Field(..., min_length=1, description="Queries crawled over the region's tiles")
+
 class DataCollectionResponse(BaseModel):
     job_id: int
     region_id: int
@@ -259,7 +263,7 @@ async def start_region_data_collection(
         background_tasks.add_task(
             _collect_region_data_background,
             job.id,
-            region,
+            region.id,
             request
         )
         
@@ -356,6 +360,74 @@ def get_region_statistics(region_id: int, db: Session = Depends(get_db)):
         last_updated=region.updated_at
     )
 
+@router.get("/sentiment/nearby", response_model=Dict[str, Any])
+def get_nearby_sentiment(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(1000, gt=0, le=20000, description="Radius in meters"),
+    db: Session = Depends(get_db)
+):
+    """
+    😊 Review sentiment of all businesses within a radius
+    
+    Same breakdown as the region endpoint: overall summary, per business type
+    summaries and topic counts.
+    """
+    return {
+        "scope": {"lat": lat, "lng": lng, "radius": radius},
+        **sentiment_rollup(db, lat=lat, lng=lng, radius=radius)
+    }
+
+@router.get("/{region_id}/sentiment", response_model=Dict[str, Any])
+def get_region_sentiment(region_id: int, db: Session = Depends(get_db)):
+    """
+    😊 Review sentiment across a region
+    
+    Rolls up the stored per-business sentiment aggregates: average sentiment,
+    label distribution, 0-10 sentiment score and top topics, overall and per
+    business type. Reviews are included once processed (POST /ml/process-reviews).
+    """
+    region = db.query(Region).filter(Region.id == region_id).first()
+    if not region:
+        raise HTTPException(status_code=404, detail="Region not found")
+    
+    return {
+        "scope": {"region_id": region_id, "region_name": region.name},
+        **sentiment_rollup(db, region_id=region_id)
+    }
+
+@router.post("/{region_id}/crawl-frontier", response_model=Dict[str, Any])
+def seed_crawl_frontier(region_id: int, request: CrawlFrontierSeedRequest, db: Session = Depends(get_db)):
+    """
+    🗺️ Add a region to the crawl frontier
+    
+    Creates a (tile, query) work unit per root tile and query. Units are crawled
+    by the crawl scheduler (scripts/run_crawl_scheduler.py) in priority order;
+    existing units of the region are kept.
+    """
+    region = db.query(Region).filter(Region.id == region_id).first()
+    if not region:
+        raise HTTPException(status_code=404, detail="Region not found")
+    
+    created = crawl_scheduler.seed_region(region_id, request.search_queries)
+    return {"region_id": region_id, "units_created": created}
+
+@router.get("/crawl-frontier", response_model=Dict[str, Any])
+def get_crawl_frontier():
+    """
+    🗺️ Crawl frontier status per region and API calls used in the last 24 hours
+    """
+    db = ScraperSessionLocal()
+    try:
+        api_calls = crawl_scheduler.api_calls_last_24h(db)
+    finally:
+        db.close()
+    return {
+        "api_calls_last_24h": api_calls,
+        "daily_api_budget": crawl_scheduler.daily_api_budget,
+        "regions": crawl_scheduler.frontier_status()
+    }
+
 @router.get("/{region_id}/businesses")
 def get_region_businesses(
     region_id: int,
@@ -505,26 +577,31 @@ async def setup_kaleici_pilot_project(
 
 async def _collect_region_data_background(
     job_id: int,
-    region: Region,
+    region_id: int,
     config: RegionDataCollectionRequest
 ):
     """Background task for comprehensive region data collection"""
     
+    # The request session is closed by now; load the region in a scraper session
+    db = ScraperSessionLocal()
     try:
+        region = db.query(Region).filter(Region.id == region_id).first()
         print(f"Starting region data collection for {region.name} (Job ID: {job_id})")
         
-        # This would call the Google scraper service
-        result = await scraper.scrape_region_comprehensive(
+        result = await orchestrator.scrape_region_comprehensive(
             region=region,
             business_types=config.business_types,
             search_queries=config.search_queries,
             max_businesses=config.max_businesses,
             include_reviews=config.include_reviews,
             max_reviews_per_business=config.max_reviews_per_business,
-            scrape_environmental_data=config.scrape_environmental_data
+            scrape_environmental_data=config.scrape_environmental_data,
+            db=db
         )
         
-        print(f"Region data collection completed for {region.name}: {result}")
+        print(f"Region data collection completed for {region.name}: {result['crawl_stats']}, {result['ingest_stats']}")
         
     except Exception as e:
-        print(f"Region data collection failed for {region.name}: {e}")
\ No newline at end of file
+        print(f"Region data collection failed for region {region_id}: {e}")
+    finally:
+        db.close()
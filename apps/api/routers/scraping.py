@@ -4,9 +4,10 @@ from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from datetime import datetime
 
-from ..db import get_db
+from ..db import get_db, ScraperSessionLocal
 from ..models import ScrapingJob, Region, Business, ScrapingStatus, BusinessType
 from ..services.google_scraper import ScrapingOrchestrator, ScrapingConfig, GoogleMapsScraper
+from ..services.data_epoch import mark_business_changed
 
 router = APIRouter(prefix="/scraping", tags=["Data Collection"])
 
@@ -431,7 +432,7 @@ async def scrape_comprehensive_business_data(
 
 async def _save_comprehensive_business_data(business_data, sentiment_results: Optional[Dict]):
     """Background task to save comprehensive business data"""
-    db = SessionLocal()
+    db = ScraperSessionLocal()
     try:
         # Check if business already exists
         existing = db.query(Business).filter(
@@ -446,6 +447,7 @@ async def _save_comprehensive_business_data(business_data, sentiment_results: Op
             existing.rating = business_data.rating
             existing.review_count = business_data.review_count
             db.commit()
+            mark_business_changed(business_data.latitude, business_data.longitude)
             return
         
         # Create new business record with comprehensive data
@@ -479,6 +481,8 @@ async def _save_comprehensive_business_data(business_data, sentiment_results: Op
         db.commit()
         db.refresh(business)
         
+        mark_business_changed(business_data.latitude, business_data.longitude)
+        
         # Save reviews
         if business_data.most_recent_reviews:
             for review_data in business_data.most_recent_reviews[:50]:  # Limit to 50 reviews
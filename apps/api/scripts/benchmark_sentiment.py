@@ -0,0 +1,101 @@
+"""
+Compare sentiment backends on a labeled local review sample: accuracy vs throughput.
+
+Usage (from the repository root):
+    python -m apps.api.scripts.benchmark_sentiment data/labeled_reviews.csv \
+        [--backends bert,bert_int8,linear,lexicon] [--fit-linear] [--limit 2000]
+
+The CSV needs `text` and `label` columns; labels are positive/negative/neutral
+(or 1/-1/0). With --fit-linear the linear model is trained on 80% of the sample,
+saved to SENTIMENT_LINEAR_MODEL_PATH, and every backend is scored on the
+remaining 20%.
+"""
+import argparse
+import csv
+import logging
+import time
+
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+from ..config import settings
+from ..services.ml_pipeline import SentimentAnalyzer
+from ..services.sentiment_backends import SENTIMENT_BACKENDS, LinearSentiment
+
+LABELS = {'positive': 1, 'pos': 1, '1': 1, 'negative': -1, 'neg': -1, '-1': -1, 'neutral': 0, 'neu': 0, '0': 0}
+
+def load_sample(path: str, limit: int = 0):
+    texts, labels = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            label = LABELS.get(str(row['label']).strip().lower())
+            if label is None or not row['text'].strip():
+                continue
+            texts.append(row['text'])
+            labels.append(label)
+            if limit and len(texts) >= limit:
+                break
+    return texts, labels
+
+def to_label(compound: float) -> int:
+    # Same neutral band as the business sentiment distribution
+    if compound > 0.1:
+        return 1
+    if compound < -0.1:
+        return -1
+    return 0
+
+def benchmark(name: str, texts, labels):
+    started = time.perf_counter()
+    analyzer = SentimentAnalyzer(backend=name)
+    analyzer.backend  # load now so it is not counted as inference time
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scores = analyzer._analyze_texts(texts)
+    elapsed = time.perf_counter() - started
+
+    # Reviews left unscored (no model for their language) count as neutral
+    predicted = [to_label(s['compound'] or 0.0) for s in scores]
+    return {
+        'backend': name,
+        'loaded': type(analyzer.backend).__name__,
+        'accuracy': accuracy_score(labels, predicted),
+        'macro_f1': f1_score(labels, predicted, average='macro'),
+        'reviews_per_s': len(texts) / elapsed if elapsed else float('inf'),
+        'ms_per_review': 1000 * elapsed / len(texts),
+        'load_s': load_s,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sentiment backends on a labeled sample")
+    parser.add_argument("sample", help="CSV with text,label columns")
+    parser.add_argument("--backends", default=",".join(SENTIMENT_BACKENDS))
+    parser.add_argument("--fit-linear", action="store_true", help="Train the linear backend on 80%% of the sample")
+    parser.add_argument("--limit", type=int, default=0, help="Use at most this many reviews")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    texts, labels = load_sample(args.sample, args.limit)
+    if not texts:
+        raise SystemExit("No labeled reviews in sample")
+
+    if args.fit_linear:
+        train_texts, texts, train_labels, labels = train_test_split(
+            texts, labels, test_size=0.2, random_state=42, stratify=labels
+        )
+        LinearSentiment.save(LinearSentiment.fit(train_texts, train_labels), settings.SENTIMENT_LINEAR_MODEL_PATH)
+        print(f"Linear model trained on {len(train_texts)} reviews -> {settings.SENTIMENT_LINEAR_MODEL_PATH}")
+
+    print(f"Evaluating on {len(texts)} reviews")
+    print(f"{'backend':<10} {'model':<22} {'accuracy':>8} {'macro_f1':>8} {'rev/s':>9} {'ms/rev':>8} {'load_s':>7}")
+    for name in args.backends.split(","):
+        result = benchmark(name.strip(), texts, labels)
+        print(
+            f"{result['backend']:<10} {result['loaded']:<22} {result['accuracy']:>8.3f} {result['macro_f1']:>8.3f} "
+            f"{result['reviews_per_s']:>9.1f} {result['ms_per_review']:>8.2f} {result['load_s']:>7.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
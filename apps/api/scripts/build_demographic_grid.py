@@ -0,0 +1,39 @@
+"""
+Build the demographic grid used for location features.
+
+Usage (from the repository root):
+    python -m apps.api.scripts.build_demographic_grid samples.csv [--cell-deg 0.0025] [--out DIR]
+    python -m apps.api.scripts.build_demographic_grid --raster population_density=pop.tif --raster avg_income=income.tif
+
+The CSV needs lat/lng columns plus any of the layer columns listed in
+services/demographics.py (GRID_LAYERS). Output defaults to DEMOGRAPHICS_DIR.
+"""
+import argparse
+import logging
+
+from ..config import settings
+from ..services.demographics import GRID_LAYERS, build_grid_from_csv, build_grid_from_rasters
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the demographic feature grid")
+    parser.add_argument("csv", nargs="?", help="CSV of point samples (lat, lng, layer columns)")
+    parser.add_argument("--raster", action="append", default=[], metavar="LAYER=PATH",
+                        help=f"Single-band GeoTIFF per layer; layers: {', '.join(GRID_LAYERS)}")
+    parser.add_argument("--cell-deg", type=float, default=0.0025, help="Cell size in degrees (CSV input)")
+    parser.add_argument("--out", default=settings.DEMOGRAPHICS_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.raster:
+        rasters = dict(item.split("=", 1) for item in args.raster)
+        meta = build_grid_from_rasters(rasters, args.out)
+    elif args.csv:
+        meta = build_grid_from_csv(args.csv, args.out, cell_deg=args.cell_deg)
+    else:
+        parser.error("pass a CSV file or at least one --raster")
+
+    print(f"Grid {meta['rows']}x{meta['cols']} ({', '.join(meta['layers'])}) written to {args.out}")
+
+if __name__ == "__main__":
+    main()
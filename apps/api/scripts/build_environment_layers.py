@@ -0,0 +1,36 @@
+"""
+Build the OSM environment layers used for environmental location features.
+
+Usage (from the repository root):
+    python -m apps.api.scripts.build_environment_layers \
+        --layer parks=parks.geojson --layer transit_stops=stops.geojson \
+        --layer coastline=coastline.geojson --layer roads=roads.geojson [--out DIR]
+
+Each GeoJSON should already be filtered to its layer, e.g.
+    osmium tags-filter antalya.osm.pbf w/leisure=park -o parks.osm.pbf
+    osmium export parks.osm.pbf -o parks.geojson
+"""
+import argparse
+import logging
+
+from ..config import settings
+from ..services.environment_layers import LAYER_NAMES, build_environment_layers
+
+def main():
+    parser = argparse.ArgumentParser(description="Build memory-mapped OSM environment layers")
+    parser.add_argument("--layer", action="append", required=True, metavar="NAME=PATH",
+                        help=f"GeoJSON per layer; layers: {', '.join(LAYER_NAMES)}")
+    parser.add_argument("--spacing", type=float, default=20.0, help="Point spacing along lines (m)")
+    parser.add_argument("--cell-size", type=float, default=250.0, help="Index cell size (m)")
+    parser.add_argument("--out", default=settings.ENVIRONMENT_LAYERS_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    sources = dict(item.split("=", 1) for item in args.layer)
+    manifest = build_environment_layers(sources, args.out, spacing_m=args.spacing, cell_size_m=args.cell_size)
+    for name, info in manifest["layers"].items():
+        print(f"{name}: {info['features']} features, {info['points']} points")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Refresh the precomputed feature vectors of existing businesses (run from cron).
+
+Usage (from the repository root):
+    python -m apps.api.scripts.precompute_features [--full] [business_type ...]
+
+Without --full only businesses near rows changed since the last build are
+recomputed; a nightly --full run also refreshes long-range distance features.
+"""
+import argparse
+import logging
+
+from ..models import BusinessType
+from ..services.feature_store import feature_store
+from ..services.ml_pipeline import feature_engineer
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute business feature vectors")
+    parser.add_argument("business_types", nargs="*", help="Business types (default: all)")
+    parser.add_argument("--full", action="store_true", help="Recompute every business")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    for bt in args.business_types or [bt.value for bt in BusinessType]:
+        if args.full:
+            result = feature_store.rebuild(bt, feature_engineer)
+        else:
+            result = feature_store.refresh(bt, feature_engineer)
+        print(f"{bt}: {result['rows']} rows, {result['recomputed']} recomputed ({result['mode']})")
+
+if __name__ == "__main__":
+    main()
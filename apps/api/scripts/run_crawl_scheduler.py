@@ -0,0 +1,51 @@
+"""
+Run the crawl scheduler over the persistent crawl frontier.
+
+Usage (from the repository root):
+    python -m apps.api.scripts.run_crawl_scheduler \
+        [--seed-region 1 --query restoran --query kafe] [--workers 4] [--max-units 200] [--budget 5000]
+
+--seed-region adds the region's root tiles for each --query to the frontier
+first. Without --max-units the scheduler runs until interrupted, waiting for
+units to become due and for the daily API budget to free up.
+"""
+import argparse
+import logging
+import threading
+
+from ..config import settings
+from ..services import crawl_scheduler
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl due region tiles in priority order")
+    parser.add_argument("--seed-region", type=int, action="append", default=[], help="Region id to add to the frontier")
+    parser.add_argument("--query", action="append", default=[], help="Search query for seeded regions")
+    parser.add_argument("--workers", type=int, default=settings.CRAWL_WORKERS)
+    parser.add_argument("--max-units", type=int, default=None, help="Stop after dispatching this many units")
+    parser.add_argument("--budget", type=int, default=settings.CRAWL_DAILY_API_BUDGET, help="Places API calls per 24 hours")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.seed_region and not args.query:
+        parser.error("--seed-region needs at least one --query")
+    for region_id in args.seed_region:
+        created = crawl_scheduler.seed_region(region_id, args.query)
+        print(f"Region {region_id}: {created} work units added")
+
+    crawl_scheduler.workers = args.workers
+    crawl_scheduler.daily_api_budget = args.budget
+
+    stop = threading.Event()
+    try:
+        result = crawl_scheduler.run(max_units=args.max_units, stop=stop)
+    except KeyboardInterrupt:
+        stop.set()
+        print("Stopping crawl scheduler")
+        return
+    print(f"Dispatched {result['dispatched']} work units")
+    for row in crawl_scheduler.frontier_status():
+        print(row)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
+from ..config import settings
 from .google_scraper import GoogleMapsScraper, ScrapingOrchestrator, ScrapingConfig
+from .crawl_scheduler import CrawlScheduler
 from .ml_pipeline import FeatureEngineer, SentimentAnalyzer, LocationScoringModel, feature_engineer, sentiment_analyzer, scoring_model
 
 # Initialize default scraper configuration
 default_config = ScrapingConfig(
-    google_api_key=None,  # Set from environment variables
+    google_api_key=settings.GOOGLE_MAPS_API_KEY or None,
     max_businesses_per_search=200,
     max_reviews_per_business=50,
     delay_between_requests=1.0,
@@ -13,6 +15,7 @@ default_config = ScrapingConfig(
 # Global scraper instance
 scraper = GoogleMapsScraper(default_config)
 orchestrator = ScrapingOrchestrator(default_config)
+crawl_scheduler = CrawlScheduler(orchestrator)
 
 # ML services are already initialized in ml_pipeline.py
 # feature_engineer, sentiment_analyzer, scoring_model
\ No newline at end of file
@@ -0,0 +1,207 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, text
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import Analysis
+
+logger = logging.getLogger(__name__)
+
+class AnalysisWriteBehind:
+    """
+    Write-behind buffer for Analysis records
+
+    Scoring requests hand their Analysis row to `submit` and return immediately;
+    a background thread inserts queued rows in batches when either `batch_size`
+    rows are waiting or `flush_interval` seconds have passed. IDs are reserved up
+    front from the table's sequence in blocks, so callers still get the final
+    analysis ID in their response.
+
+    Rows written inline (durable mode, full queue) raise on failure so the
+    request fails. A failed background batch is retried with backoff up to
+    `max_retries` times; rows that still fail on their own go to a bounded
+    dead-letter log (`dead_letters`).
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = 50,
+                 flush_interval: float = 2.0, max_queue_size: int = 1000,
+                 id_block_size: int = 100, durable: bool = False,
+                 max_retries: int = 3, dead_letter_size: int = 1000):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block_size = id_block_size
+        self.durable = durable
+        self.max_retries = max_retries
+
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue_size)
+        self._reserved_ids: deque = deque()
+        self._id_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        # (due time, attempt, batch) of failed background batches; guarded by _flush_lock
+        self._retries: deque = deque()
+        self._dead_letters: deque = deque(maxlen=dead_letter_size)
+
+    @property
+    def dead_letters(self) -> List[Dict]:
+        """Rows given up on after all retries (most recent `dead_letter_size`)"""
+        return list(self._dead_letters)
+
+    def reserve_id(self) -> int:
+        """Next pre-allocated analysis ID (refills a block from the sequence when empty)"""
+        with self._id_lock:
+            if not self._reserved_ids:
+                self._reserved_ids.extend(self._allocate_id_block())
+            return self._reserved_ids.popleft()
+
+    def _allocate_id_block(self) -> List[int]:
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                text("SELECT nextval(pg_get_serial_sequence('analyses', 'id')) FROM generate_series(1, :n)"),
+                {"n": self.id_block_size}
+            ).fetchall()
+            db.commit()
+            return [row[0] for row in rows]
+        finally:
+            db.close()
+
+    def submit(self, values: Dict) -> int:
+        """Queue an Analysis row for insertion and return its ID"""
+        values = dict(values)
+        if values.get("id") is None:
+            values["id"] = self.reserve_id()
+
+        if self.durable:
+            # Durable mode: the row is committed before the request returns
+            self._insert_batch([values])
+            return values["id"]
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(values)
+        except queue.Full:
+            # Backpressure: write inline rather than dropping the record
+            logger.warning("Analysis write-behind queue full, writing synchronously")
+            self._insert_batch([values])
+
+        return values["id"]
+
+    def flush(self, final: bool = False):
+        """Insert everything currently queued; `final` also retries failed batches one last time"""
+        with self._flush_lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if len(batch) >= self.batch_size:
+                    self._write_background(batch)
+                    batch = []
+            if batch:
+                self._write_background(batch)
+            self._retry_due(force=final)
+
+    def close(self):
+        """Stop the background writer and flush remaining rows"""
+        self._stop.set()
+        if self._worker and self._worker.is_alive():
+            self._worker.join(timeout=self.flush_interval * 2)
+        self.flush(final=True)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._stop.clear()
+                    self._worker = threading.Thread(
+                        target=self._run, name="analysis-write-behind", daemon=True
+                    )
+                    self._worker.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._retries:
+                with self._flush_lock:
+                    self._retry_due()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                with self._flush_lock:
+                    self._write_background(batch)
+
+    def _write_background(self, batch: List[Dict], attempt: int = 0):
+        """Insert a queued batch; on failure schedule a retry or dead-letter it"""
+        try:
+            self._insert_batch(batch)
+        except Exception:
+            if attempt < self.max_retries:
+                delay = self.flush_interval * 2 ** attempt
+                self._retries.append((time.monotonic() + delay, attempt + 1, batch))
+            else:
+                self._dead_letter(batch)
+
+    def _retry_due(self, force: bool = False):
+        now = time.monotonic()
+        pending, self._retries = self._retries, deque()
+        for due_at, attempt, batch in pending:
+            if force:
+                self._write_background(batch, attempt=self.max_retries)
+            elif due_at <= now:
+                self._write_background(batch, attempt)
+            else:
+                self._retries.append((due_at, attempt, batch))
+
+    def _dead_letter(self, batch: List[Dict]):
+        # Insert rows one by one so a single bad row does not take the batch with it
+        for row in batch:
+            if len(batch) > 1:
+                try:
+                    self._insert_batch([row])
+                    continue
+                except Exception:
+                    pass
+            self._dead_letters.append(row)
+            logger.error(f"Analysis {row['id']} dropped after {self.max_retries} retries (dead-lettered)")
+
+    def _insert_batch(self, batch: List[Dict]):
+        db = self.session_factory()
+        try:
+            db.execute(insert(Analysis), batch)
+            db.commit()
+            logger.debug(f"Persisted {len(batch)} analyses")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to persist {len(batch)} analyses (ids {[row['id'] for row in batch]}): {e}")
+            raise
+        finally:
+            db.close()
+
+# Global writer instance
+analysis_writer = AnalysisWriteBehind(
+    batch_size=settings.ANALYSIS_WRITE_BATCH_SIZE,
+    flush_interval=settings.ANALYSIS_WRITE_FLUSH_INTERVAL_S,
+    max_queue_size=settings.ANALYSIS_WRITE_QUEUE_SIZE,
+    id_block_size=settings.ANALYSIS_ID_BLOCK_SIZE,
+    durable=settings.ANALYSIS_WRITE_DURABLE,
+    max_retries=settings.ANALYSIS_WRITE_MAX_RETRIES,
+    dead_letter_size=settings.ANALYSIS_DEAD_LETTER_SIZE,
+)
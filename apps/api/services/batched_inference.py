@@ -0,0 +1,42 @@
+from typing import Dict, List
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import settings
+from .micro_batching import MicroBatcher
+from .ml_pipeline import scoring_model, sentiment_analyzer
+
+def _sentiment_batch(business_ids: List[int]) -> List:
+    results = sentiment_analyzer.analyze_businesses_reviews(business_ids)
+    return [results[business_id] for business_id in business_ids]
+
+async def score_location(lat: float, lng: float, business_type: str, radius: int) -> Dict:
+    """
+    Score one location, sharing the model call with concurrent requests
+
+    The cache lookup and feature queries (the bulk of the cost) run per request
+    in the threadpool, so concurrent requests prepare in parallel; only the
+    prepared feature rows are micro-batched into one model call.
+    """
+    prepared = await run_in_threadpool(
+        scoring_model.prepare_location_scores, [(lat, lng, business_type, radius)]
+    )
+    if prepared[0]['result'] is not None:
+        return prepared[0]['result']
+    return await score_batcher.submit(prepared[0])
+
+# Global batchers shared by the /ml routes and the prediction server
+score_batcher = MicroBatcher(
+    scoring_model.score_prepared,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+    max_concurrency=settings.MICRO_BATCH_MAX_CONCURRENCY,
+    name="score"
+)
+sentiment_batcher = MicroBatcher(
+    _sentiment_batch,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+    max_concurrency=settings.MICRO_BATCH_MAX_CONCURRENCY,
+    name="sentiment"
+)
@@ -0,0 +1,237 @@
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import engine
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Cells are classified with a planar approximation; this margin keeps any cell
+# whose classification is not certain on the exact (boundary) path.
+_CLASSIFY_RELATIVE_MARGIN = 0.005
+_CLASSIFY_ABSOLUTE_MARGIN_M = 2.0
+
+CELL_SIZE_DEG = settings.CELL_AGGREGATE_SIZE_DEG
+_CELL_X_SQL = f"floor(ST_X(geom) / {CELL_SIZE_DEG!r})::int"
+_CELL_Y_SQL = f"floor(ST_Y(geom) / {CELL_SIZE_DEG!r})::int"
+
+@dataclass
+class CellStats:
+    """Additive business statistics for a set of cells (or a ring)"""
+    count: int = 0
+    rating_n: int = 0
+    rating_sum: float = 0.0
+    reviews_n: int = 0
+    reviews_sum: int = 0
+
+    def add(self, count, rating_n, rating_sum, reviews_n, reviews_sum):
+        self.count += count
+        self.rating_n += rating_n
+        self.rating_sum += rating_sum
+        self.reviews_n += reviews_n
+        self.reviews_sum += reviews_sum
+
+    @property
+    def avg_rating(self) -> float:
+        return self.rating_sum / self.rating_n if self.rating_n else 0
+
+    @property
+    def avg_reviews(self) -> float:
+        return self.reviews_sum / self.reviews_n if self.reviews_n else 0
+
+def _apply_sql(row: str, sign: int) -> str:
+    """INSERT ... ON CONFLICT adding (sign=1) or removing (sign=-1) one businesses row"""
+    return f"""
+        INSERT INTO business_cell_aggregates AS a
+            (cell_x, cell_y, business_type, business_count, rating_count, rating_sum,
+             review_count_n, review_count_sum)
+        VALUES (
+            floor(ST_X({row}.geom) / {CELL_SIZE_DEG!r})::int,
+            floor(ST_Y({row}.geom) / {CELL_SIZE_DEG!r})::int,
+            {row}.business_type,
+            {sign},
+            CASE WHEN {row}.rating IS NULL THEN 0 ELSE {sign} END,
+            COALESCE({row}.rating, 0) * {sign},
+            CASE WHEN {row}.review_count IS NULL THEN 0 ELSE {sign} END,
+            COALESCE({row}.review_count, 0) * {sign}
+        )
+        ON CONFLICT (cell_x, cell_y, business_type) DO UPDATE SET
+            business_count = a.business_count + EXCLUDED.business_count,
+            rating_count = a.rating_count + EXCLUDED.rating_count,
+            rating_sum = a.rating_sum + EXCLUDED.rating_sum,
+            review_count_n = a.review_count_n + EXCLUDED.review_count_n,
+            review_count_sum = a.review_count_sum + EXCLUDED.review_count_sum;
+    """
+
+_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION business_cell_aggregates_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.is_active IS TRUE AND OLD.geom IS NOT NULL THEN
+        {_apply_sql('OLD', -1)}
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_active IS TRUE AND NEW.geom IS NOT NULL THEN
+        {_apply_sql('NEW', 1)}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_business_cell_aggregates ON businesses;
+CREATE TRIGGER trg_business_cell_aggregates
+    AFTER INSERT OR DELETE OR UPDATE OF geom, business_type, rating, review_count, is_active
+    ON businesses
+    FOR EACH ROW EXECUTE FUNCTION business_cell_aggregates_sync();
+
+CREATE INDEX IF NOT EXISTS idx_businesses_cell_{int(round(CELL_SIZE_DEG * 1e6))}
+    ON businesses (({_CELL_X_SQL}), ({_CELL_Y_SQL}));
+"""
+
+_REBUILD_SQL = f"""
+TRUNCATE business_cell_aggregates;
+INSERT INTO business_cell_aggregates
+    (cell_x, cell_y, business_type, business_count, rating_count, rating_sum,
+     review_count_n, review_count_sum)
+SELECT {_CELL_X_SQL}, {_CELL_Y_SQL}, business_type,
+       COUNT(*), COUNT(rating), COALESCE(SUM(rating), 0),
+       COUNT(review_count), COALESCE(SUM(review_count), 0)
+FROM businesses
+WHERE is_active IS TRUE AND geom IS NOT NULL
+GROUP BY 1, 2, 3;
+COMMENT ON TABLE business_cell_aggregates IS 'cell_size_deg={CELL_SIZE_DEG!r}';
+"""
+
+def rebuild_cell_aggregates():
+    """Recompute every cell from the businesses table"""
+    with engine.begin() as conn:
+        conn.execute(text(_REBUILD_SQL))
+    logger.info(f"Rebuilt business cell aggregates (cell size {CELL_SIZE_DEG}°)")
+
+def ensure_cell_aggregates():
+    """
+    Install the maintenance trigger and backfill the rollups
+
+    A full rebuild runs when the table has never been built for the configured
+    cell size (tracked in the table comment), e.g. first start or a grid change.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(_TRIGGER_SQL))
+        built_for = conn.execute(
+            text("SELECT obj_description('business_cell_aggregates'::regclass, 'pg_class')")
+        ).scalar()
+    if built_for != f"cell_size_deg={CELL_SIZE_DEG!r}":
+        rebuild_cell_aggregates()
+
+def _cell_distance_range(cell_x: int, cell_y: int, lat: float, lng: float,
+                         m_per_deg_lng: float) -> Tuple[float, float]:
+    """(nearest, farthest) planar distance in meters from the point to a cell"""
+    x0 = (cell_x * CELL_SIZE_DEG - lng) * m_per_deg_lng
+    x1 = ((cell_x + 1) * CELL_SIZE_DEG - lng) * m_per_deg_lng
+    y0 = (cell_y * CELL_SIZE_DEG - lat) * METERS_PER_DEGREE_LAT
+    y1 = ((cell_y + 1) * CELL_SIZE_DEG - lat) * METERS_PER_DEGREE_LAT
+    dx_near = max(x0, 0.0, -x1)
+    dy_near = max(y0, 0.0, -y1)
+    dx_far = max(abs(x0), abs(x1))
+    dy_far = max(abs(y0), abs(y1))
+    return math.hypot(dx_near, dy_near), math.hypot(dx_far, dy_far)
+
+def _normalize_type(business_type) -> str:
+    # Enum columns come back as member names ("GAS_STATION"); callers use values ("gas_station")
+    return str(getattr(business_type, 'value', business_type)).lower()
+
+def ring_stats(db_session, lat: float, lng: float, radii: Iterable[int],
+               business_types: Optional[Iterable[str]] = None) -> Dict[int, Dict[str, CellStats]]:
+    """
+    Per ring, per business type statistics of active businesses within `radius` meters
+
+    Cells lying entirely inside a ring are summed from `business_cell_aggregates`;
+    only businesses in cells crossed by a ring edge are read individually and
+    filtered by exact geodesic distance. Two indexed queries serve all rings.
+    """
+    radii = sorted(set(radii))
+    wanted = {_normalize_type(bt) for bt in business_types} if business_types else None
+    max_radius = radii[-1]
+    m_per_deg_lng = METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))
+
+    x_min = math.floor((lng - max_radius / m_per_deg_lng) / CELL_SIZE_DEG)
+    x_max = math.floor((lng + max_radius / m_per_deg_lng) / CELL_SIZE_DEG)
+    y_min = math.floor((lat - max_radius / METERS_PER_DEGREE_LAT) / CELL_SIZE_DEG)
+    y_max = math.floor((lat + max_radius / METERS_PER_DEGREE_LAT) / CELL_SIZE_DEG)
+
+    interior: Dict[int, Set[Tuple[int, int]]] = {r: set() for r in radii}
+    boundary: Dict[int, Set[Tuple[int, int]]] = {r: set() for r in radii}
+    for cx in range(x_min, x_max + 1):
+        for cy in range(y_min, y_max + 1):
+            near, far = _cell_distance_range(cx, cy, lat, lng, m_per_deg_lng)
+            for r in radii:
+                margin = r * _CLASSIFY_RELATIVE_MARGIN + _CLASSIFY_ABSOLUTE_MARGIN_M
+                if far <= r - margin:
+                    interior[r].add((cx, cy))
+                elif near <= r + margin:
+                    boundary[r].add((cx, cy))
+
+    stats: Dict[int, Dict[str, CellStats]] = {r: defaultdict(CellStats) for r in radii}
+
+    aggregate_rows = db_session.execute(text("""
+        SELECT cell_x, cell_y, business_type, business_count, rating_count, rating_sum,
+               review_count_n, review_count_sum
+        FROM business_cell_aggregates
+        WHERE cell_x BETWEEN :x_min AND :x_max
+        AND cell_y BETWEEN :y_min AND :y_max
+        AND business_count > 0
+    """), {"x_min": x_min, "x_max": x_max, "y_min": y_min, "y_max": y_max}).fetchall()
+
+    for row in aggregate_rows:
+        bt = _normalize_type(row.business_type)
+        if wanted is not None and bt not in wanted:
+            continue
+        cell = (row.cell_x, row.cell_y)
+        for r in radii:
+            if cell in interior[r]:
+                stats[r][bt].add(row.business_count, row.rating_count, row.rating_sum,
+                                 row.review_count_n, row.review_count_sum)
+
+    # Exact correction for businesses in cells crossed by any ring edge
+    edge_cells = sorted(set().union(*boundary.values()))
+    if edge_cells:
+        edge_rows = db_session.execute(text(f"""
+            SELECT b.business_type, b.rating, b.review_count, c.x AS cell_x, c.y AS cell_y,
+                   ST_Distance(b.geom::geography, ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography) AS distance
+            FROM businesses b
+            JOIN unnest(CAST(:xs AS integer[]), CAST(:ys AS integer[])) AS c(x, y)
+              ON {_CELL_X_SQL.replace('geom', 'b.geom')} = c.x
+             AND {_CELL_Y_SQL.replace('geom', 'b.geom')} = c.y
+            WHERE b.is_active = true
+        """), {
+            "lat": lat, "lng": lng,
+            "xs": [cell[0] for cell in edge_cells],
+            "ys": [cell[1] for cell in edge_cells],
+        }).fetchall()
+
+        for row in edge_rows:
+            bt = _normalize_type(row.business_type)
+            if wanted is not None and bt not in wanted:
+                continue
+            cell = (row.cell_x, row.cell_y)
+            for r in radii:
+                if cell in boundary[r] and row.distance <= r:
+                    stats[r][bt].add(
+                        1,
+                        0 if row.rating is None else 1, row.rating or 0,
+                        0 if row.review_count is None else 1, row.review_count or 0
+                    )
+
+    return stats
+
+def total_stats(type_stats: Dict[str, CellStats]) -> CellStats:
+    """Combine per-type statistics of one ring"""
+    total = CellStats()
+    for s in type_stats.values():
+        total.add(s.count, s.rating_n, s.rating_sum, s.reviews_n, s.reviews_sum)
+    return total
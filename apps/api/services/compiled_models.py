@@ -0,0 +1,104 @@
+import logging
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+import xgboost as xgb
+import lightgbm as lgb
+
+logger = logging.getLogger(__name__)
+
+Predictor = Callable[[np.ndarray], np.ndarray]
+
+class CompiledTreeEnsemble:
+    """
+    Array-backed copy of an sklearn tree ensemble with a vectorized evaluator
+
+    All trees are flattened into shared node arrays (feature, threshold,
+    children, leaf value). Leaves point to themselves, so evaluation is
+    `max_depth` rounds of gather + compare over an (N, trees) node matrix, with
+    no per-call Python or pandas overhead.
+    """
+
+    def __init__(self, trees: Sequence, scale: float = 1.0, offset: float = 0.0, average: bool = False):
+        sizes = [tree.node_count for tree in trees]
+        self.roots = np.cumsum([0] + sizes[:-1]).astype(np.int64)
+
+        left, right, feature, threshold, value = [], [], [], [], []
+        for root, tree in zip(self.roots, trees):
+            nodes = np.arange(tree.node_count, dtype=np.int64) + root
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, nodes, tree.children_left + root))
+            right.append(np.where(is_leaf, nodes, tree.children_right + root))
+            feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+            value.append(tree.value[:, 0, 0])
+
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.feature = np.concatenate(feature)
+        self.threshold = np.concatenate(threshold)
+        self.value = np.concatenate(value)
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.scale = scale
+        self.offset = offset
+        self.average = average
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # sklearn compares float32 inputs against its split thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(X))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        leaf_values = self.value[nodes]
+        total = leaf_values.mean(axis=1) if self.average else leaf_values.sum(axis=1)
+        return self.offset + self.scale * total
+
+def _sklearn_predictor(model) -> Optional[Predictor]:
+    if isinstance(model, RandomForestRegressor):
+        return CompiledTreeEnsemble([est.tree_ for est in model.estimators_], average=True).predict
+    if isinstance(model, GradientBoostingRegressor):
+        if model.loss != 'squared_error':
+            return None
+        if model.init_ == 'zero':
+            offset = 0.0
+        else:
+            offset = float(model.init_.predict(np.zeros((1, model.n_features_in_)))[0])
+        trees = [est.tree_ for est in model.estimators_[:, 0]]
+        return CompiledTreeEnsemble(trees, scale=model.learning_rate, offset=offset).predict
+    return None
+
+def _native_predictor(model) -> Optional[Predictor]:
+    if isinstance(model, xgb.XGBModel):
+        booster = model.get_booster()
+        return lambda X: booster.inplace_predict(
+            np.ascontiguousarray(X, dtype=np.float32), validate_features=False
+        )
+    if isinstance(model, lgb.LGBMModel):
+        booster = model.booster_
+        return lambda X: booster.predict(np.ascontiguousarray(X, dtype=np.float64))
+    return None
+
+def compile_model(model, n_features: int, verify_samples: int = 32) -> Optional[Predictor]:
+    """
+    Fast predictor over raw (N, F) arrays for a trained model, or None
+
+    sklearn forests/boosting are exported to CompiledTreeEnsemble; XGBoost and
+    LightGBM use their native boosters directly. The predictor is checked
+    against `model.predict` on random probes and discarded on any mismatch.
+    """
+    try:
+        predictor = _sklearn_predictor(model) or _native_predictor(model)
+        if predictor is None:
+            return None
+        probe = np.random.default_rng(0).normal(scale=1000.0, size=(verify_samples, n_features))
+        expected = model.predict(probe)
+        if not np.allclose(predictor(probe), expected, rtol=1e-4, atol=1e-6):
+            logger.warning(f"Compiled {type(model).__name__} disagrees with model.predict, not using it")
+            return None
+        return predictor
+    except Exception as e:
+        logger.warning(f"Could not compile {type(model).__name__} for inference: {e}")
+        return None
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from geoalchemy2.shape import to_shape
+from shapely.prepared import prep
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from ..config import settings
+from ..db import ScraperSessionLocal
+from ..models import CrawlApiUsage, CrawlWorkUnit, Region
+from .region_crawler import NearbySearchError, Tile, TilingCrawler, places_inside
+
+logger = logging.getLogger(__name__)
+
+# Smoothing of the new-places-per-call estimate, and the prior for uncrawled tiles
+YIELD_SMOOTHING = 0.3
+PRIOR_YIELD = 1.0
+# Staleness credited to a tile that was never crawled (in refresh intervals)
+NEVER_CRAWLED_STALENESS = 10.0
+# API usage ledger rows older than this are pruned by the scheduler
+USAGE_RETENTION = "7 days"
+
+# Units due (or with an expired lease), best first:
+#   region weight (priority 1 -> 5, 5 -> 1) x (1 + staleness in refresh intervals) x (0.5 + yield)
+_CLAIM_SQL = """
+    WITH candidates AS (
+        SELECT u.id
+        FROM crawl_work_units u
+        JOIN regions r ON r.id = u.region_id
+        WHERE r.is_active = true
+        AND (
+            (u.status IN ('pending', 'done', 'failed') AND (u.next_due_at IS NULL OR u.next_due_at <= now())
+             AND u.attempts < :max_attempts)
+            OR (u.status = 'running' AND u.claimed_at < now() - make_interval(secs => :lease_s))
+        )
+        ORDER BY
+            (6 - LEAST(GREATEST(COALESCE(r.scraping_priority, 3), 1), 5))
+            * (1 + LEAST(
+                COALESCE(
+                    EXTRACT(EPOCH FROM now() - u.last_crawled_at) / 3600.0
+                    / (:refresh_hours * LEAST(GREATEST(COALESCE(r.scraping_priority, 3), 1), 5)),
+                    :never_staleness
+                ),
+                :never_staleness
+            ))
+            * (0.5 + COALESCE(u.yield_estimate, :prior_yield)) DESC
+        LIMIT :limit
+        FOR UPDATE OF u SKIP LOCKED
+    )
+    UPDATE crawl_work_units
+    SET status = 'running', claimed_at = now(), attempts = attempts + 1
+    WHERE id IN (SELECT id FROM candidates)
+    RETURNING id
+"""
+
+class CrawlScheduler:
+    """
+    Persistent crawl frontier of (region, tile, query) work units
+
+    Units live in `crawl_work_units`. Each dispatch claims the best due units
+    (region priority, staleness relative to the region's refresh interval, and
+    the smoothed yield of new places per API call) with SKIP LOCKED, so several
+    scheduler processes can share a frontier. A unit whose search hits the result
+    cap is replaced by its four child tiles; otherwise it becomes due again after
+    CRAWL_REFRESH_HOURS x region priority. Every crawl, failed or not, appends
+    its API calls to `crawl_api_usage`; dispatching stops while the calls of the
+    last 24 hours exceed the daily budget (soft limit: in-flight units finish).
+    """
+
+    def __init__(self, orchestrator, session_factory=ScraperSessionLocal,
+                 workers: int = settings.CRAWL_WORKERS,
+                 daily_api_budget: int = settings.CRAWL_DAILY_API_BUDGET,
+                 refresh_hours: float = settings.CRAWL_REFRESH_HOURS):
+        self.orchestrator = orchestrator
+        self.session_factory = session_factory
+        self.workers = workers
+        self.daily_api_budget = daily_api_budget
+        self.refresh_hours = refresh_hours
+        self.tiling = TilingCrawler(
+            orchestrator.scraper,
+            result_cap=settings.CRAWL_RESULT_CAP,
+            max_depth=settings.CRAWL_MAX_DEPTH,
+            min_tile_m=settings.CRAWL_MIN_TILE_M
+        )
+        self._boundaries: Dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    def seed_region(self, region_id: int, queries: List[str]) -> int:
+        """Add root tiles of a region for each query; existing units are kept. Returns units created."""
+        db = self.session_factory()
+        try:
+            region = db.get(Region, region_id)
+            if region is None:
+                raise ValueError(f"Region {region_id} not found")
+            tiles = self._tiles_in_region(region, self.tiling.root_tiles(to_shape(region.boundary)))
+            rows = [
+                {'region_id': region_id, 'query': query, 'south': t.south, 'west': t.west,
+                 'north': t.north, 'east': t.east, 'depth': t.depth, 'status': 'pending'}
+                for query in queries for t in tiles
+            ]
+            if not rows:
+                return 0
+            created = db.execute(
+                insert(CrawlWorkUnit).values(rows)
+                .on_conflict_do_nothing(constraint="uq_crawl_unit_tile")
+                .returning(CrawlWorkUnit.id)
+            ).fetchall()
+            db.commit()
+            return len(created)
+        finally:
+            db.close()
+
+    def api_calls_last_24h(self, db) -> int:
+        return db.execute(text("""
+            SELECT COALESCE(SUM(api_calls), 0) FROM crawl_api_usage
+            WHERE created_at > now() - interval '24 hours'
+        """)).scalar()
+
+    def prune_usage(self, db):
+        db.execute(text(f"DELETE FROM crawl_api_usage WHERE created_at < now() - interval '{USAGE_RETENTION}'"))
+
+    def claim(self, db, limit: int) -> List[int]:
+        rows = db.execute(text(_CLAIM_SQL), {
+            'limit': limit,
+            'max_attempts': settings.CRAWL_MAX_ATTEMPTS,
+            'lease_s': settings.CRAWL_LEASE_S,
+            'refresh_hours': self.refresh_hours,
+            'never_staleness': NEVER_CRAWLED_STALENESS,
+            'prior_yield': PRIOR_YIELD,
+        }).fetchall()
+        return [row.id for row in rows]
+
+    def _boundary(self, region: Region):
+        with self._lock:
+            if region.id not in self._boundaries:
+                self._boundaries[region.id] = prep(to_shape(region.boundary))
+            return self._boundaries[region.id]
+
+    def _tiles_in_region(self, region: Region, tiles: List[Tile]) -> List[Tile]:
+        """Tiles overlapping the region boundary; the rest could only return places outside it"""
+        boundary = self._boundary(region)
+        return [tile for tile in tiles if boundary.intersects(tile.geometry())]
+
+    async def crawl_unit(self, unit_id: int) -> Dict:
+        """Search one tile, ingest its places and update the frontier"""
+        db = self.session_factory()
+        try:
+            unit = db.get(CrawlWorkUnit, unit_id)
+            region = db.get(Region, unit.region_id)
+            tile = Tile(unit.south, unit.west, unit.north, unit.east, unit.depth)
+            calls = 0
+            ingest = {}  # filled in as details are fetched, so a failure still reports them
+            try:
+                # Raises NearbySearchError once retries are exhausted, so API failures back off below
+                places, calls = await self.tiling.search(unit.query, tile)
+                inside = places_inside(self._boundary(region), places)
+                await self.orchestrator.ingest_places(list(inside.values()), db, region.id, stats=ingest)
+                new_places = ingest['new']
+                calls += ingest['details_fetched']
+            except Exception as e:
+                if isinstance(e, NearbySearchError):
+                    calls += e.api_calls
+                calls += ingest.get('details_fetched', 0)
+                db.rollback()
+                unit.status = 'failed'
+                unit.last_error = str(e)[:2000]
+                unit.next_due_at = datetime.now(timezone.utc) + timedelta(minutes=5 * unit.attempts ** 2)
+                db.add(CrawlApiUsage(unit_id=unit.id, region_id=unit.region_id, api_calls=calls, succeeded=False))
+                db.commit()
+                logger.error(f"Crawl unit {unit_id} failed: {e}")
+                return {'unit_id': unit_id, 'status': 'failed'}
+
+            now = datetime.now(timezone.utc)
+            observed_yield = new_places / calls if calls else 0.0
+            unit.yield_estimate = (
+                observed_yield if unit.yield_estimate is None
+                else (1 - YIELD_SMOOTHING) * unit.yield_estimate + YIELD_SMOOTHING * observed_yield
+            )
+            unit.last_crawled_at = now
+            unit.last_result_count = len(places)
+            unit.last_new_places = new_places
+            unit.last_api_calls = calls
+            unit.attempts = 0
+            unit.last_error = None
+
+            if len(places) >= self.tiling.result_cap and self.tiling.can_split(tile):
+                children = [
+                    {'region_id': unit.region_id, 'query': unit.query, 'south': c.south, 'west': c.west,
+                     'north': c.north, 'east': c.east, 'depth': c.depth, 'status': 'pending'}
+                    for c in self._tiles_in_region(region, tile.children())
+                ]
+                if children:
+                    db.execute(
+                        insert(CrawlWorkUnit).values(children).on_conflict_do_nothing(constraint="uq_crawl_unit_tile")
+                    )
+                unit.status = 'split'
+            else:
+                unit.status = 'done'
+                interval_hours = self.refresh_hours * min(max(region.scraping_priority or 3, 1), 5)
+                unit.next_due_at = now + timedelta(hours=interval_hours)
+
+            region.last_scraped = now
+            db.add(CrawlApiUsage(unit_id=unit.id, region_id=unit.region_id, api_calls=calls))
+            db.commit()
+            return {'unit_id': unit_id, 'status': unit.status, 'api_calls': calls, 'new_places': new_places}
+        finally:
+            db.close()
+
+    def run(self, max_units: Optional[int] = None, idle_sleep: float = 60.0,
+            stop: Optional[threading.Event] = None) -> Dict:
+        """
+        Dispatch due units to a pool of `workers` threads
+
+        Runs until `stop` is set; with `max_units`, returns once that many units
+        were dispatched or nothing is due.
+        """
+        stop = stop or threading.Event()
+        dispatched = 0
+        in_flight = set()
+
+        db = self.session_factory()
+        try:
+            self.prune_usage(db)
+            db.commit()
+        finally:
+            db.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl") as pool:
+            while not stop.is_set() and (max_units is None or dispatched < max_units):
+                in_flight = {f for f in in_flight if not f.done()}
+                free = self.workers - len(in_flight)
+                if free <= 0:
+                    wait(in_flight, return_when=FIRST_COMPLETED)
+                    continue
+                if max_units is not None:
+                    free = min(free, max_units - dispatched)
+
+                db = self.session_factory()
+                try:
+                    if self.api_calls_last_24h(db) >= self.daily_api_budget:
+                        unit_ids = []
+                        logger.info("Crawl API budget for the last 24 hours is used up, waiting")
+                    else:
+                        unit_ids = self.claim(db, free)
+                        db.commit()
+                finally:
+                    db.close()
+
+                if not unit_ids:
+                    if in_flight:
+                        wait(in_flight, return_when=FIRST_COMPLETED)
+                    elif max_units is not None:
+                        break
+                    else:
+                        stop.wait(idle_sleep)
+                    continue
+
+                for unit_id in unit_ids:
+                    # Each worker thread runs its unit on its own event loop
+                    in_flight.add(pool.submit(asyncio.run, self.crawl_unit(unit_id)))
+                dispatched += len(unit_ids)
+
+            wait(in_flight)
+
+        return {'dispatched': dispatched}
+
+    def frontier_status(self) -> List[Dict]:
+        """Per region: units by status, units due now and last crawl time"""
+        db = self.session_factory()
+        try:
+            rows = db.execute(text("""
+                SELECT u.region_id, r.name, r.scraping_priority,
+                       count(*) FILTER (WHERE u.status = 'pending') AS pending,
+                       count(*) FILTER (WHERE u.status = 'running') AS running,
+                       count(*) FILTER (WHERE u.status = 'done') AS done,
+                       count(*) FILTER (WHERE u.status = 'split') AS split,
+                       count(*) FILTER (WHERE u.status = 'failed') AS failed,
+                       count(*) FILTER (WHERE u.status IN ('pending', 'done', 'failed')
+                                        AND (u.next_due_at IS NULL OR u.next_due_at <= now())) AS due,
+                       max(u.last_crawled_at) AS last_crawled_at
+                FROM crawl_work_units u
+                JOIN regions r ON r.id = u.region_id
+                GROUP BY u.region_id, r.name, r.scraping_priority
+                ORDER BY u.region_id
+            """)).fetchall()
+            return [dict(row._mapping) for row in rows]
+        finally:
+            db.close()
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from typing import Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import SessionLocal
+from .score_cache import score_cache
+
+logger = logging.getLogger(__name__)
+
+# Changes kept in the log; older rows are pruned now and then by writers
+CHANGE_LOG_RETENTION = "1 day"
+PRUNE_EVERY = 1000
+# Polls re-read changes this recent, so ids committed out of order are not skipped
+REPLAY_OVERLAP_S = 30
+
+Epoch = Tuple[int, int, int]
+
+class DataEpoch:
+    """
+    Monotonic epoch advanced whenever business data changes, shared across processes
+
+    Every change appends a row to `data_changes`. Each process polls the log at
+    most every `poll_interval` seconds, so writes from other processes (crawl
+    scheduler, scripts) advance this process's epoch and drop its affected
+    cached scores as well. Ids are assigned at insert but become visible at
+    commit, so a poll also re-reads the last REPLAY_OVERLAP_S seconds of the
+    log and applies ids it has not applied yet, even below the highest seen.
+
+    The epoch is (highest change id seen, changes applied below it, local
+    bumps); the last counts changes this process could not log, so they still
+    invalidate its own caches without being confused with log ids. Caches that
+    derive values from the businesses table include the current epoch in their
+    keys, so entries computed before a write are not served once it has been
+    seen.
+    """
+
+    def __init__(self, session_factory=SessionLocal, poll_interval: float = 2.0,
+                 max_replay: int = 1000):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.max_replay = max_replay
+        self._seen: Optional[int] = None  # highest change id applied by poll()
+        self._recent: Set[int] = set()  # ids applied within the overlap window
+        self._late = 0
+        self._local = 0
+        self._polled_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Epoch:
+        self.sync()
+        return (self._seen or 0, self._late, self._local)
+
+    def sync(self):
+        """Poll the change log if the last poll is older than `poll_interval`"""
+        if time.monotonic() - self._polled_at >= self.poll_interval:
+            self.poll()
+
+    def _fetch(self, db, seen: int):
+        # Changes after `seen` plus every change inside the overlap window
+        return db.execute(
+            text(f"""
+                SELECT id, lat, lng FROM data_changes
+                WHERE id > :seen OR changed_at > now() - interval '{REPLAY_OVERLAP_S} seconds'
+                ORDER BY id LIMIT :limit
+            """),
+            {"seen": seen, "limit": self.max_replay + len(self._recent)}
+        ).fetchall()
+
+    def poll(self, wait: bool = False):
+        """Apply changes logged since the last poll (by any process)"""
+        # One poller at a time; concurrent readers keep the current value unless they `wait`
+        if not self._lock.acquire(blocking=wait):
+            return
+        try:
+            self._polled_at = time.monotonic()
+            db = self.session_factory()
+            try:
+                if self._seen is None:
+                    latest = db.execute(text("SELECT COALESCE(max(id), 0) FROM data_changes")).scalar()
+                    rows = self._fetch(db, latest)
+                    self._seen = max([latest] + [row.id for row in rows])
+                    self._recent = {row.id for row in rows}
+                    return
+                rows = self._fetch(db, self._seen)
+            finally:
+                db.close()
+            window = {row.id for row in rows}
+            new = [row for row in rows if row.id not in self._recent]
+            if new:
+                if len(rows) >= self.max_replay + len(self._recent):
+                    # Too many changes to replay point by point
+                    score_cache.clear()
+                else:
+                    for row in new:
+                        if row.lat is not None and row.lng is not None:
+                            score_cache.invalidate_point(row.lat, row.lng)
+                self._late += sum(1 for row in new if row.id <= self._seen)
+                self._seen = max(self._seen, new[-1].id)
+            # Ids that left the window are not returned again (unless above _seen)
+            self._recent = window
+        except Exception as e:
+            logger.warning(f"Data epoch poll failed: {e}")
+        finally:
+            self._lock.release()
+
+    def advance(self, lat: Optional[float] = None, lng: Optional[float] = None):
+        db = self.session_factory()
+        try:
+            change_id = db.execute(
+                text("INSERT INTO data_changes (lat, lng) VALUES (:lat, :lng) RETURNING id"),
+                {"lat": lat, "lng": lng}
+            ).scalar()
+            if change_id % PRUNE_EVERY == 0:
+                db.execute(text(f"DELETE FROM data_changes WHERE changed_at < now() - interval '{CHANGE_LOG_RETENTION}'"))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Still invalidate this process's caches; other processes miss this change
+            logger.error(f"Failed to log data change: {e}")
+            with self._lock:
+                self._local += 1
+            return
+        finally:
+            db.close()
+        # Apply the logged change right away instead of waiting for the next poll
+        self.poll(wait=True)
+
+# Global epoch instance
+data_epoch = DataEpoch(poll_interval=settings.DATA_EPOCH_POLL_S)
+
+def mark_business_changed(lat: Optional[float] = None, lng: Optional[float] = None):
+    """Record a business insert/update: advance the data epoch and drop affected cached scores"""
+    data_epoch.advance(lat, lng)
+    if lat is not None and lng is not None:
+        score_cache.invalidate_point(lat, lng)
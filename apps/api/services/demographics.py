@@ -0,0 +1,293 @@
+import csv
+import json
+import logging
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+DEMOGRAPHIC_COLUMNS = (
+    'population_density_estimate',
+    'avg_income_estimate',
+    'age_group_young_adult_ratio',
+    'age_group_middle_age_ratio',
+    'age_group_senior_ratio',
+    'education_level_university_ratio',
+    'tourism_factor',
+)
+
+# Used where the grid has no data (outside coverage, or no grid shipped)
+DEMOGRAPHIC_DEFAULTS = np.array([
+    1000,   # people per km2
+    50000,  # annual income estimate
+    0.3,    # 18-35 age group
+    0.4,    # 35-55 age group
+    0.3,    # 55+ age group
+    0.4,
+    0.3,    # Tourism intensity
+], dtype=np.float64)
+
+# Grid layers and the feature column each one feeds
+GRID_LAYERS = (
+    'population_density',
+    'avg_income',
+    'young_adult_ratio',
+    'middle_age_ratio',
+    'senior_ratio',
+    'university_ratio',
+    'tourism',
+)
+
+# Tourism proxy when the grid carries no tourism layer: distance to the Kaleiçi
+# old town, full intensity inside ~1 km, decaying to the baseline at ~3 km
+KALEICI_CENTER = (36.8841, 30.7056)
+_TOURISM_CORE_M = 1000.0
+_TOURISM_FADE_M = 3000.0
+_TOURISM_PEAK = 0.7
+
+GRID_FILE = 'grid.npy'
+META_FILE = 'grid.json'
+
+class DemographicGrid:
+    """
+    Gridded demographic layers sampled per point and ring
+
+    The grid is a float32 array of shape (layers, rows, cols) stored as .npy and
+    opened memory-mapped, plus a JSON file with its origin and cell size. Cells
+    without data are NaN. Ring values are the mean over cells whose centers lie
+    within the radius; ratio and income layers are weighted by population.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.values: Optional[np.ndarray] = None
+        self.meta: Dict = {}
+        self._layer_index: Dict[str, int] = {}
+        self._offsets: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def available(self) -> bool:
+        self._ensure_loaded()
+        return self.values is not None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            grid_path = os.path.join(self.data_dir, GRID_FILE)
+            meta_path = os.path.join(self.data_dir, META_FILE)
+            if os.path.exists(grid_path) and os.path.exists(meta_path):
+                try:
+                    with open(meta_path) as f:
+                        self.meta = json.load(f)
+                    self.values = np.load(grid_path, mmap_mode='r')
+                    self._layer_index = {name: i for i, name in enumerate(self.meta['layers'])}
+                    logger.info(f"Loaded demographic grid {self.values.shape} from {self.data_dir}")
+                except Exception as e:
+                    logger.error(f"Failed to load demographic grid from {self.data_dir}: {e}")
+                    self.values = None
+            else:
+                logger.warning(f"No demographic grid in {self.data_dir}, using default estimates")
+            self._loaded = True
+
+    def _ring_offsets(self, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row/column offsets of cells whose centers lie within `radius` of a cell center"""
+        offsets = self._offsets.get(radius)
+        if offsets is None:
+            cell_deg = self.meta['cell_deg']
+            mid_lat = self.meta['lat_min'] + cell_deg * self.meta['rows'] / 2
+            cell_h = cell_deg * METERS_PER_DEGREE_LAT
+            cell_w = cell_h * math.cos(math.radians(mid_lat))
+            max_dr = int(radius // cell_h) + 1
+            max_dc = int(radius // cell_w) + 1
+            dr, dc = np.mgrid[-max_dr:max_dr + 1, -max_dc:max_dc + 1]
+            inside = np.hypot(dr * cell_h, dc * cell_w) <= max(radius, cell_h / 2)
+            offsets = (dr[inside], dc[inside])
+            self._offsets[radius] = offsets
+        return offsets
+
+    def sample(self, lats: np.ndarray, lngs: np.ndarray, radius: int) -> Dict[str, np.ndarray]:
+        """Ring mean of every layer for N points; NaN where the ring has no data"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lngs = np.atleast_1d(np.asarray(lngs, dtype=np.float64))
+        cell_deg = self.meta['cell_deg']
+        n_rows, n_cols = self.meta['rows'], self.meta['cols']
+
+        dr, dc = self._ring_offsets(radius)
+        rows = np.floor((lats - self.meta['lat_min']) / cell_deg).astype(np.int64)[:, None] + dr
+        cols = np.floor((lngs - self.meta['lng_min']) / cell_deg).astype(np.int64)[:, None] + dc
+        valid = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        rows = np.clip(rows, 0, n_rows - 1)
+        cols = np.clip(cols, 0, n_cols - 1)
+
+        # (layers, N, K) window gathered from the memory map
+        window = np.asarray(self.values[:, rows, cols], dtype=np.float64)
+        window[:, ~valid] = np.nan
+
+        population = None
+        if 'population_density' in self._layer_index:
+            population = window[self._layer_index['population_density']]
+
+        result = {}
+        for name, i in self._layer_index.items():
+            layer = window[i]
+            has_data = ~np.isnan(layer)
+            if name != 'population_density' and population is not None:
+                weights = np.where(has_data, np.nan_to_num(population), 0.0)
+            else:
+                weights = has_data.astype(np.float64)
+            total_weight = weights.sum(axis=1)
+            weighted = np.where(has_data, layer, 0.0) * weights
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = weighted.sum(axis=1) / total_weight
+            # Unpopulated rings fall back to the unweighted mean of the layer
+            unweighted = has_data.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                fallback = np.where(has_data, layer, 0.0).sum(axis=1) / unweighted
+            result[name] = np.where(total_weight > 0, mean, fallback)
+        return result
+
+class DemographicProvider:
+    """Demographic feature block for N points from the shipped grid, with default estimates as fallback"""
+
+    def __init__(self, data_dir: str = settings.DEMOGRAPHICS_DIR):
+        self.grid = DemographicGrid(data_dir)
+
+    def block(self, lats: np.ndarray, lngs: np.ndarray, radius: int) -> np.ndarray:
+        """(N, 7) features in DEMOGRAPHIC_COLUMNS order"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lngs = np.atleast_1d(np.asarray(lngs, dtype=np.float64))
+        out = np.tile(DEMOGRAPHIC_DEFAULTS, (len(lats), 1))
+
+        if self.grid.available:
+            sampled = self.grid.sample(lats, lngs, radius)
+            for j, layer in enumerate(GRID_LAYERS):
+                values = sampled.get(layer)
+                if values is not None:
+                    out[:, j] = np.where(np.isnan(values), out[:, j], values)
+            if 'tourism' not in sampled:
+                out[:, 6] = tourism_proxy(lats, lngs)
+        else:
+            out[:, 6] = tourism_proxy(lats, lngs)
+        return out
+
+def tourism_proxy(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Tourism intensity from distance to the Kaleiçi center"""
+    center_lat, center_lng = KALEICI_CENTER
+    dy = (lats - center_lat) * METERS_PER_DEGREE_LAT
+    dx = (lngs - center_lng) * METERS_PER_DEGREE_LAT * math.cos(math.radians(center_lat))
+    distance = np.hypot(dx, dy)
+    baseline = DEMOGRAPHIC_DEFAULTS[6]
+    fade = np.clip((distance - _TOURISM_CORE_M) / (_TOURISM_FADE_M - _TOURISM_CORE_M), 0.0, 1.0)
+    return _TOURISM_PEAK - (_TOURISM_PEAK - baseline) * fade
+
+def build_grid_from_csv(csv_path: str, out_dir: str, cell_deg: float = 0.0025) -> Dict:
+    """
+    Build grid.npy/grid.json from a CSV of point samples
+
+    The CSV needs `lat` and `lng` columns plus any of GRID_LAYERS (e.g. one row
+    per neighbourhood centroid). Samples falling in the same cell are averaged;
+    cells without samples stay NaN.
+    """
+    sums: Dict[Tuple[int, int], np.ndarray] = defaultdict(lambda: np.zeros(len(GRID_LAYERS)))
+    counts: Dict[Tuple[int, int], np.ndarray] = defaultdict(lambda: np.zeros(len(GRID_LAYERS)))
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        layers = [name for name in GRID_LAYERS if name in reader.fieldnames]
+        if not layers:
+            raise ValueError(f"CSV has none of the layer columns {GRID_LAYERS}")
+        for row in reader:
+            lat, lng = float(row['lat']), float(row['lng'])
+            key = (math.floor(lat / cell_deg), math.floor(lng / cell_deg))
+            for j, name in enumerate(GRID_LAYERS):
+                value = row.get(name)
+                if value not in (None, ''):
+                    sums[key][j] += float(value)
+                    counts[key][j] += 1
+
+    if not sums:
+        raise ValueError(f"No samples in {csv_path}")
+
+    row_keys = [key[0] for key in sums]
+    col_keys = [key[1] for key in sums]
+    row_min, col_min = min(row_keys), min(col_keys)
+    n_rows, n_cols = max(row_keys) - row_min + 1, max(col_keys) - col_min + 1
+
+    layer_ids = [GRID_LAYERS.index(name) for name in layers]
+    grid = np.full((len(layers), n_rows, n_cols), np.nan, dtype=np.float32)
+    for (r, c), total in sums.items():
+        n = counts[(r, c)]
+        for k, j in enumerate(layer_ids):
+            if n[j]:
+                grid[k, r - row_min, c - col_min] = total[j] / n[j]
+
+    return _write_grid(grid, layers, out_dir, row_min * cell_deg, col_min * cell_deg, cell_deg,
+                       source=os.path.basename(csv_path))
+
+def build_grid_from_rasters(raster_paths: Dict[str, str], out_dir: str) -> Dict:
+    """
+    Build grid.npy/grid.json from single-band GeoTIFFs (one per layer) in EPSG:4326
+
+    All rasters must share the same north-up grid. Requires rasterio.
+    """
+    try:
+        import rasterio
+    except ImportError:
+        raise RuntimeError("rasterio is required to import GeoTIFF rasters")
+
+    layers = [name for name in GRID_LAYERS if name in raster_paths]
+    bands = []
+    transform = None
+    for name in layers:
+        with rasterio.open(raster_paths[name]) as src:
+            band = src.read(1).astype(np.float32)
+            if src.nodata is not None:
+                band[band == src.nodata] = np.nan
+            if transform is None:
+                transform = src.transform
+            elif src.transform != transform:
+                raise ValueError(f"Raster {raster_paths[name]} is not aligned with the other layers")
+            bands.append(band[::-1])  # store rows south to north like the CSV builder
+
+    cell_deg = transform.a
+    if abs(abs(transform.e) - cell_deg) > 1e-12:
+        raise ValueError("Rasters must have square cells")
+    grid = np.stack(bands)
+    lat_min = transform.f + transform.e * grid.shape[1]
+    return _write_grid(grid, layers, out_dir, lat_min, transform.c, cell_deg,
+                       source=','.join(os.path.basename(p) for p in raster_paths.values()))
+
+def _write_grid(grid: np.ndarray, layers, out_dir: str, lat_min: float, lng_min: float,
+                cell_deg: float, source: str) -> Dict:
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, GRID_FILE), grid)
+    meta = {
+        'layers': list(layers),
+        'lat_min': lat_min,
+        'lng_min': lng_min,
+        'cell_deg': cell_deg,
+        'rows': int(grid.shape[1]),
+        'cols': int(grid.shape[2]),
+        'source': source,
+    }
+    with open(os.path.join(out_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    logger.info(f"Wrote demographic grid {grid.shape} to {out_dir}")
+    return meta
+
+# Global provider instance (grid is opened lazily on first use)
+demographics = DemographicProvider()
@@ -0,0 +1,308 @@
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Layers ingested from OSM extracts (one GeoJSON per layer, already tag-filtered)
+LAYER_NAMES = ('parks', 'transit_stops', 'coastline', 'roads')
+
+ENVIRONMENT_COLUMNS = (
+    'distance_to_transit_stop',
+    'transit_stops_nearby',
+    'distance_to_coastline',
+    'road_density_km_per_km2',
+)
+
+MANIFEST_FILE = 'layers.json'
+
+# Cell keys pack (cx, cy) into one sortable int64; cy ranges for a fixed cx are contiguous
+_KEY_OFFSET = 1 << 20
+_KEY_STRIDE = 1 << 21
+
+def _cell_key(cx, cy):
+    return (np.int64(cx) + _KEY_OFFSET) * _KEY_STRIDE + (np.int64(cy) + _KEY_OFFSET)
+
+class PointLayer:
+    """
+    One environmental layer as projected points with a grid-bucket index
+
+    Lines and polygon boundaries are densified to points `spacing_m` apart at
+    ingest time. Points are sorted by cell key; `cell_keys`/`cell_starts` form a
+    CSR index, so every cell column of a query window is one contiguous slice.
+    """
+
+    def __init__(self, name: str, xy: np.ndarray, feature_ids: np.ndarray,
+                 cell_keys: np.ndarray, cell_starts: np.ndarray, cell_size_m: float, spacing_m: float):
+        self.name = name
+        self.xy = xy
+        self.feature_ids = feature_ids
+        self.cell_keys = cell_keys
+        self.cell_starts = cell_starts
+        self.cell_size_m = cell_size_m
+        self.spacing_m = spacing_m
+
+    def _candidates(self, x: float, y: float, reach: float) -> np.ndarray:
+        """Indices of points in cells overlapping the square of half-size `reach`"""
+        cs = self.cell_size_m
+        cx0, cx1 = math.floor((x - reach) / cs), math.floor((x + reach) / cs)
+        cy0, cy1 = math.floor((y - reach) / cs), math.floor((y + reach) / cs)
+        ranges = []
+        for cx in range(cx0, cx1 + 1):
+            lo = np.searchsorted(self.cell_keys, _cell_key(cx, cy0))
+            hi = np.searchsorted(self.cell_keys, _cell_key(cx, cy1), side='right')
+            if hi > lo:
+                ranges.append(np.arange(self.cell_starts[lo], self.cell_starts[hi]))
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(ranges)
+
+    def _distances(self, x: float, y: float, idx: np.ndarray) -> np.ndarray:
+        pts = self.xy[idx]
+        return np.hypot(pts[:, 0] - x, pts[:, 1] - y)
+
+    def within(self, x: float, y: float, radius: float) -> Tuple[int, int]:
+        """(points, distinct features) within `radius` meters"""
+        idx = self._candidates(x, y, radius)
+        if idx.size == 0:
+            return 0, 0
+        inside = idx[self._distances(x, y, idx) <= radius]
+        return int(inside.size), int(np.unique(self.feature_ids[inside]).size)
+
+    def nearest(self, x: float, y: float, max_distance: float) -> float:
+        """Distance to the nearest point, or `max_distance` when none is that close"""
+        reach = self.cell_size_m
+        while True:
+            reach = min(reach, max_distance)
+            idx = self._candidates(x, y, reach)
+            if idx.size:
+                d = float(self._distances(x, y, idx).min())
+                # Only points within `reach` are guaranteed to be the closest ones
+                if d <= reach:
+                    return d
+            if reach >= max_distance:
+                return max_distance
+            reach *= 2
+
+class EnvironmentLayers:
+    """Memory-mapped environmental layers shared by all workers through the page cache"""
+
+    def __init__(self, data_dir: str = settings.ENVIRONMENT_LAYERS_DIR,
+                 max_distance_m: float = settings.ENVIRONMENT_MAX_DISTANCE_M):
+        self.data_dir = data_dir
+        self.max_distance_m = max_distance_m
+        self.layers: Dict[str, PointLayer] = {}
+        self.manifest: Dict = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def has(self, name: str) -> bool:
+        self._ensure_loaded()
+        return name in self.layers
+
+    def reload(self):
+        with self._lock:
+            self._loaded = False
+        self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self.layers = {}
+            manifest_path = os.path.join(self.data_dir, MANIFEST_FILE)
+            if os.path.exists(manifest_path):
+                try:
+                    with open(manifest_path) as f:
+                        self.manifest = json.load(f)
+                    for name, info in self.manifest['layers'].items():
+                        self.layers[name] = PointLayer(
+                            name,
+                            np.load(self._path(name, 'xy'), mmap_mode='r'),
+                            np.load(self._path(name, 'fid'), mmap_mode='r'),
+                            np.load(self._path(name, 'keys'), mmap_mode='r'),
+                            np.load(self._path(name, 'starts'), mmap_mode='r'),
+                            self.manifest['cell_size_m'],
+                            info['spacing_m'],
+                        )
+                    logger.info(f"Loaded environment layers {sorted(self.layers)} from {self.data_dir}")
+                except Exception as e:
+                    logger.error(f"Failed to load environment layers from {self.data_dir}: {e}")
+                    self.layers = {}
+            else:
+                logger.warning(f"No environment layers in {self.data_dir}, using database proxies")
+            self._loaded = True
+
+    def _path(self, name: str, part: str) -> str:
+        return os.path.join(self.data_dir, f"{name}.{part}.npy")
+
+    def project(self, lat: float, lng: float) -> Tuple[float, float]:
+        return _project(lat, lng, self.manifest['ref_lat'], self.manifest['ref_lng'])
+
+    def nearest_distance(self, name: str, lat: float, lng: float,
+                         max_distance: Optional[float] = None) -> float:
+        max_distance = max_distance or self.max_distance_m
+        x, y = self.project(lat, lng)
+        return self.layers[name].nearest(x, y, max_distance)
+
+    def count_features(self, name: str, lat: float, lng: float, radius: float) -> int:
+        x, y = self.project(lat, lng)
+        return self.layers[name].within(x, y, radius)[1]
+
+    def features(self, lat: float, lng: float, radius: int) -> Dict[str, float]:
+        """ENVIRONMENT_COLUMNS for one point; layers that are not installed give defaults"""
+        features = dict(zip(ENVIRONMENT_COLUMNS, ENVIRONMENT_DEFAULTS))
+        self._ensure_loaded()
+        if not self.layers:
+            return features
+
+        x, y = self.project(lat, lng)
+        if 'transit_stops' in self.layers:
+            layer = self.layers['transit_stops']
+            features['distance_to_transit_stop'] = layer.nearest(x, y, self.max_distance_m)
+            features['transit_stops_nearby'] = layer.within(x, y, radius)[1]
+        if 'coastline' in self.layers:
+            features['distance_to_coastline'] = self.layers['coastline'].nearest(x, y, self.max_distance_m)
+        if 'roads' in self.layers:
+            layer = self.layers['roads']
+            points, _ = layer.within(x, y, radius)
+            area_km2 = math.pi * (radius / 1000) ** 2
+            features['road_density_km_per_km2'] = points * layer.spacing_m / 1000 / area_km2
+        return features
+
+    def block(self, lats: np.ndarray, lngs: np.ndarray, radius: int) -> np.ndarray:
+        """(N, 4) features in ENVIRONMENT_COLUMNS order"""
+        out = np.empty((len(lats), len(ENVIRONMENT_COLUMNS)), dtype=np.float64)
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            out[i] = list(self.features(float(lat), float(lng), radius).values())
+        return out
+
+ENVIRONMENT_DEFAULTS = (
+    float(settings.ENVIRONMENT_MAX_DISTANCE_M),
+    0.0,
+    float(settings.ENVIRONMENT_MAX_DISTANCE_M),
+    0.0,
+)
+
+# --- Ingest --------------------------------------------------------------------
+
+def _project(lat, lng, ref_lat: float, ref_lng: float):
+    """Local equirectangular projection in meters around the reference point"""
+    x = (lng - ref_lng) * METERS_PER_DEGREE_LAT * math.cos(math.radians(ref_lat))
+    y = (lat - ref_lat) * METERS_PER_DEGREE_LAT
+    return x, y
+
+def _densify(coords: np.ndarray, spacing_m: float) -> np.ndarray:
+    """Insert points along each segment so consecutive points are at most `spacing_m` apart"""
+    if len(coords) < 2:
+        return coords
+    parts = []
+    for (x0, y0), (x1, y1) in zip(coords[:-1], coords[1:]):
+        n = max(int(math.ceil(math.hypot(x1 - x0, y1 - y0) / spacing_m)), 1)
+        t = np.arange(n) / n
+        parts.append(np.column_stack([x0 + (x1 - x0) * t, y0 + (y1 - y0) * t]))
+    parts.append(coords[-1:])
+    return np.vstack(parts)
+
+def _geometry_points(geom, ref_lat: float, ref_lng: float, spacing_m: float) -> List[np.ndarray]:
+    """Projected points representing a shapely geometry"""
+    kind = geom.geom_type
+    if kind.startswith('Multi') or kind == 'GeometryCollection':
+        points = []
+        for part in geom.geoms:
+            points += _geometry_points(part, ref_lat, ref_lng, spacing_m)
+        return points
+
+    def projected(coords):
+        arr = np.asarray(coords, dtype=np.float64)[:, :2]
+        x, y = _project(arr[:, 1], arr[:, 0], ref_lat, ref_lng)
+        return np.column_stack([x, y])
+
+    if kind == 'Point':
+        return [projected(geom.coords)]
+    if kind == 'LineString':
+        return [_densify(projected(geom.coords), spacing_m)]
+    if kind == 'Polygon':
+        rings = [geom.exterior] + list(geom.interiors)
+        points = [_densify(projected(ring.coords), spacing_m) for ring in rings]
+        # An interior point so small parks still register at their center
+        points.append(projected(geom.representative_point().coords))
+        return points
+    return []
+
+def _read_geojson(path: str) -> List:
+    from shapely.geometry import shape
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    return [shape(feature['geometry']) for feature in features if feature.get('geometry')]
+
+def build_environment_layers(sources: Dict[str, str], out_dir: str = settings.ENVIRONMENT_LAYERS_DIR,
+                             spacing_m: float = 20.0, cell_size_m: float = 250.0) -> Dict:
+    """
+    Ingest GeoJSON extracts into memory-mappable point layers
+
+    `sources` maps layer names (LAYER_NAMES) to GeoJSON files, e.g. exported
+    with `osmium tags-filter` + `osmium export`. Coordinates are projected
+    around the center of all inputs.
+    """
+    unknown = set(sources) - set(LAYER_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown layers {sorted(unknown)}; expected {LAYER_NAMES}")
+
+    geometries = {name: _read_geojson(path) for name, path in sources.items()}
+    bounds = np.array([g.bounds for geoms in geometries.values() for g in geoms])
+    if bounds.size == 0:
+        raise ValueError("No geometries in the given sources")
+    ref_lng = float((bounds[:, 0].min() + bounds[:, 2].max()) / 2)
+    ref_lat = float((bounds[:, 1].min() + bounds[:, 3].max()) / 2)
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'ref_lat': ref_lat, 'ref_lng': ref_lng, 'cell_size_m': cell_size_m, 'layers': {}}
+
+    for name, geoms in geometries.items():
+        xy_parts, fid_parts = [], []
+        for fid, geom in enumerate(geoms):
+            for pts in _geometry_points(geom, ref_lat, ref_lng, spacing_m):
+                xy_parts.append(pts)
+                fid_parts.append(np.full(len(pts), fid, dtype=np.int32))
+        xy = np.vstack(xy_parts).astype(np.float32) if xy_parts else np.empty((0, 2), dtype=np.float32)
+        fids = np.concatenate(fid_parts) if fid_parts else np.empty(0, dtype=np.int32)
+
+        keys = _cell_key(np.floor(xy[:, 0] / cell_size_m).astype(np.int64),
+                         np.floor(xy[:, 1] / cell_size_m).astype(np.int64))
+        order = np.argsort(keys, kind='stable')
+        xy, fids, keys = xy[order], fids[order], keys[order]
+        cell_keys, first = np.unique(keys, return_index=True)
+        cell_starts = np.append(first, len(keys)).astype(np.int64)
+
+        np.save(os.path.join(out_dir, f"{name}.xy.npy"), xy)
+        np.save(os.path.join(out_dir, f"{name}.fid.npy"), fids)
+        np.save(os.path.join(out_dir, f"{name}.keys.npy"), cell_keys)
+        np.save(os.path.join(out_dir, f"{name}.starts.npy"), cell_starts)
+        manifest['layers'][name] = {
+            'points': int(len(xy)),
+            'features': len(geoms),
+            'spacing_m': spacing_m,
+            'source': os.path.basename(sources[name]),
+        }
+        logger.info(f"Layer {name}: {len(geoms)} features, {len(xy)} points")
+
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+# Global layer set (files are opened lazily on first use)
+environment_layers = EnvironmentLayers()
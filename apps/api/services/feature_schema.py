@@ -0,0 +1,160 @@
+import math
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .demographics import DEMOGRAPHIC_COLUMNS, DEMOGRAPHIC_DEFAULTS, demographics
+from .environment_layers import ENVIRONMENT_COLUMNS, ENVIRONMENT_DEFAULTS
+
+class FeatureSchema:
+    """
+    Fixed column order for location feature vectors
+
+    Maps feature dicts (or whole column blocks) straight into float64 NumPy
+    rows/matrices, so scoring never builds a pandas DataFrame per request.
+    Missing or NaN values take the column default.
+    """
+
+    def __init__(self, columns: Sequence[str], defaults: Optional[Dict[str, float]] = None,
+                 version: Optional[int] = None):
+        self.columns = tuple(columns)
+        self.version = version
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        defaults = defaults or {}
+        self.defaults = np.array([defaults.get(name, 0.0) for name in self.columns], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def row(self, features: Dict) -> np.ndarray:
+        """1-D vector for one feature dict"""
+        out = self.defaults.copy()
+        index = self.index
+        for name, value in features.items():
+            i = index.get(name)
+            if i is not None and value is not None:
+                out[i] = value
+        # NaN from upstream aggregates falls back to the default as well
+        missing = np.isnan(out)
+        if missing.any():
+            out[missing] = self.defaults[missing]
+        return out
+
+    def matrix(self, rows: Sequence[Dict]) -> np.ndarray:
+        """(N, F) matrix for N feature dicts"""
+        out = np.empty((len(rows), len(self.columns)), dtype=np.float64)
+        for i, features in enumerate(rows):
+            out[i] = self.row(features)
+        return out
+
+    def assign_block(self, out: np.ndarray, block_columns: Sequence[str], block: np.ndarray):
+        """Write a (N, k) block computed for N points into the matching columns of `out`"""
+        for j, name in enumerate(block_columns):
+            i = self.index.get(name)
+            if i is not None:
+                out[:, i] = block[:, j]
+
+    def to_dict(self, row: np.ndarray) -> Dict[str, float]:
+        return dict(zip(self.columns, row.tolist()))
+
+    def matches(self, feature_names: Optional[Sequence[str]]) -> bool:
+        return feature_names is not None and tuple(feature_names) == self.columns
+
+# --- Vectorized feature blocks -------------------------------------------------
+
+TEMPORAL_COLUMNS = (
+    'month', 'day_of_week', 'hour', 'is_weekend', 'is_summer_season', 'is_business_hours',
+)
+
+def temporal_block(n: int, now: Optional[datetime] = None) -> np.ndarray:
+    """(n, 6) time-based features; identical for every point scored at the same moment"""
+    now = now or datetime.now()
+    values = np.array([
+        now.month,
+        now.weekday(),
+        now.hour,
+        1 if now.weekday() >= 5 else 0,
+        1 if now.month in (6, 7, 8, 9) else 0,  # Tourism season
+        1 if 8 <= now.hour <= 22 else 0,
+    ], dtype=np.float64)
+    return np.tile(values, (n, 1))
+
+def demographic_block(lats: np.ndarray, lngs: np.ndarray, radius: int) -> np.ndarray:
+    """(n, 7) demographic features for n points, sampled from the demographic grid by ring"""
+    return demographics.block(lats, lngs, radius)
+
+# --- Declared location feature schema -----------------------------------------
+
+# Bump whenever a column is added, removed, renamed or reordered. Models record
+# the version they were trained with; older models keep their stored column list.
+FEATURE_SCHEMA_VERSION = 4  # v4: exact (uncapped) nearest-neighbor distances
+
+COMPETITION_RINGS = (100, 250, 500, 750, 1000)
+DENSITY_BUSINESS_TYPES = ('restaurant', 'cafe', 'retail', 'hotel', 'bank', 'hospital', 'school')
+ACCESSIBILITY_BUSINESS_TYPES = ('gas_station', 'bank')  # Proxy for accessibility
+
+def _declared_location_features() -> Tuple[Tuple[str, float], ...]:
+    """(column, default) pairs in model input order"""
+    columns = []
+
+    # Competition (rings beyond the analysis radius keep their defaults)
+    for r in COMPETITION_RINGS:
+        columns += [
+            (f'competitors_{r}m', 0.0),
+            (f'avg_competitor_rating_{r}m', 0.0),
+            (f'avg_competitor_reviews_{r}m', 0.0),
+            (f'total_competitor_reviews_{r}m', 0.0),
+        ]
+    columns += [('competition_intensity', 0.0), ('competitor_density_per_km2', 0.0)]
+
+    # Density
+    columns += [
+        ('total_businesses', 0.0), ('business_type_diversity', 0.0),
+        ('avg_area_rating', 0.0), ('total_area_reviews', 0.0),
+    ]
+    for bt in DENSITY_BUSINESS_TYPES:
+        columns += [(f'has_{bt}_nearby', 0.0), (f'count_{bt}_nearby', 0.0)]
+
+    # Quality
+    columns += [
+        ('high_quality_competitors', 0.0), ('high_quality_avg_rating', 0.0),
+        ('high_quality_avg_reviews', 0.0), ('market_engagement', 0.0),
+    ]
+
+    # Accessibility
+    for bt in ACCESSIBILITY_BUSINESS_TYPES:
+        columns += [(f'{bt}_count', 0.0), (f'distance_to_nearest_{bt}', 1000.0)]
+    columns += [('accessibility_score', 0.0)]
+
+    # Environmental
+    columns += [
+        ('nearby_parks', 0.0), ('distance_to_park', 1500.0),
+        ('cultural_attractions', 0.0), ('estimated_noise_level', 0.0),
+    ]
+    columns += list(zip(ENVIRONMENT_COLUMNS, ENVIRONMENT_DEFAULTS))
+
+    columns += list(zip(DEMOGRAPHIC_COLUMNS, DEMOGRAPHIC_DEFAULTS.tolist()))
+    columns += [(name, 0.0) for name in TEMPORAL_COLUMNS]
+    return tuple(columns)
+
+_LOCATION_FEATURES = _declared_location_features()
+
+LOCATION_FEATURE_SCHEMA = FeatureSchema(
+    [name for name, _ in _LOCATION_FEATURES],
+    defaults=dict(_LOCATION_FEATURES),
+    version=FEATURE_SCHEMA_VERSION,
+)
+
+def schema_for_model(feature_names: Optional[Sequence[str]], version: Optional[int]) -> FeatureSchema:
+    """Schema a stored model expects: the declared one, or the model's own column list"""
+    if version == FEATURE_SCHEMA_VERSION and LOCATION_FEATURE_SCHEMA.matches(feature_names):
+        return LOCATION_FEATURE_SCHEMA
+    return FeatureSchema(feature_names or ())
+
+def block_row_to_dict(columns: Sequence[str], block: np.ndarray, i: int = 0) -> Dict[str, float]:
+    """Feature dict for row `i` of a block (keeps ints as ints for JSON responses)"""
+    return {
+        name: (int(value) if float(value).is_integer() and not math.isinf(value) else float(value))
+        for name, value in zip(columns, block[i].tolist())
+    }
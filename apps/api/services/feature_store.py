@@ -0,0 +1,214 @@
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import TrainerSessionLocal
+from ..models import BusinessType
+from .feature_schema import LOCATION_FEATURE_SCHEMA, FEATURE_SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Features look up to 3x the radius (parks), so a changed business affects stored
+# vectors of businesses within that reach. Nearest-neighbor distances can reach
+# further; the periodic full rebuild picks those up.
+FEATURE_REACH_FACTOR = 3
+
+# Builds kept on disk besides the current one, for readers still mapping them
+KEEP_PREVIOUS_BUILDS = 1
+
+@dataclass
+class StoredFeatures:
+    """Feature matrix for one business type; rows follow `ids` (sorted)"""
+    ids: np.ndarray
+    matrix: np.ndarray
+    manifest: Dict
+
+    def rows_for(self, business_ids) -> np.ndarray:
+        """Row positions of `business_ids`; -1 for businesses not in the store"""
+        business_ids = np.asarray(business_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(business_ids), -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(self.ids, business_ids), 0, len(self.ids) - 1)
+        return np.where(self.ids[pos] == business_ids, pos, -1)
+
+class FeatureStore:
+    """
+    Precomputed location feature vectors of all active businesses
+
+    Each build of a business type writes new `{type}.{build}.ids.npy` (sorted
+    business IDs) and `{type}.{build}.features.npy` (rows in
+    LOCATION_FEATURE_SCHEMA order) files; `{type}.json` (schema version, radius,
+    build time) names the current build and is the only file replaced in place,
+    so a reader always gets ids and matrix of the same build. `refresh` only
+    recomputes businesses near rows changed since the last build, so it is cheap
+    to run frequently while the scraper is writing.
+    """
+
+    def __init__(self, data_dir: str = settings.FEATURE_STORE_DIR, radius: int = 500):
+        self.data_dir = data_dir
+        self.radius = radius
+        self._lock = threading.Lock()
+
+    def _path(self, business_type: str, part: str) -> str:
+        return os.path.join(self.data_dir, f"{business_type}.{part}")
+
+    def load(self, business_type: str) -> Optional[StoredFeatures]:
+        """Stored vectors for a type, or None when missing or built for another schema/radius"""
+        manifest_path = self._path(business_type, 'json')
+        for attempt in range(2):
+            if not os.path.exists(manifest_path):
+                return None
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('schema_version') != FEATURE_SCHEMA_VERSION or manifest.get('radius') != self.radius:
+                return None
+            try:
+                return StoredFeatures(
+                    ids=np.load(os.path.join(self.data_dir, manifest['ids_file']), mmap_mode='r'),
+                    matrix=np.load(os.path.join(self.data_dir, manifest['features_file']), mmap_mode='r'),
+                    manifest=manifest,
+                )
+            except (KeyError, FileNotFoundError):
+                # Pre-versioned manifest, or the build was pruned after we read the manifest
+                if attempt:
+                    return None
+        return None
+
+    def rebuild(self, business_type: str, feature_engineer) -> Dict:
+        """Compute vectors for every active business of the type"""
+        with self._lock:
+            db = TrainerSessionLocal()
+            try:
+                built_at = db.execute(text("SELECT now()")).scalar()
+                rows = self._active_businesses(db, business_type)
+                ids = np.array([row.id for row in rows], dtype=np.int64)
+                matrix = self._compute(rows, business_type, feature_engineer, db)
+            finally:
+                db.close()
+            self._write(business_type, ids, matrix, built_at, mode='full')
+            return {'business_type': business_type, 'rows': len(ids), 'recomputed': len(ids), 'mode': 'full'}
+
+    def refresh(self, business_type: str, feature_engineer) -> Dict:
+        """Recompute only rows affected by businesses changed since the last build"""
+        stored = self.load(business_type)
+        if stored is None:
+            return self.rebuild(business_type, feature_engineer)
+
+        with self._lock:
+            db = TrainerSessionLocal()
+            try:
+                built_at = db.execute(text("SELECT now()")).scalar()
+                since = datetime.fromisoformat(stored.manifest['built_at'])
+                active = self._active_businesses(db, business_type)
+                affected = self._affected_businesses(db, business_type, since)
+                active_ids = np.array([row.id for row in active], dtype=np.int64)
+
+                # Keep unaffected stored rows, drop inactive ones, compute new/affected ones
+                stored_pos = stored.rows_for(active_ids)
+                affected_ids = {row.id for row in affected}
+                recompute = [
+                    row for row, pos in zip(active, stored_pos)
+                    if pos < 0 or row.id in affected_ids
+                ]
+                matrix = np.empty((len(active_ids), len(LOCATION_FEATURE_SCHEMA)), dtype=np.float32)
+                keep = stored_pos >= 0
+                matrix[keep] = stored.matrix[stored_pos[keep]]
+                if recompute:
+                    recompute_pos = np.searchsorted(active_ids, [row.id for row in recompute])
+                    matrix[recompute_pos] = self._compute(recompute, business_type, feature_engineer, db)
+            finally:
+                db.close()
+            self._write(business_type, active_ids, matrix, built_at, mode='incremental')
+            return {
+                'business_type': business_type,
+                'rows': len(active_ids),
+                'recomputed': len(recompute),
+                'mode': 'incremental'
+            }
+
+    def _active_businesses(self, db, business_type: str) -> List:
+        return db.execute(text("""
+            SELECT id, ST_Y(geom) AS lat, ST_X(geom) AS lng
+            FROM businesses
+            WHERE business_type = :business_type AND is_active = true AND geom IS NOT NULL
+            ORDER BY id
+        """), {"business_type": BusinessType(business_type).name}).fetchall()
+
+    def _affected_businesses(self, db, business_type: str, since: datetime) -> List:
+        return db.execute(text("""
+            SELECT b.id
+            FROM businesses b
+            WHERE b.business_type = :business_type AND b.is_active = true AND b.geom IS NOT NULL
+            AND EXISTS (
+                SELECT 1 FROM businesses c
+                WHERE c.updated_at > :since
+                AND ST_DWithin(c.geom::geography, b.geom::geography, :reach)
+            )
+        """), {
+            "business_type": BusinessType(business_type).name,
+            "since": since,
+            "reach": self.radius * FEATURE_REACH_FACTOR,
+        }).fetchall()
+
+    def _compute(self, rows: List, business_type: str, feature_engineer, db) -> np.ndarray:
+        matrix = feature_engineer.create_location_feature_matrix(
+            [(row.lat, row.lng) for row in rows], business_type,
+            LOCATION_FEATURE_SCHEMA, radius=self.radius, db_session=db
+        )
+        return matrix.astype(np.float32)
+
+    def _write(self, business_type: str, ids: np.ndarray, matrix: np.ndarray, built_at, mode: str):
+        os.makedirs(self.data_dir, exist_ok=True)
+        # Arrays go to files of their own build; swapping the manifest publishes both at once
+        build = f"{built_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        files = {}
+        for part, array in (('ids', ids), ('features', matrix)):
+            files[part] = os.path.basename(self._path(business_type, f"{build}.{part}.npy"))
+            np.save(os.path.join(self.data_dir, files[part]), array)
+        manifest = {
+            'business_type': business_type,
+            'schema_version': FEATURE_SCHEMA_VERSION,
+            'columns': list(LOCATION_FEATURE_SCHEMA.columns),
+            'radius': self.radius,
+            'rows': int(len(ids)),
+            'built_at': built_at.isoformat(),
+            'mode': mode,
+            'build': build,
+            'ids_file': files['ids'],
+            'features_file': files['features'],
+        }
+        tmp = self._path(business_type, 'tmp.json')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self._path(business_type, 'json'))
+        self._prune(business_type, build)
+        logger.info(f"Feature store {business_type}: {len(ids)} rows ({mode})")
+
+    def _prune(self, business_type: str, current: str):
+        """Delete builds older than the current one and the KEEP_PREVIOUS_BUILDS before it"""
+        builds = sorted({
+            os.path.basename(path)[len(business_type) + 1:].rsplit('.', 2)[0]
+            for path in glob.glob(self._path(business_type, '*.ids.npy'))
+            + glob.glob(self._path(business_type, '*.features.npy'))
+        })
+        older = [build for build in builds if build < current]
+        for build in older[:max(len(older) - KEEP_PREVIOUS_BUILDS, 0)]:
+            for part in ('ids', 'features'):
+                try:
+                    os.remove(self._path(business_type, f"{build}.{part}.npy"))
+                except OSError:
+                    # Still mapped by a reader (Windows); removed on a later build
+                    pass
+
+# Global store instance
+feature_store = FeatureStore()
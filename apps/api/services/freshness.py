@@ -0,0 +1,71 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from ..config import settings
+
+# Place Details fields fetched for each group of business data
+FIELD_GROUPS: Dict[str, List[str]] = {
+    'ratings': ['rating', 'user_ratings_total'],
+    'hours': ['opening_hours'],
+    'contact': ['formatted_phone_number', 'website', 'url'],
+    'profile': ['name', 'formatted_address', 'geometry', 'types', 'price_level', 'photos'],
+}
+DETAIL_FIELDS = [f for fields in FIELD_GROUPS.values() for f in fields]
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Older rows were written with naive datetime.utcnow()
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+@dataclass
+class FreshnessPolicy:
+    """
+    Maximum age per field group before a known business is re-fetched
+
+    Each group's last refresh is kept in `Business.field_scraped_at`; groups
+    without an entry fall back to `Business.last_scraped`.
+    """
+    max_age: Dict[str, timedelta] = field(default_factory=dict)
+
+    @classmethod
+    def from_settings(cls) -> "FreshnessPolicy":
+        return cls({
+            'ratings': timedelta(days=settings.FRESHNESS_RATINGS_DAYS),
+            'hours': timedelta(days=settings.FRESHNESS_HOURS_DAYS),
+            'contact': timedelta(days=settings.FRESHNESS_CONTACT_DAYS),
+            'profile': timedelta(days=settings.FRESHNESS_PROFILE_DAYS),
+        })
+
+    def scraped_at(self, business, group: str) -> Optional[datetime]:
+        value = (business.field_scraped_at or {}).get(group)
+        if value:
+            return _utc(datetime.fromisoformat(value))
+        return _utc(business.last_scraped)
+
+    def stale_groups(self, business, now: Optional[datetime] = None) -> List[str]:
+        now = now or datetime.now(timezone.utc)
+        stale = []
+        for group in FIELD_GROUPS:
+            scraped_at = self.scraped_at(business, group)
+            if scraped_at is None or now - scraped_at > self.max_age.get(group, timedelta(0)):
+                stale.append(group)
+        return stale
+
+def detail_fields(groups: Iterable[str]) -> List[str]:
+    """Place Details fields covering `groups`"""
+    return [f for group in FIELD_GROUPS if group in groups for f in FIELD_GROUPS[group]]
+
+def mark_fresh(business, groups: Iterable[str], now: Optional[datetime] = None):
+    now = now or datetime.now(timezone.utc)
+    stamps = dict(business.field_scraped_at or {})
+    # Groups not refreshed keep the age they had through last_scraped
+    previous = _utc(business.last_scraped)
+    if previous is not None:
+        for group in FIELD_GROUPS:
+            stamps.setdefault(group, previous.isoformat())
+    stamps.update({group: now.isoformat() for group in groups})
+    # Reassign so the JSON column is flagged as changed
+    business.field_scraped_at = stamps
+    business.last_scraped = now
@@ -19,8 +19,14 @@ from bs4 import BeautifulSoup
 import requests
 
 from ..models import Business, BusinessReview, BusinessPhoto, ScrapingJob, JobStatus, BusinessType, Region
-from ..db import SessionLocal
+from ..db import ScraperSessionLocal
 from sqlalchemy import text
+from geoalchemy2.shape import to_shape
+
+from ..config import settings
+from .data_epoch import mark_business_changed
+from .freshness import DETAIL_FIELDS, FIELD_GROUPS, FreshnessPolicy, detail_fields, mark_fresh
+from .region_crawler import CrawlResult, NearbySearchError, TilingCrawler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -214,41 +220,67 @@ class GoogleMapsScraper:
             return []
         
         businesses = []
+        try:
+            places, _ = await self._nearby_search_places(query, location, radius)
+        except NearbySearchError as e:
+            logger.error(f"Google Maps API error: {e}")
+            places = e.places
+        
+        for place in places[:self.config.max_businesses_per_search]:
+            business_data = await self._extract_business_from_place(place)
+            if business_data:
+                businesses.append(business_data)
+        
+        return businesses
+    
+    async def _nearby_search_places(self, query: str, location: tuple, radius: int) -> Tuple[List[Dict], int]:
+        """
+        Raw Places nearby-search results for all pages, without place details
+        
+        Returns (places, api_calls). The API stops after 3 pages (~60 results),
+        so a full result list means the search area may hold more places. Any API
+        failure raises NearbySearchError, so a short list is never mistaken for a
+        complete one.
+        """
+        if not self.gmaps_client:
+            return [], 0
+        
+        places = []
+        calls = 0
         
         try:
-            # Text search
+            calls += 1
             places_result = self.gmaps_client.places_nearby(
                 location=location,
                 radius=radius,
                 keyword=query,
                 language='tr'
             )
-            
-            for place in places_result.get('results', []):
-                business_data = await self._extract_business_from_place(place)
-                if business_data:
-                    businesses.append(business_data)
+            places.extend(places_result.get('results', []))
             
             # Handle pagination
             next_page_token = places_result.get('next_page_token')
-            while next_page_token and len(businesses) < self.config.max_businesses_per_search:
+            while next_page_token:
                 await asyncio.sleep(2)  # Required delay for next_page_token
                 
-                places_result = self.gmaps_client.places_nearby(
-                    page_token=next_page_token
-                )
-                
-                for place in places_result.get('results', []):
-                    business_data = await self._extract_business_from_place(place)
-                    if business_data:
-                        businesses.append(business_data)
+                calls += 1
+                try:
+                    places_result = self.gmaps_client.places_nearby(page_token=next_page_token)
+                except googlemaps.exceptions.ApiError as e:
+                    if e.status != 'INVALID_REQUEST':
+                        raise
+                    # The token is not valid until shortly after it is issued; try once more
+                    await asyncio.sleep(2)
+                    calls += 1
+                    places_result = self.gmaps_client.places_nearby(page_token=next_page_token)
+                places.extend(places_result.get('results', []))
                 
                 next_page_token = places_result.get('next_page_token')
         
         except Exception as e:
-            logger.error(f"Google Maps API error: {e}")
+            raise NearbySearchError(f"Google Maps API error: {e}", calls, places) from e
         
-        return businesses
+        return places, calls
     
     async def _search_with_selenium(self, query: str, location: tuple) -> List[BusinessData]:
         """Search using Selenium for more comprehensive data"""
@@ -293,8 +325,8 @@ class GoogleMapsScraper:
         
         return businesses
     
-    async def _extract_business_from_place(self, place: Dict) -> Optional[BusinessData]:
-        """Extract business data from Google Places API result"""
+    async def _extract_business_from_place(self, place: Dict, fields: Optional[List[str]] = None) -> Optional[BusinessData]:
+        """Extract business data from Google Places API result (only `fields` if given)"""
         try:
             place_id = place.get('place_id')
             if not place_id:
@@ -303,11 +335,7 @@ class GoogleMapsScraper:
             # Get detailed place information
             details = self.gmaps_client.place(
                 place_id=place_id,
-                fields=[
-                    'name', 'formatted_address', 'formatted_phone_number',
-                    'website', 'rating', 'user_ratings_total', 'price_level',
-                    'geometry', 'opening_hours', 'photos', 'types', 'url'
-                ],
+                fields=fields or DETAIL_FIELDS,
                 language='tr'
             )
             
@@ -793,13 +821,14 @@ class ScrapingOrchestrator:
     def __init__(self, config: ScrapingConfig):
         self.config = config
         self.scraper = GoogleMapsScraper(config)
+        self.freshness = FreshnessPolicy.from_settings()
     
     async def run_kaleiçi_pilot_scraping(self) -> Dict:
         """Run the complete Kaleiçi pilot scraping operation"""
         start_time = datetime.utcnow()
         
         # Create scraping job record
-        db = SessionLocal()
+        db = ScraperSessionLocal()
         job = ScrapingJob(
             job_name="Kaleiçi Pilot Comprehensive Scraping",
             job_type="comprehensive",
@@ -885,39 +914,45 @@ class ScrapingOrchestrator:
     async def scrape_region_comprehensive(self, region: Region, business_types: List[str],
                                         search_queries: List[str], max_businesses: int,
                                         include_reviews: bool, max_reviews_per_business: int,
-                                        scrape_environmental_data: bool) -> Dict:
+                                        scrape_environmental_data: bool, db=None) -> Dict:
         """
         Comprehensive region scraping implementation
+        
+        Places are discovered with an adaptive quadtree crawl over the region
+        boundary (see TilingCrawler); details are fetched once per unique place.
+        With `db`, places are saved through ingest_places, so known businesses
+        that are still fresh cost no details call.
         """
         logger.info(f"Starting comprehensive scraping for {region.name}")
         
-        all_businesses = []
+        boundary = to_shape(region.boundary)
+        center = boundary.centroid
+        center_lat, center_lng = center.y, center.x
         
-        # Define search parameters based on region
-        center_lat, center_lng = region.center_lat, region.center_lng
-        radius = int(region.radius_km * 1000)  # Convert to meters
+        crawler = TilingCrawler(
+            self.scraper,
+            result_cap=settings.CRAWL_RESULT_CAP,
+            max_depth=settings.CRAWL_MAX_DEPTH,
+            min_tile_m=settings.CRAWL_MIN_TILE_M,
+            delay=self.config.delay_between_requests
+        )
+        crawl = CrawlResult()
+        selenium_businesses = []
         
-        # Use custom search queries first
-        for query in search_queries:
+        # Use custom search queries first, then business types
+        queries = list(search_queries) + [f"{business_type} {region.city}" for business_type in business_types]
+        for query in queries:
             logger.info(f"Scraping with query: {query}")
             
             try:
-                # Use Google Maps API if available
-                businesses_gmaps = await self._search_with_gmaps_api(
-                    query=query,
-                    location=(center_lat, center_lng),
-                    radius=radius
-                )
+                await crawler.crawl(boundary, query, crawl)
                 
-                # Use Selenium for additional data
-                businesses_selenium = await self._search_with_selenium(
-                    query=query,
-                    location=(center_lat, center_lng)
-                )
-                
-                # Combine results
-                combined = self._merge_business_data(businesses_gmaps + businesses_selenium)
-                all_businesses.extend(combined)
+                # Use Selenium for additional data on custom queries
+                if query in search_queries:
+                    selenium_businesses.extend(await self._search_with_selenium(
+                        query=query,
+                        location=(center_lat, center_lng)
+                    ))
                 
                 await asyncio.sleep(self.config.delay_between_requests)
                 
@@ -925,28 +960,22 @@ class ScrapingOrchestrator:
                 logger.error(f"Error scraping query '{query}': {e}")
                 continue
         
-        # Then search by business types
-        for business_type in business_types:
-            logger.info(f"Scraping business type: {business_type}")
-            
-            try:
-                businesses_gmaps = await self._search_with_gmaps_api(
-                    query=f"{business_type} {region.name} {region.city}",
-                    location=(center_lat, center_lng),
-                    radius=radius
-                )
-                
-                combined = self._merge_business_data(businesses_gmaps)
-                all_businesses.extend(combined)
-                
-                await asyncio.sleep(self.config.delay_between_requests)
-                
-            except Exception as e:
-                logger.error(f"Error scraping business type '{business_type}': {e}")
-                continue
+        # Place details once per unique place
+        all_businesses = []
+        ingest_stats = None
+        places = list(crawl.places.values())[:max_businesses]
+        if db is not None:
+            ingest_stats = await self.ingest_places(places, db, region.id)
+        else:
+            for place in places:
+                business_data = await self.scraper._extract_business_from_place(place)
+                if business_data:
+                    all_businesses.append(business_data)
         
         # Deduplicate results
-        unique_businesses = self._deduplicate_businesses(all_businesses)
+        unique_businesses = self._deduplicate_businesses(
+            self._merge_business_data(all_businesses + selenium_businesses)
+        )
         
         # Limit results if needed
         if len(unique_businesses) > max_businesses:
@@ -959,15 +988,117 @@ class ScrapingOrchestrator:
             'businesses_data': unique_businesses,
             'queries_used': search_queries,
             'business_types_used': business_types,
+            'crawl_stats': crawl.stats(),
+            'ingest_stats': ingest_stats,
             'region_covered': {
                 'name': region.name,
                 'center': (center_lat, center_lng),
-                'radius_km': region.radius_km
+                'bounds': boundary.bounds
             }
         }
 
-    async def _save_business_to_db(self, business_data: BusinessData, db) -> Optional[Business]:
-        """Save business data to database"""
+    async def ingest_places(self, places: List[Dict], db, region_id: Optional[int] = None,
+                            incremental: bool = settings.SCRAPE_INCREMENTAL,
+                            stats: Optional[Dict] = None) -> Dict:
+        """
+        Save discovered places, assigning new ones to `region_id`
+        
+        New places get full details. In incremental mode a known business is
+        only re-fetched for the field groups the freshness policy marks stale,
+        and only those fields are requested; ratings are taken from the search
+        result when it has them. Known businesses that are still fresh cost no
+        details call. Counts are kept in `stats` (if given) as they accrue.
+        """
+        place_ids = [place['place_id'] for place in places if place.get('place_id')]
+        known = {
+            business.google_place_id: business
+            for business in db.query(Business).filter(Business.google_place_id.in_(place_ids))
+        }
+        stats = stats if stats is not None else {}
+        stats.update({'details_fetched': 0, 'saved': 0, 'new': 0, 'updated': 0, 'skipped': 0})
+        
+        for place in places:
+            existing = known.get(place.get('place_id'))
+            groups = list(FIELD_GROUPS)
+            if existing is not None and incremental:
+                has_ratings, changed = self._apply_search_result(existing, place)
+                # Commit before advancing the epoch, so features recomputed for it see the change
+                db.commit()
+                if changed:
+                    location = place.get('geometry', {}).get('location', {})
+                    mark_business_changed(location.get('lat'), location.get('lng'))
+                if has_ratings:
+                    groups.remove('ratings')
+                stale = set(self.freshness.stale_groups(existing))
+                groups = [group for group in groups if group in stale]
+                if not groups or not existing.is_active:
+                    stats['skipped'] += 1
+                    continue
+            
+            business_data = await self.scraper._extract_business_from_place(place, detail_fields(groups))
+            stats['details_fetched'] += 1
+            if business_data:
+                business = await self._save_business_to_db(
+                    business_data, db, refresh_groups=groups if existing is not None else ()
+                )
+                if business:
+                    stats['saved'] += 1
+                    stats['updated' if existing is not None else 'new'] += 1
+                    if region_id and business.region_id is None:
+                        business.region_id = region_id
+                        db.commit()
+            
+            await asyncio.sleep(self.config.delay_between_requests)
+        
+        db.commit()
+        return stats
+    
+    def _apply_search_result(self, business: Business, place: Dict) -> Tuple[bool, bool]:
+        """
+        Refresh a known business from its search result (uncommitted)
+        
+        Returns (has_ratings, changed): whether the result carried ratings, and
+        whether ratings or the active flag changed.
+        """
+        changed = False
+        if place.get('business_status') == 'CLOSED_PERMANENTLY' and business.is_active:
+            business.is_active = False
+            changed = True
+        if place.get('user_ratings_total') is None:
+            return False, changed
+        
+        if (business.rating, business.review_count) != (place.get('rating'), place['user_ratings_total']):
+            changed = True
+        business.rating = place.get('rating')
+        business.review_count = place['user_ratings_total']
+        mark_fresh(business, ['ratings'])
+        return True, changed
+    
+    def _apply_field_groups(self, business: Business, business_data: BusinessData, groups):
+        """Copy the re-fetched field groups onto an existing business"""
+        if 'ratings' in groups:
+            business.rating = business_data.rating
+            business.review_count = business_data.review_count or 0
+        if 'hours' in groups:
+            business.hours = business_data.hours
+        if 'contact' in groups:
+            business.phone = business_data.phone
+            business.website = business_data.website
+            business.google_url = business_data.google_url
+        if 'profile' in groups:
+            if business_data.name:
+                business.name = business_data.name
+            business.business_type = BusinessType(business_data.business_type)
+            business.category = business_data.category
+            business.address = business_data.address
+            business.price_level = business_data.price_level
+            business.features = business_data.features
+            if business_data.latitude and business_data.longitude:
+                business.geom = f"POINT({business_data.longitude} {business_data.latitude})"
+        mark_fresh(business, groups)
+
+    async def _save_business_to_db(self, business_data: BusinessData, db, refresh_groups=()) -> Optional[Business]:
+        """Save business data to database; an existing business is updated for `refresh_groups`"""
         try:
             # Check if business already exists
             existing = db.query(Business).filter(
@@ -975,7 +1106,14 @@ class ScrapingOrchestrator:
             ).first()
             
             if existing:
-                logger.debug(f"Business {business_data.name} already exists")
+                if not refresh_groups:
+                    logger.debug(f"Business {business_data.name} already exists")
+                    return existing
+                
+                point = to_shape(existing.geom) if existing.geom is not None else None
+                self._apply_field_groups(existing, business_data, refresh_groups)
+                db.commit()
+                mark_business_changed(point.y if point else None, point.x if point else None)
                 return existing
             
             # Create new business record
@@ -993,9 +1131,9 @@ class ScrapingOrchestrator:
                 google_url=business_data.google_url,
                 hours=business_data.hours,
                 features=business_data.features,
-                last_scraped=datetime.utcnow(),
                 source="google_maps"
             )
+            mark_fresh(business, FIELD_GROUPS)
             
             # Set geometry if coordinates available
             if business_data.latitude and business_data.longitude:
@@ -1004,6 +1142,8 @@ class ScrapingOrchestrator:
             db.add(business)
             db.commit()
             
+            mark_business_changed(business_data.latitude, business_data.longitude)
+            
             return business
             
         except Exception as e:
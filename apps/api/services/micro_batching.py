@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions into one call of a blocking batch function
+
+    `submit` enqueues an item and waits for its result. A worker task takes
+    the first queued item, keeps collecting until `max_batch_size` items or
+    `max_wait_ms` have passed, then runs `batch_fn(items)` in the threadpool;
+    `batch_fn` must return one result per item, in order. Up to
+    `max_concurrency` batches run at once; while all are busy, arriving items
+    collect into the next batch. If a batch fails, its items are retried one by
+    one so a bad request only fails its own caller.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, name: str = "batch", max_concurrency: int = 1):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: Set[asyncio.Task] = set()
+        self._worker: Optional[asyncio.Task] = None
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._busy_s = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = loop.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: List):
+        try:
+            await self._execute_batch(batch)
+        finally:
+            self._slots.release()
+
+    async def _execute_batch(self, batch: List):
+        started = time.monotonic()
+        items = [item for item, _ in batch]
+        try:
+            results = await run_in_threadpool(self.batch_fn, items)
+            outcomes = [(result, None) for result in results]
+        except Exception as e:
+            if len(batch) == 1:
+                outcomes = [(None, e)]
+            else:
+                logger.warning(f"{self.name}: batch of {len(batch)} failed ({e}), retrying items individually")
+                outcomes = []
+                for item in items:
+                    try:
+                        outcomes.append(((await run_in_threadpool(self.batch_fn, [item]))[0], None))
+                    except Exception as item_error:
+                        outcomes.append((None, item_error))
+
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if future.done():  # caller went away (cancelled)
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        self._batches += 1
+        self._items += len(batch)
+        self._largest = max(self._largest, len(batch))
+        self._busy_s += time.monotonic() - started
+
+    def stats(self) -> Dict:
+        return {
+            'batches': self._batches,
+            'items': self._items,
+            'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+            'largest_batch': self._largest,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'busy_seconds': round(self._busy_s, 3),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'max_concurrency': self.max_concurrency,
+            'running_batches': len(self._running),
+        }
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # Let batches already handed to the threadpool deliver their results
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
@@ -1,4 +1,6 @@
 import logging
+import threading
+from collections import OrderedDict, defaultdict
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Optional, Tuple
@@ -14,48 +16,152 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import xgboost as xgb
 import lightgbm as lgb
 
-# NLP Libraries
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-from textblob import TextBlob
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-
 # Geospatial
 from geopy.distance import geodesic
 import geoalchemy2.functions as geofunc
 
-from ..models import Business, BusinessReview, Analysis, MLModel, EnvironmentalFeature, Region
-from ..db import SessionLocal
-from sqlalchemy import text, func
+from ..models import Business, BusinessReview, Analysis, MLModel, EnvironmentalFeature, Region, BusinessType
+from ..config import settings
+from ..db import SessionLocal, TrainerSessionLocal
+from .analysis_writer import analysis_writer
+from .score_cache import score_cache
+from .data_epoch import Epoch, data_epoch
+from .cell_aggregates import CellStats, ring_stats, total_stats
+from .environment_layers import environment_layers
+from .nearest_neighbors import nearest_neighbors
+from .feature_store import feature_store
+from .training_data import StreamingColumnStats, TrainingSetBuilder, feature_drift
+from .compiled_models import compile_model
+from .sentiment_aggregates import add_review_results, load_aggregates, sentiment_label, sentiment_score, summarize
+from .sentiment_backends import (
+    LexiconSentiment, TextBlobSentiment, TransformerSentiment, VaderSentiment, detect_language, load_backend
+)
+from .feature_schema import (
+    FeatureSchema, LOCATION_FEATURE_SCHEMA, FEATURE_SCHEMA_VERSION, schema_for_model,
+    COMPETITION_RINGS, DENSITY_BUSINESS_TYPES, ACCESSIBILITY_BUSINESS_TYPES,
+    TEMPORAL_COLUMNS, DEMOGRAPHIC_COLUMNS, temporal_block, demographic_block, block_row_to_dict
+)
+from sqlalchemy import text, func, select, update
 
 logger = logging.getLogger(__name__)
 
+# Candidates whose boosters can be continued with new data
+WARM_START_ALGORITHMS = ('xgboost', 'lightgbm')
+
 class FeatureEngineer:
     """Feature engineering for location analysis"""
     
-    def __init__(self):
+    def __init__(self, cache_size: int = settings.FEATURE_CACHE_SIZE,
+                 cache_precision: int = settings.FEATURE_CACHE_PRECISION):
         self.scaler = StandardScaler()
         self.label_encoders = {}
+        
+        # LRU memo of spatial features keyed by (rounded point, type, radius, data epoch)
+        self.cache_size = cache_size
+        self.cache_precision = cache_precision
+        self._feature_cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def create_location_features(self, lat: float, lng: float, business_type: str, 
                                radius: int = 500, db_session=None) -> Dict:
         """
         Create comprehensive feature set for a location
         
+        Spatial features are memoized per data epoch; demographic and temporal
+        blocks are cheap and always computed fresh.
+        
         Returns:
             Dict with all engineered features for ML model
         """
-        if not db_session:
-            db_session = SessionLocal()
+        # Callers (e.g. training) add their own keys, so always hand out a copy
+        features = dict(self._get_spatial_features(lat, lng, business_type, radius, db_session))
+        
+        # 6. Demographic Features (placeholder - would need census data)
+        features.update(self._get_demographic_features(lat, lng, radius))
+        
+        # 7. Temporal Features
+        temporal_features = self._get_temporal_features()
+        features.update(temporal_features)
+        
+        logger.info(f"Generated {len(features)} features for location ({lat}, {lng})")
+        return features
+    
+    def create_location_feature_matrix(self, points: List[Tuple[float, float]], business_type: str,
+                                       schema: FeatureSchema, radius: int = 500,
+                                       db_session=None) -> np.ndarray:
+        """
+        Feature matrix for N points in `schema` column order
         
+        Spatial features come from the per-point memo; demographic and temporal
+        columns are computed as (N, k) blocks and written straight into the matrix.
+        """
+        spatial_rows = [
+            self._get_spatial_features(lat, lng, business_type, radius, db_session)
+            for lat, lng in points
+        ]
+        X = schema.matrix(spatial_rows)
+        
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        schema.assign_block(X, DEMOGRAPHIC_COLUMNS, demographic_block(coords[:, 0], coords[:, 1], radius))
+        schema.assign_block(X, TEMPORAL_COLUMNS, temporal_block(len(points)))
+        return X
+    
+    def _get_spatial_features(self, lat: float, lng: float, business_type: str,
+                              radius: int, db_session=None) -> Dict:
+        """Memoized spatial features; the returned dict is shared and must not be mutated"""
+        # KNN trees may lag the data epoch (rebuilds are throttled); key on both
+        # so values computed from stale trees are dropped once the trees catch up
+        cache_key = (
+            round(lat, self.cache_precision), round(lng, self.cache_precision),
+            business_type, radius, data_epoch.current, self._knn_epoch()
+        )
+        with self._cache_lock:
+            spatial_features = self._feature_cache.get(cache_key)
+            if spatial_features is not None:
+                self._feature_cache.move_to_end(cache_key)
+        
+        if spatial_features is None:
+            owns_session = db_session is None
+            if owns_session:
+                db_session = SessionLocal()
+            try:
+                spatial_features = self._create_spatial_features(lat, lng, business_type, radius, db_session)
+            finally:
+                if owns_session:
+                    db_session.close()
+            
+            with self._cache_lock:
+                self._feature_cache[cache_key] = spatial_features
+                while len(self._feature_cache) > self.cache_size:
+                    self._feature_cache.popitem(last=False)
+        
+        return spatial_features
+    
+    def clear_cache(self):
+        with self._cache_lock:
+            self._feature_cache.clear()
+    
+    def _create_spatial_features(self, lat: float, lng: float, business_type: str,
+                                 radius: int, db_session) -> Dict:
+        """Features derived from business data around the point (cacheable)"""
         features = {}
         
+        # Ring statistics for competition/density from per-cell rollups (one pass for all rings)
+        ring_data = None
+        if settings.FEATURE_CELL_AGGREGATES:
+            radii = [r for r in COMPETITION_RINGS if r <= radius] + [radius]
+            try:
+                ring_data = ring_stats(db_session, lat, lng, radii)
+            except Exception as e:
+                logger.warning(f"Cell aggregates unavailable, scanning businesses instead: {e}")
+                db_session.rollback()
+        
         # 1. Competition Features
-        competition_features = self._get_competition_features(lat, lng, business_type, radius, db_session)
+        competition_features = self._get_competition_features(lat, lng, business_type, radius, db_session, ring_data)
         features.update(competition_features)
         
         # 2. Density Features  
-        density_features = self._get_density_features(lat, lng, radius, db_session)
+        density_features = self._get_density_features(lat, lng, radius, db_session, ring_data)
         features.update(density_features)
         
         # 3. Quality Features
@@ -70,19 +176,10 @@ class FeatureEngineer:
         environmental_features = self._get_environmental_features(lat, lng, radius, db_session)
         features.update(environmental_features)
         
-        # 6. Demographic Features (placeholder - would need census data)
-        demographic_features = self._get_demographic_features(lat, lng, radius)
-        features.update(demographic_features)
-        
-        # 7. Temporal Features
-        temporal_features = self._get_temporal_features()
-        features.update(temporal_features)
-        
-        logger.info(f"Generated {len(features)} features for location ({lat}, {lng})")
         return features
     
     def _get_competition_features(self, lat: float, lng: float, business_type: str, 
-                                 radius: int, db_session) -> Dict:
+                                 radius: int, db_session, ring_data: Optional[Dict] = None) -> Dict:
         """Competition analysis features"""
         features = {}
         
@@ -90,9 +187,17 @@ class FeatureEngineer:
         point = f"ST_SetSRID(ST_MakePoint({lng}, {lat}), 4326)"
         
         # Same type competitors in different radii
-        for r in [100, 250, 500, 750, 1000]:
+        for r in COMPETITION_RINGS:
             if r > radius:
                 continue
+            
+            if ring_data is not None:
+                ring = ring_data[r].get(business_type, CellStats())
+                features[f'competitors_{r}m'] = ring.count
+                features[f'avg_competitor_rating_{r}m'] = ring.avg_rating
+                features[f'avg_competitor_reviews_{r}m'] = ring.avg_reviews
+                features[f'total_competitor_reviews_{r}m'] = ring.reviews_sum
+                continue
                 
             query = text(f"""
                 SELECT COUNT(*) as count,
@@ -126,10 +231,30 @@ class FeatureEngineer:
         
         return features
     
-    def _get_density_features(self, lat: float, lng: float, radius: int, db_session) -> Dict:
+    def _get_density_features(self, lat: float, lng: float, radius: int, db_session,
+                              ring_data: Optional[Dict] = None) -> Dict:
         """Business density features"""
         features = {}
         
+        # One-hot encode business types in area (every type always gets both columns)
+        business_types = DENSITY_BUSINESS_TYPES
+        for bt in business_types:
+            features[f'has_{bt}_nearby'] = 0
+            features[f'count_{bt}_nearby'] = 0
+        
+        if ring_data is not None:
+            type_stats = {bt: s for bt, s in ring_data[radius].items() if s.count > 0}
+            total = total_stats(type_stats)
+            features['total_businesses'] = total.count
+            features['business_type_diversity'] = len(type_stats)
+            features['avg_area_rating'] = total.avg_rating
+            features['total_area_reviews'] = total.reviews_sum
+            for bt in business_types:
+                if bt in type_stats:
+                    features[f'has_{bt}_nearby'] = 1
+                    features[f'count_{bt}_nearby'] = type_stats[bt].count
+            return features
+        
         point = f"ST_SetSRID(ST_MakePoint({lng}, {lat}), 4326)"
         
         # Total business density
@@ -161,13 +286,9 @@ class FeatureEngineer:
         
         category_results = db_session.execute(category_query).fetchall()
         
-        # One-hot encode business types in area
-        business_types = ['restaurant', 'cafe', 'retail', 'hotel', 'bank', 'hospital', 'school']
-        for bt in business_types:
-            features[f'has_{bt}_nearby'] = 0
-        
         for result in category_results:
-            bt = result.business_type
+            # Enum labels are stored as member names ("RESTAURANT")
+            bt = str(result.business_type).lower()
             if bt in business_types:
                 features[f'has_{bt}_nearby'] = 1
                 features[f'count_{bt}_nearby'] = result.count
@@ -211,21 +332,28 @@ class FeatureEngineer:
         point = f"ST_SetSRID(ST_MakePoint({lng}, {lat}), 4326)"
         
         # Transportation related businesses
-        transport_types = ['gas_station', 'bank']  # Proxy for accessibility
-        
-        for transport_type in transport_types:
-            query = text(f"""
-                SELECT COUNT(*) as count,
-                       MIN(ST_Distance(geom::geography, ({point})::geography)) as min_distance
-                FROM businesses 
-                WHERE business_type = :transport_type
-                AND ST_DWithin(geom::geography, ({point})::geography, {radius * 2})
-                AND is_active = true
-            """)
-            
-            result = db_session.execute(query, {"transport_type": transport_type}).first()
-            features[f'{transport_type}_count'] = result.count or 0
-            features[f'distance_to_nearest_{transport_type}'] = result.min_distance or radius * 2
+        transport_types = ACCESSIBILITY_BUSINESS_TYPES
+        
+        knn_features = self._get_knn_features(lat, lng, transport_types, radius * 2)
+        if knn_features is not None:
+            for transport_type in transport_types:
+                count, distance = knn_features[transport_type]
+                features[f'{transport_type}_count'] = count
+                features[f'distance_to_nearest_{transport_type}'] = distance
+        else:
+            for transport_type in transport_types:
+                query = text(f"""
+                    SELECT COUNT(*) as count,
+                           MIN(ST_Distance(geom::geography, ({point})::geography)) as min_distance
+                    FROM businesses 
+                    WHERE business_type = :transport_type
+                    AND ST_DWithin(geom::geography, ({point})::geography, {radius * 2})
+                    AND is_active = true
+                """)
+                
+                result = db_session.execute(query, {"transport_type": transport_type}).first()
+                features[f'{transport_type}_count'] = result.count or 0
+                features[f'distance_to_nearest_{transport_type}'] = result.min_distance or radius * 2
         
         # Accessibility score (inverse of distance to important services)
         important_services = features.get('bank_count', 0) + features.get('gas_station_count', 0)
@@ -237,23 +365,28 @@ class FeatureEngineer:
         """Environmental context features"""
         features = {}
         
-        # This would be enhanced with actual environmental data
-        # For now, using business types as proxies
-        
         point = f"ST_SetSRID(ST_MakePoint({lng}, {lat}), 4326)"
         
-        # Green spaces (parks)
-        parks_query = text(f"""
-            SELECT COUNT(*) as park_count,
-                   MIN(ST_Distance(geom::geography, ({point})::geography)) as nearest_park_distance
-            FROM businesses 
-            WHERE business_type = 'park'
-            AND ST_DWithin(geom::geography, ({point})::geography, {radius * 3})
-        """)
-        
-        result = db_session.execute(parks_query).first()
-        features['nearby_parks'] = result.park_count or 0
-        features['distance_to_park'] = result.nearest_park_distance or radius * 3
+        # Green spaces (parks): OSM layer when installed, park-typed businesses as proxy otherwise
+        if environment_layers.has('parks'):
+            features['nearby_parks'] = environment_layers.count_features('parks', lat, lng, radius * 3)
+            features['distance_to_park'] = environment_layers.nearest_distance('parks', lat, lng)
+        else:
+            knn_features = self._get_knn_features(lat, lng, ['park'], radius * 3)
+            if knn_features is not None:
+                features['nearby_parks'], features['distance_to_park'] = knn_features['park']
+            else:
+                parks_query = text(f"""
+                    SELECT COUNT(*) as park_count,
+                           MIN(ST_Distance(geom::geography, ({point})::geography)) as nearest_park_distance
+                    FROM businesses 
+                    WHERE business_type = 'park'
+                    AND ST_DWithin(geom::geography, ({point})::geography, {radius * 3})
+                """)
+                
+                result = db_session.execute(parks_query).first()
+                features['nearby_parks'] = result.park_count or 0
+                features['distance_to_park'] = result.nearest_park_distance or radius * 3
         
         # Cultural attractions (museums, etc.)
         cultural_query = text(f"""
@@ -270,157 +403,265 @@ class FeatureEngineer:
         busy_businesses = features.get('restaurant_count_nearby', 0) + features.get('cafe_count_nearby', 0)
         features['estimated_noise_level'] = min(busy_businesses / 10, 1.0)
         
+        # Transit, coastline and road network from the OSM layers
+        features.update(environment_layers.features(lat, lng, radius))
+        
         return features
     
-    def _get_demographic_features(self, lat: float, lng: float, radius: int) -> Dict:
-        """Demographic features (would need external census data)"""
-        # Placeholder implementation
-        # In production, integrate with census/demographic APIs
-        
-        features = {
-            'population_density_estimate': 1000,  # people per km2
-            'avg_income_estimate': 50000,  # annual income estimate
-            'age_group_young_adult_ratio': 0.3,  # 18-35 age group
-            'age_group_middle_age_ratio': 0.4,   # 35-55 age group
-            'age_group_senior_ratio': 0.3,       # 55+ age group
-            'education_level_university_ratio': 0.4,
-            'tourism_factor': 0.7 if 'kaleiçi' in str(lat) else 0.3,  # Tourism intensity
-        }
+    def _knn_epoch(self) -> Optional[Epoch]:
+        """Data epoch of the served KD-trees; None when the index is disabled or unavailable"""
+        if not settings.FEATURE_KNN:
+            return None
+        try:
+            return nearest_neighbors.built_epoch()
+        except Exception as e:
+            logger.warning(f"Nearest-neighbor index unavailable, using SQL: {e}")
+            return None
+    
+    def _get_knn_features(self, lat: float, lng: float, categories, radius: float) -> Optional[Dict]:
+        """
+        {category: (count within radius, exact nearest distance)} from the KD-tree index
         
-        return features
+        Returns None when the index is disabled or unavailable so callers fall back to SQL.
+        """
+        if not settings.FEATURE_KNN:
+            return None
+        try:
+            result = {}
+            for category in categories:
+                count = int(nearest_neighbors.count_within(category, lat, lng, radius)[0])
+                distance = min(nearest_neighbors.nearest_distance(category, lat, lng), settings.KNN_MAX_DISTANCE_M)
+                result[category] = (count, distance)
+            return result
+        except Exception as e:
+            logger.warning(f"Nearest-neighbor index unavailable, using SQL: {e}")
+            return None
+    
+    def _get_demographic_features(self, lat: float, lng: float, radius: int) -> Dict:
+        """Demographic features sampled from the local demographic grid within the radius"""
+        block = demographic_block(np.array([lat]), np.array([lng]), radius)
+        return block_row_to_dict(DEMOGRAPHIC_COLUMNS, block)
     
     def _get_temporal_features(self) -> Dict:
         """Time-based features"""
-        now = datetime.now()
-        
-        features = {
-            'month': now.month,
-            'day_of_week': now.weekday(),
-            'hour': now.hour,
-            'is_weekend': 1 if now.weekday() >= 5 else 0,
-            'is_summer_season': 1 if now.month in [6, 7, 8, 9] else 0,  # Tourism season
-            'is_business_hours': 1 if 8 <= now.hour <= 22 else 0,
-        }
-        
-        return features
+        return block_row_to_dict(TEMPORAL_COLUMNS, temporal_block(1))
 
 class SentimentAnalyzer:
     """Analyze business review sentiments"""
     
-    def __init__(self):
-        # Initialize sentiment analysis models
-        try:
-            self.turkish_sentiment = pipeline(
-                "sentiment-analysis", 
-                model="savasy/bert-base-turkish-sentiment-cased"
-            )
-        except:
-            logger.warning("Turkish BERT model not available, using TextBlob")
-            self.turkish_sentiment = None
-        
-        # Initialize NLTK sentiment analyzer
+    def __init__(self, backend: str = settings.SENTIMENT_BACKEND,
+                 multilingual_model: str = settings.SENTIMENT_MULTILINGUAL_MODEL):
+        # Models are loaded on first use, so processes that never analyze
+        # reviews (API workers delegating to the prediction server) don't hold them
+        self.backend_name = backend
+        self.multilingual_model = multilingual_model
+        self._models: Dict[str, object] = {}
+        self._load_lock = threading.Lock()
+        self.textblob = TextBlobSentiment()
+    
+    def _model(self, route: str):
+        """Sentiment model for a route; None when it is not configured or cannot be loaded"""
+        if route not in self._models:
+            with self._load_lock:
+                if route not in self._models:
+                    self._models[route] = self._load_route_model(route)
+        return self._models[route]
+    
+    def _load_route_model(self, route: str):
         try:
-            nltk.download('vader_lexicon', quiet=True)
-            self.vader = SentimentIntensityAnalyzer()
-        except:
-            self.vader = None
+            if route == 'turkish':
+                return load_backend(self.backend_name)
+            if route == 'english':
+                return VaderSentiment()
+            if route == 'multilingual' and self.multilingual_model:
+                return TransformerSentiment(self.multilingual_model, batch_size=settings.SENTIMENT_BATCH_SIZE)
+        except Exception as e:
+            logger.warning(f"Sentiment model for {route} reviews not available ({e})")
+            if route == 'turkish':
+                return LexiconSentiment()
+        return None
+    
+    @property
+    def backend(self):
+        """Primary (Turkish) sentiment model, SENTIMENT_BACKEND"""
+        return self._model('turkish')
+    
+    def _route(self, language: str) -> str:
+        """Model route for a detected review language"""
+        if language in ('tr', 'unknown'):
+            return 'turkish'  # undetectable (short) reviews follow the local majority
+        if language == 'en':
+            return 'english'
+        return 'multilingual'
     
     def analyze_business_reviews(self, business_id: int, db_session=None) -> Dict:
         """Analyze all reviews for a business"""
-        if not db_session:
+        return self.analyze_businesses_reviews([business_id], db_session)[business_id]
+    
+    def analyze_businesses_reviews(self, business_ids: List[int], db_session=None) -> Dict[int, Dict]:
+        """
+        Sentiment summaries of several businesses
+        
+        Reviews not processed yet are scored first (one model pass over their
+        texts); the summaries are then read from the running aggregates.
+        """
+        owns_session = db_session is None
+        if owns_session:
             db_session = SessionLocal()
         
-        # Get reviews
-        reviews = db_session.query(BusinessReview).filter(
-            BusinessReview.business_id == business_id,
-            BusinessReview.text.isnot(None)
-        ).all()
+        try:
+            self.process_pending_reviews(business_ids, db_session)
+            aggregates = load_aggregates(db_session, business_ids)
+        finally:
+            if owns_session:
+                db_session.close()
         
-        if not reviews:
-            return self._empty_sentiment_result()
+        return {
+            business_id: self._summary_from_aggregate(aggregates.get(business_id))
+            for business_id in business_ids
+        }
+    
+    def process_pending_reviews(self, business_ids: Optional[List[int]] = None, db_session=None,
+                                limit: Optional[int] = None) -> int:
+        """
+        Score unprocessed reviews and fold them into the business aggregates
         
-        sentiments = []
-        topics = []
+        Per-review score, label, topics and language are stored and the review
+        is marked processed in the same transaction as the aggregate update, in
+        chunks of SENTIMENT_PROCESS_CHUNK_SIZE. Rows locked by a concurrent
+        processor are skipped. Returns the number of reviews processed.
+        """
+        owns_session = db_session is None
+        if owns_session:
+            db_session = SessionLocal()
         
-        for review in reviews:
-            if not review.text or len(review.text.strip()) < 10:
+        processed = 0
+        try:
+            while limit is None or processed < limit:
+                chunk_size = settings.SENTIMENT_PROCESS_CHUNK_SIZE
+                if limit is not None:
+                    chunk_size = min(chunk_size, limit - processed)
+                
+                query = select(BusinessReview.id, BusinessReview.business_id, BusinessReview.text).where(
+                    BusinessReview.is_processed.isnot(True)
+                )
+                if business_ids is not None:
+                    query = query.where(BusinessReview.business_id.in_(business_ids))
+                reviews = db_session.execute(
+                    query.order_by(BusinessReview.id).limit(chunk_size).with_for_update(skip_locked=True)
+                ).all()
+                if not reviews:
+                    break
+                
+                self._process_review_chunk(reviews, db_session)
+                db_session.commit()
+                processed += len(reviews)
+                if len(reviews) < chunk_size:
+                    break
+        except Exception:
+            db_session.rollback()
+            raise
+        finally:
+            if owns_session:
+                db_session.close()
+        
+        if processed:
+            logger.info(f"Processed sentiment of {processed} reviews")
+        return processed
+    
+    def _process_review_chunk(self, reviews: List, db_session):
+        scored = [r for r in reviews if r.text and len(r.text.strip()) >= 10]
+        sentiments = self._analyze_texts([r.text for r in scored])
+        
+        review_updates = []
+        per_business = defaultdict(list)
+        for review, sentiment in zip(scored, sentiments):
+            if sentiment['compound'] is None:
+                # Unsupported language: keep the detected language, leave it out of the aggregates
+                review_updates.append({
+                    'id': review.id,
+                    'sentiment_score': None,
+                    'sentiment_label': None,
+                    'topics': None,
+                    'language': sentiment['language'],
+                    'is_processed': True
+                })
                 continue
-            
-            # Analyze sentiment
-            sentiment = self._analyze_single_review(review.text)
-            sentiments.append(sentiment)
-            
+            compound = float(sentiment['compound'])
+            label = sentiment_label(compound)
             # Extract topics/keywords
-            review_topics = self._extract_topics(review.text)
-            topics.extend(review_topics)
-        
-        if not sentiments:
+            topics = self._extract_topics(review.text)
+            review_updates.append({
+                'id': review.id,
+                'sentiment_score': compound,
+                'sentiment_label': label,
+                'topics': topics,
+                'language': sentiment.get('language', 'tr'),
+                'is_processed': True
+            })
+            per_business[review.business_id].append((compound, label, topics))
+        
+        if review_updates:
+            db_session.execute(update(BusinessReview), review_updates)
+        # Reviews without usable text are marked processed but not aggregated
+        skipped = [r.id for r in reviews if not (r.text and len(r.text.strip()) >= 10)]
+        if skipped:
+            db_session.execute(
+                update(BusinessReview).where(BusinessReview.id.in_(skipped)).values(is_processed=True)
+            )
+        add_review_results(db_session, per_business)
+    
+    def _summary_from_aggregate(self, aggregate) -> Dict:
+        """Business-level sentiment summary from its running aggregate"""
+        if aggregate is None or not aggregate.review_count:
             return self._empty_sentiment_result()
         
-        # Aggregate results
-        avg_sentiment = np.mean([s['compound'] for s in sentiments])
-        sentiment_distribution = {
-            'positive': len([s for s in sentiments if s['compound'] > 0.1]),
-            'negative': len([s for s in sentiments if s['compound'] < -0.1]),
-            'neutral': len([s for s in sentiments if -0.1 <= s['compound'] <= 0.1])
-        }
-        
-        # Topic analysis
-        from collections import Counter
-        topic_counter = Counter(topics)
-        top_topics = dict(topic_counter.most_common(10))
-        
-        return {
-            'avg_sentiment': avg_sentiment,
-            'sentiment_distribution': sentiment_distribution,
-            'total_reviews_analyzed': len(sentiments),
-            'top_topics': top_topics,
-            'sentiment_score': self._calculate_business_sentiment_score(
-                avg_sentiment, sentiment_distribution, len(sentiments)
-            )
-        }
+        return summarize(
+            aggregate.review_count, aggregate.sentiment_sum,
+            aggregate.positive_count, aggregate.negative_count, aggregate.neutral_count,
+            aggregate.topic_counts
+        )
     
     def _analyze_single_review(self, text: str) -> Dict:
         """Analyze sentiment of a single review"""
-        sentiment_scores = {'compound': 0, 'pos': 0, 'neu': 0, 'neg': 0}
-        
-        # Try Turkish BERT model first
-        if self.turkish_sentiment:
-            try:
-                result = self.turkish_sentiment(text[:512])  # BERT input limit
-                if result[0]['label'] == 'POSITIVE':
-                    sentiment_scores['compound'] = result[0]['score']
-                    sentiment_scores['pos'] = result[0]['score']
-                else:
-                    sentiment_scores['compound'] = -result[0]['score']
-                    sentiment_scores['neg'] = result[0]['score']
-            except Exception as e:
-                logger.warning(f"Turkish sentiment analysis failed: {e}")
-        
-        # Fallback to VADER
-        if sentiment_scores['compound'] == 0 and self.vader:
-            try:
-                scores = self.vader.polarity_scores(text)
-                sentiment_scores = scores
-            except Exception as e:
-                logger.warning(f"VADER sentiment analysis failed: {e}")
-        
-        # Last fallback to TextBlob
-        if sentiment_scores['compound'] == 0:
-            try:
-                blob = TextBlob(text)
-                polarity = blob.sentiment.polarity
-                sentiment_scores['compound'] = polarity
-                if polarity > 0:
-                    sentiment_scores['pos'] = polarity
-                elif polarity < 0:
-                    sentiment_scores['neg'] = abs(polarity)
-                else:
-                    sentiment_scores['neu'] = 1.0
-            except:
-                pass
+        return self._analyze_texts([text])[0]
+    
+    def _analyze_texts(self, texts: List[str]) -> List[Dict]:
+        """
+        Analyze sentiment of many reviews
         
-        return sentiment_scores
+        Reviews are grouped by detected language and each group runs through a
+        single model: Turkish -> SENTIMENT_BACKEND, English -> VADER, others ->
+        SENTIMENT_MULTILINGUAL_MODEL. TextBlob covers a Turkish or English group
+        whose model fails. Other languages without a working model are left
+        unscored (compound None) rather than scored ~0 by an English lexicon.
+        """
+        if settings.SENTIMENT_LANGUAGE_ROUTING:
+            languages = [detect_language(text) for text in texts]
+        else:
+            languages = ['tr'] * len(texts)
+        
+        groups = defaultdict(list)
+        for i, language in enumerate(languages):
+            groups[self._route(language)].append(i)
+        
+        results: List[Optional[Dict]] = [None] * len(texts)
+        for route, indexes in groups.items():
+            batch = [texts[i] for i in indexes]
+            model = self._model(route)
+            scores = None
+            if model is not None:
+                try:
+                    scores = model.predict(batch)
+                except Exception as e:
+                    logger.warning(f"Sentiment analysis of {route} reviews failed: {e}")
+            if scores is None and route == 'multilingual':
+                scores = [{'compound': None}] * len(batch)
+            elif scores is None:
+                scores = self.textblob.predict(batch)
+            for i, sentiment_scores in zip(indexes, scores):
+                results[i] = {**sentiment_scores, 'language': languages[i]}
+        return results
     
     def _extract_topics(self, text: str) -> List[str]:
         """Extract topics/keywords from review text"""
@@ -450,28 +691,7 @@ class SentimentAnalyzer:
     def _calculate_business_sentiment_score(self, avg_sentiment: float, 
                                           distribution: Dict, total_reviews: int) -> float:
         """Calculate overall sentiment score for business (0-10 scale)"""
-        if total_reviews == 0:
-            return 5.0  # Neutral default
-        
-        # Base score from average sentiment (-1 to 1 -> 0 to 10)
-        base_score = (avg_sentiment + 1) * 5
-        
-        # Adjust for review volume (more reviews = more reliable)
-        confidence_multiplier = min(total_reviews / 20, 1.0)  # Max confidence at 20+ reviews
-        
-        # Adjust for distribution balance
-        pos_ratio = distribution['positive'] / total_reviews
-        neg_ratio = distribution['negative'] / total_reviews
-        
-        if pos_ratio > 0.7:  # Overwhelmingly positive
-            adjustment = 0.5
-        elif neg_ratio > 0.5:  # Mostly negative
-            adjustment = -0.5
-        else:
-            adjustment = 0
-        
-        final_score = base_score + (adjustment * confidence_multiplier)
-        return max(0, min(10, final_score))  # Clamp to 0-10
+        return sentiment_score(avg_sentiment, distribution, total_reviews)
     
     def _empty_sentiment_result(self) -> Dict:
         """Return empty sentiment analysis result"""
@@ -486,20 +706,40 @@ class SentimentAnalyzer:
 class LocationScoringModel:
     """ML model for scoring location potential"""
     
-    def __init__(self):
+    def __init__(self, feature_engineer: Optional[FeatureEngineer] = None,
+                 sentiment_analyzer: Optional[SentimentAnalyzer] = None):
         self.models = {}
-        self.feature_engineer = FeatureEngineer()
-        self.sentiment_analyzer = SentimentAnalyzer()
+        self.feature_engineer = feature_engineer or FeatureEngineer()
+        self.sentiment_analyzer = sentiment_analyzer or SentimentAnalyzer()
         
-    def train_model(self, business_type: str, region_id: Optional[int] = None) -> Dict:
-        """Train ML model for specific business type"""
-        logger.info(f"Training model for {business_type}")
+    def train_model(self, business_type: str, region_id: Optional[int] = None, mode: str = "auto") -> Dict:
+        """
+        Train ML model for specific business type
         
-        db_session = SessionLocal()
+        mode "auto" continues boosting the active gradient-boosted model on
+        businesses changed since it was trained, falling back to a full retrain
+        when that is not possible or the new data has drifted; "full" always
+        retrains every candidate from scratch.
+        """
+        logger.info(f"Training model for {business_type} (mode={mode})")
+        
+        # Trainer pool: long feature queries must not hold API connections
+        db_session = TrainerSessionLocal()
         
         try:
-            # Get training data
-            X, y = self._prepare_training_data(business_type, region_id, db_session)
+            if mode == "auto":
+                try:
+                    result = self._train_incremental(business_type, region_id, db_session)
+                except Exception as e:
+                    logger.warning(f"Incremental update failed, retraining {business_type}: {e}")
+                    db_session.rollback()
+                    result = None
+                if result is not None:
+                    return result
+            
+            # Get training data (columns in declared schema order)
+            schema = LOCATION_FEATURE_SCHEMA
+            X, y, feature_stats = self._prepare_training_data(business_type, region_id, db_session)
             
             if len(X) < 50:
                 raise ValueError(f"Insufficient training data: {len(X)} samples")
@@ -549,15 +789,18 @@ class LocationScoringModel:
                 algorithm=best_model_name,
                 version="1.0",
                 training_data_size=len(X),
-                feature_count=len(X.columns),
+                feature_count=len(schema),
+                feature_schema_version=schema.version,
                 training_region_ids=[region_id] if region_id else None,
                 accuracy=best_score,
                 precision=results[best_model_name]['rmse'],
                 recall=results[best_model_name]['mae'],
                 f1_score=best_score,
                 model_file_path=model_path,
-                feature_names=list(X.columns),
-                feature_importance=self._get_feature_importance(best_model, X.columns),
+                feature_names=list(schema.columns),
+                feature_importance=self._get_feature_importance(best_model, schema.columns),
+                feature_stats=feature_stats.to_dict(schema.columns),
+                training_mode="full",
                 is_active=True,
                 hyperparameters=best_model.get_params(),
                 trained_at=datetime.utcnow()
@@ -566,12 +809,7 @@ class LocationScoringModel:
             db_session.add(ml_model_record)
             db_session.commit()
             
-            # Store model in memory
-            self.models[business_type] = {
-                'model': best_model,
-                'feature_names': list(X.columns),
-                'scaler': self.feature_engineer.scaler
-            }
+            self._activate_model(business_type, best_model, ml_model_record.id, schema)
             
             logger.info(f"Model trained successfully: {best_model_name} with R² = {best_score:.3f}")
             
@@ -580,8 +818,9 @@ class LocationScoringModel:
                 'model_type': best_model_name,
                 'r2_score': best_score,
                 'training_samples': len(X),
-                'feature_count': len(X.columns),
+                'feature_count': len(schema),
                 'model_id': ml_model_record.id,
+                'training_mode': 'full',
                 'results': results
             }
             
@@ -593,141 +832,353 @@ class LocationScoringModel:
         finally:
             db_session.close()
     
-    def predict_location_score(self, lat: float, lng: float, business_type: str) -> Dict:
-        """Predict location score for given coordinates"""
+    def _train_incremental(self, business_type: str, region_id: Optional[int], db_session) -> Optional[Dict]:
+        """
+        Continue boosting the active model with businesses changed since it was trained
         
-        # Generate features
-        db_session = SessionLocal()
-        features = self.feature_engineer.create_location_features(lat, lng, business_type, db_session=db_session)
+        Returns None when a full retrain is needed: no warm-startable parent,
+        a different feature schema, too much new data, or drift above
+        TRAINING_DRIFT_THRESHOLD.
+        """
+        schema = LOCATION_FEATURE_SCHEMA
+        parent = self._active_model_record(business_type, db_session)
+        if (parent is None or parent.algorithm not in WARM_START_ALGORITHMS
+                or parent.feature_schema_version != schema.version
+                or not parent.feature_stats or parent.trained_at is None):
+            return None
+        
+        builder = TrainingSetBuilder(
+            self.feature_engineer, self._calculate_success_score,
+            chunk_size=settings.TRAINING_CHUNK_SIZE
+        )
+        new_count = builder.count(business_type, region_id, db_session, updated_since=parent.trained_at)
+        if new_count < settings.INCREMENTAL_MIN_SAMPLES:
+            logger.info(f"{new_count} changed {business_type} businesses since model {parent.id}, keeping it")
+            return {
+                'success': True,
+                'model_type': parent.algorithm,
+                'r2_score': parent.accuracy,
+                'training_samples': 0,
+                'feature_count': len(schema),
+                'model_id': parent.id,
+                'training_mode': 'unchanged'
+            }
+        if new_count > (parent.training_data_size or 0) * settings.INCREMENTAL_MAX_NEW_FRACTION:
+            logger.info(f"{new_count} changed businesses exceed the incremental limit, retraining")
+            return None
         
-        # Load model if not in memory
-        if business_type not in self.models:
-            self._load_model(business_type, db_session)
+        try:
+            prior = joblib.load(parent.model_file_path)
+        except Exception as e:
+            logger.warning(f"Cannot load parent model {parent.id} for warm start: {e}")
+            return None
+        
+        feature_session = TrainerSessionLocal()
+        try:
+            X, y, stats = builder.build(
+                business_type, region_id, db_session, feature_session,
+                stored=self._load_stored_features(business_type), updated_since=parent.trained_at
+            )
+        finally:
+            feature_session.close()
         
-        if business_type not in self.models:
-            # Fallback to rule-based scoring
-            return self._rule_based_scoring(features)
+        # Time-of-training columns always differ between runs, so they don't count as drift
+        drift = feature_drift(parent.feature_stats, stats, schema.columns, ignore=TEMPORAL_COLUMNS)
+        if drift > settings.TRAINING_DRIFT_THRESHOLD:
+            logger.info(f"Feature drift {drift:.2f} above threshold, retraining {business_type}")
+            return None
         
-        # ML prediction
-        model_data = self.models[business_type]
-        model = model_data['model']
-        feature_names = model_data['feature_names']
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        params = prior.get_params()
+        params['n_estimators'] = settings.INCREMENTAL_BOOST_ROUNDS
+        model = type(prior)(**params)
+        if parent.algorithm == 'xgboost':
+            model.fit(X_train, y_train, xgb_model=prior.get_booster())
+        else:
+            model.fit(X_train, y_train, init_model=prior.booster_)
+        
+        y_pred = model.predict(X_test)
+        score = r2_score(y_test, y_pred)
+        prior_score = r2_score(y_test, self._predict_raw({'model': prior, 'feature_names': schema.columns}, X_test))
+        if score < prior_score:
+            logger.info(f"Warm-started model scored {score:.3f} < parent {prior_score:.3f} on new data, keeping parent")
+            return {
+                'success': True,
+                'model_type': parent.algorithm,
+                'r2_score': prior_score,
+                'training_samples': len(X),
+                'feature_count': len(schema),
+                'model_id': parent.id,
+                'training_mode': 'rejected'
+            }
+        
+        model_path = f"models/{business_type}_{parent.algorithm}_{datetime.now().strftime('%Y%m%d%H%M%S')}_incr.joblib"
+        joblib.dump(model, model_path)
+        
+        # The window mostly re-covers rows the parent saw, so don't add it to the parent's size;
+        # record the training population the model now reflects (base of the new-fraction guard)
+        training_data_size = builder.count(business_type, region_id, db_session)
+        
+        record = MLModel(
+            name=parent.name,
+            model_type=parent.model_type,
+            algorithm=parent.algorithm,
+            version=parent.version,
+            training_data_size=training_data_size,
+            feature_count=len(schema),
+            feature_schema_version=schema.version,
+            training_region_ids=parent.training_region_ids,
+            accuracy=score,
+            precision=np.sqrt(mean_squared_error(y_test, y_pred)),
+            recall=mean_absolute_error(y_test, y_pred),
+            f1_score=score,
+            model_file_path=model_path,
+            feature_names=list(schema.columns),
+            feature_importance=self._get_feature_importance(model, schema.columns),
+            # Drift stays measured against the last full training set
+            feature_stats=parent.feature_stats,
+            parent_model_id=parent.id,
+            training_mode="incremental",
+            is_active=True,
+            hyperparameters=model.get_params(),
+            trained_at=datetime.utcnow()
+        )
+        parent.is_active = False
+        db_session.add(record)
+        db_session.commit()
         
-        # Prepare feature vector
-        X = pd.DataFrame([features])[feature_names].fillna(0)
+        self._activate_model(business_type, model, record.id, schema)
         
-        # Predict
-        raw_score = model.predict(X)[0]
+        logger.info(f"Incremental update of model {parent.id}: {len(X)} new samples, R² = {score:.3f}, drift {drift:.2f}")
+        
+        return {
+            'success': True,
+            'model_type': parent.algorithm,
+            'r2_score': score,
+            'training_samples': len(X),
+            'feature_count': len(schema),
+            'model_id': record.id,
+            'training_mode': 'incremental',
+            'drift': drift
+        }
+    
+    def _activate_model(self, business_type: str, model, model_id: int, schema: FeatureSchema):
+        """Serve a newly trained model from memory"""
+        self.models[business_type] = {
+            'model': model,
+            'model_id': model_id,
+            'feature_names': list(schema.columns),
+            'schema': schema,
+            'predict': self._compile(model, schema),
+            'scaler': self.feature_engineer.scaler
+        }
         
+        # Scores computed with the previous model are stale now
+        score_cache.invalidate_business_type(business_type)
+    
+    def predict_location_score(self, lat: float, lng: float, business_type: str, radius: int = 500) -> Dict:
+        """Predict location score for given coordinates"""
+        return self.predict_location_scores([(lat, lng, business_type, radius)])[0]
+    
+    def predict_location_scores(self, requests: List[Tuple[float, float, str, int]]) -> List[Dict]:
+        """
+        Predict scores for many (lat, lng, business_type, radius) requests
+        
+        Cached scores are returned directly; the remaining requests of each
+        business type share a single model call.
+        """
+        return self.score_prepared(self.prepare_location_scores(requests))
+    
+    def prepare_location_scores(self, requests: List[Tuple[float, float, str, int]]) -> List[Dict]:
+        """
+        Cache lookup and feature computation for score requests (the database-bound part)
+        
+        Each item carries either `result` (cache hit) or the `features` to score
+        with `score_prepared`. Items don't depend on each other, so concurrent
+        requests can prepare in parallel and only share the model call.
+        """
+        # Apply business writes of other processes (scraper, crawl scheduler) before using caches
+        data_epoch.sync()
+        
+        prepared = []
+        db_session = SessionLocal()
+        try:
+            for lat, lng, business_type, radius in requests:
+                # Load model if not in memory
+                if business_type not in self.models:
+                    self._load_model(business_type, db_session)
+                
+                # Nearby points scored with the same model share a cached result
+                model_version = self.models[business_type]['model_id'] if business_type in self.models else 'rule_based'
+                cache_key = score_cache.make_key(lat, lng, business_type, radius, model_version)
+                item = {'lat': lat, 'lng': lng, 'business_type': business_type,
+                        'cache_key': cache_key, 'features': None, 'result': None}
+                cached = score_cache.get(cache_key)
+                if cached is not None:
+                    item['result'] = {**cached, 'cached': True}
+                else:
+                    # Generate features
+                    item['features'] = self.feature_engineer.create_location_features(
+                        lat, lng, business_type, radius=radius, db_session=db_session
+                    )
+                prepared.append(item)
+        finally:
+            db_session.close()
+        
+        return prepared
+    
+    def score_prepared(self, prepared: List[Dict]) -> List[Dict]:
+        """Scores for prepared requests; pending ones of each business type share one model call"""
+        results = [item['result'] for item in prepared]
+        pending = defaultdict(list)
+        for i, item in enumerate(prepared):
+            if item['result'] is None:
+                pending[item['business_type']].append(i)
+        
+        for business_type, indexes in pending.items():
+            if business_type not in self.models:
+                # Fallback to rule-based scoring
+                for i in indexes:
+                    results[i] = self._rule_based_scoring(prepared[i]['features'])
+                    score_cache.set(prepared[i]['cache_key'], results[i])
+                continue
+            
+            # ML prediction: one feature matrix and model call per business type
+            model_data = self.models[business_type]
+            X = model_data['schema'].matrix([prepared[i]['features'] for i in indexes])
+            raw_scores = self._predict_raw(model_data, X)
+            
+            for i, raw_score in zip(indexes, raw_scores):
+                item = prepared[i]
+                results[i] = self._build_prediction(
+                    item['lat'], item['lng'], business_type, item['features'], float(raw_score), model_data
+                )
+                score_cache.set(item['cache_key'], results[i])
+        
+        return results
+    
+    def _build_prediction(self, lat: float, lng: float, business_type: str, features: Dict,
+                          raw_score: float, model_data: Dict) -> Dict:
+        """Insights, component scores and persisted Analysis record for one model score"""
         # Convert to 0-10 scale and add additional insights
         normalized_score = max(0, min(10, raw_score))
         
         # Generate insights
         insights = self._generate_insights(features, normalized_score, business_type)
         
-        # Create analysis record
-        analysis = Analysis(
-            location_name=f"Location ({lat:.4f}, {lng:.4f})",
-            geom=f"POINT({lng} {lat})",
-            business_type=business_type,
-            overall_score=normalized_score,
-            confidence_score=0.85,  # Placeholder
-            competition_score=self._calculate_component_score(features, 'competition'),
-            foot_traffic_score=self._calculate_component_score(features, 'traffic'),
-            accessibility_score=features.get('accessibility_score', 0.5) * 10,
-            demographic_score=self._calculate_component_score(features, 'demographic'),
-            environmental_score=self._calculate_component_score(features, 'environmental'),
-            key_insights=insights['key_points'],
-            recommendations=insights['recommendations'],
-            risk_factors=insights['risks'],
-            opportunities=insights['opportunities'],
-            businesses_analyzed=features.get('total_businesses', 0),
-            analysis_version="v1.0"
-        )
+        component_scores = {
+            'competition': self._calculate_component_score(features, 'competition'),
+            'foot_traffic': self._calculate_component_score(features, 'traffic'),
+            'accessibility': features.get('accessibility_score', 0.5) * 10,
+            'demographic': self._calculate_component_score(features, 'demographic'),
+            'environmental': self._calculate_component_score(features, 'environmental')
+        }
         
-        db_session.add(analysis)
-        db_session.commit()
-        analysis_id = analysis.id
-        db_session.close()
+        # Persist analysis record via the write-behind buffer (ID is pre-allocated)
+        analysis_id = analysis_writer.submit({
+            'location_name': f"Location ({lat:.4f}, {lng:.4f})",
+            'geom': f"SRID=4326;POINT({lng} {lat})",
+            'business_type': BusinessType(business_type),
+            'overall_score': float(normalized_score),
+            'confidence_score': 0.85,  # Placeholder
+            'competition_score': component_scores['competition'],
+            'foot_traffic_score': component_scores['foot_traffic'],
+            'accessibility_score': component_scores['accessibility'],
+            'demographic_score': component_scores['demographic'],
+            'environmental_score': component_scores['environmental'],
+            'key_insights': insights['key_points'],
+            'recommendations': insights['recommendations'],
+            'risk_factors': insights['risks'],
+            'opportunities': insights['opportunities'],
+            'businesses_analyzed': features.get('total_businesses', 0),
+            'analysis_version': "v1.0"
+        })
         
         return {
             'overall_score': normalized_score,
             'confidence': 0.85,
             'analysis_id': analysis_id,
-            'component_scores': {
-                'competition': analysis.competition_score,
-                'foot_traffic': analysis.foot_traffic_score,
-                'accessibility': analysis.accessibility_score,
-                'demographic': analysis.demographic_score,
-                'environmental': analysis.environmental_score
-            },
+            'component_scores': component_scores,
             'insights': insights,
-            'feature_importance': self._get_feature_importance_for_prediction(model_data['model'], feature_names),
+            'feature_importance': self._get_feature_importance_for_prediction(model_data['model'], model_data['feature_names']),
             'raw_features': features
         }
     
-    def _prepare_training_data(self, business_type: str, region_id: Optional[int], db_session) -> Tuple[pd.DataFrame, pd.Series]:
-        """Prepare training data from existing businesses"""
-        
-        # Get businesses of the specified type
-        query = db_session.query(Business).filter(
-            Business.business_type == business_type,
-            Business.rating.isnot(None),
-            Business.review_count > 5,  # Minimum review threshold
-            Business.is_active == True
-        )
+    def score_locations(self, points: List[Tuple[float, float]], business_type: str,
+                        radius: int = 500) -> np.ndarray:
+        """
+        Batch-score N points with the active model (scores only, nothing persisted)
         
-        if region_id:
-            query = query.filter(Business.region_id == region_id)
+        Builds one (N, F) matrix and calls the model once. Returns NaN scores when
+        no trained model exists for the business type.
+        """
+        db_session = SessionLocal()
+        try:
+            if business_type not in self.models:
+                self._load_model(business_type, db_session)
+            if business_type not in self.models:
+                return np.full(len(points), np.nan)
+            
+            model_data = self.models[business_type]
+            X = self.feature_engineer.create_location_feature_matrix(
+                points, business_type, model_data['schema'], radius=radius, db_session=db_session
+            )
+        finally:
+            db_session.close()
         
-        businesses = query.all()
+        return np.clip(self._predict_raw(model_data, X), 0, 10)
+    
+    def _compile(self, model, schema: FeatureSchema):
+        """Array-level predictor for the model (None: use model.predict)"""
+        if not settings.COMPILED_INFERENCE:
+            return None
+        return compile_model(model, len(schema))
+    
+    def _predict_raw(self, model_data: Dict, X: np.ndarray) -> np.ndarray:
+        """Run the model on an (N, F) matrix in schema order"""
+        predict = model_data.get('predict')
+        if predict is not None:
+            return predict(X)
+        model = model_data['model']
+        # Models fitted on DataFrames before the schema change validate column
+        # names; LightGBM reports names for array fits too but never checks them
+        if not isinstance(model, lgb.LGBMModel) and getattr(model, 'feature_names_in_', None) is not None:
+            return model.predict(pd.DataFrame(X, columns=model_data['feature_names']))
+        return model.predict(X)
+    
+    def _prepare_training_data(self, business_type: str, region_id: Optional[int],
+                               db_session) -> Tuple[np.ndarray, np.ndarray, StreamingColumnStats]:
+        """Stream existing businesses into LOCATION_FEATURE_SCHEMA training arrays"""
+        builder = TrainingSetBuilder(
+            self.feature_engineer, self._calculate_success_score,
+            chunk_size=settings.TRAINING_CHUNK_SIZE
+        )
         
-        if len(businesses) < 50:
+        if builder.count(business_type, region_id, db_session) < 50:
             raise ValueError(f"Insufficient training data for {business_type}")
         
-        # Generate features for each business
-        X_data = []
-        y_data = []
-        
-        for business in businesses:
-            if not business.geom:
-                continue
-                
-            # Extract coordinates from geometry
-            coord_query = text(
-                "SELECT ST_Y(geom) as lat, ST_X(geom) as lng FROM businesses WHERE id = :business_id"
-            )
-            coords = db_session.execute(coord_query, {"business_id": business.id}).first()
-            
-            if not coords:
-                continue
-            
-            # Generate features
-            features = self.feature_engineer.create_location_features(
-                coords.lat, coords.lng, business_type, db_session=db_session
-            )
-            
-            # Add business-specific features
-            features['actual_rating'] = business.rating
-            features['actual_review_count'] = business.review_count
-            features['price_level'] = business.price_level or 2
-            
-            # Create success target variable
-            # Combine rating and review count for success metric
-            success_score = self._calculate_success_score(business.rating, business.review_count)
-            
-            X_data.append(features)
-            y_data.append(success_score)
-        
-        # Convert to DataFrame
-        X = pd.DataFrame(X_data)
-        y = pd.Series(y_data)
+        # Precomputed vectors (brought up to date incrementally) when the feature store is enabled
+        stored = self._load_stored_features(business_type)
         
-        # Handle missing values
-        X = X.fillna(X.median())
+        feature_session = TrainerSessionLocal()
+        try:
+            X, y, stats = builder.build(business_type, region_id, db_session, feature_session, stored)
+        finally:
+            feature_session.close()
         
-        logger.info(f"Prepared training data: {len(X)} samples, {len(X.columns)} features")
-        return X, y
+        logger.info(f"Prepared training data: {len(X)} samples, {X.shape[1]} features (schema v{FEATURE_SCHEMA_VERSION})")
+        return X, y, stats
+    
+    def _load_stored_features(self, business_type: str):
+        if not settings.FEATURE_STORE_TRAINING:
+            return None
+        try:
+            feature_store.refresh(business_type, self.feature_engineer)
+            return feature_store.load(business_type)
+        except Exception as e:
+            logger.warning(f"Feature store unavailable for {business_type}, computing features: {e}")
+            return None
     
     def _calculate_success_score(self, rating: float, review_count: int) -> float:
         """Calculate success score from rating and review count"""
@@ -794,24 +1245,31 @@ class LocationScoringModel:
     
     def _load_model(self, business_type: str, db_session):
         """Load trained model from database/file"""
-        model_record = db_session.query(MLModel).filter(
-            MLModel.model_type == "location_scoring",
-            MLModel.name.contains(business_type),
-            MLModel.is_active == True
-        ).order_by(MLModel.created_at.desc()).first()
+        model_record = self._active_model_record(business_type, db_session)
         
         if model_record and model_record.model_file_path:
             try:
                 model = joblib.load(model_record.model_file_path)
+                schema = schema_for_model(model_record.feature_names, model_record.feature_schema_version)
                 self.models[business_type] = {
                     'model': model,
+                    'model_id': model_record.id,
                     'feature_names': model_record.feature_names,
+                    'schema': schema,
+                    'predict': self._compile(model, schema),
                     'scaler': StandardScaler()  # Would load actual scaler
                 }
                 logger.info(f"Loaded model for {business_type}")
             except Exception as e:
                 logger.error(f"Failed to load model: {e}")
     
+    def _active_model_record(self, business_type: str, db_session) -> Optional[MLModel]:
+        return db_session.query(MLModel).filter(
+            MLModel.model_type == "location_scoring",
+            MLModel.name.contains(business_type),
+            MLModel.is_active == True
+        ).order_by(MLModel.created_at.desc()).first()
+    
     def _generate_insights(self, features: Dict, score: float, business_type: str) -> Dict:
         """Generate human-readable insights"""
         
@@ -912,7 +1370,7 @@ class LocationScoringModel:
         sorted_features = sorted(importance_dict.items(), key=lambda x: x[1], reverse=True)
         return dict(sorted_features[:10])
 
-# Initialize global instances
+# Initialize global instances (routes and training share one feature cache)
 feature_engineer = FeatureEngineer()
 sentiment_analyzer = SentimentAnalyzer()
-scoring_model = LocationScoringModel()
\ No newline at end of file
+scoring_model = LocationScoringModel(feature_engineer, sentiment_analyzer)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+import numpy as np
+from sklearn.neighbors import KDTree
+from sqlalchemy import text
+
+from ..config import settings
+from ..db import SessionLocal
+from .data_epoch import Epoch, data_epoch
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+
+def to_ecef(lats, lngs) -> np.ndarray:
+    """Points on a sphere of Earth's radius, in meters (Euclidean chord = exact great-circle order)"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return EARTH_RADIUS_M * np.column_stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)])
+
+def _chord_to_arc(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.clip(chord / (2 * EARTH_RADIUS_M), 0.0, 1.0))
+
+def _arc_to_chord(arc: float) -> float:
+    return 2 * EARTH_RADIUS_M * np.sin(arc / (2 * EARTH_RADIUS_M))
+
+class NearestNeighborIndex:
+    """
+    Per-category KD-trees over business locations
+
+    Answers exact nearest / k-th nearest distances and radius counts for single
+    points and batches without touching the database. Trees are rebuilt lazily
+    once business data has changed (data epoch advanced), at most every
+    `rebuild_interval` seconds; in between, the previous trees are served. A
+    failed build also waits out the interval, and queries raise until a first
+    build succeeds so callers fall back to SQL.
+    Memoized values derived from the trees must include `built_epoch()` in
+    their keys, so they are recomputed once the trees catch up.
+    """
+
+    def __init__(self, session_factory=SessionLocal, rebuild_interval: float = 60.0,
+                 leaf_size: int = 40):
+        self.session_factory = session_factory
+        self.rebuild_interval = rebuild_interval
+        self.leaf_size = leaf_size
+        self._trees: Dict[str, KDTree] = {}
+        self._built_epoch: Optional[Epoch] = None
+        self._attempted_at: Optional[float] = None  # last build attempt, successful or not
+        self._lock = threading.Lock()
+
+    def _rebuild_due(self, epoch: Epoch) -> bool:
+        if self._built_epoch == epoch:
+            return False
+        return self._attempted_at is None or time.monotonic() - self._attempted_at >= self.rebuild_interval
+
+    def _ensure_fresh(self):
+        epoch = data_epoch.current
+        if self._rebuild_due(epoch):
+            with self._lock:
+                if self._rebuild_due(epoch):
+                    # Failed attempts count too, so a broken build is not retried on every query
+                    self._attempted_at = time.monotonic()
+                    self._trees = self._build()
+                    self._built_epoch = epoch
+        if self._built_epoch is None:
+            raise RuntimeError("Nearest-neighbor index not built yet (last build failed)")
+
+    def built_epoch(self) -> Optional[Epoch]:
+        """Data epoch the served trees were built at (rebuilding first if due)"""
+        self._ensure_fresh()
+        return self._built_epoch
+
+    def _build(self) -> Dict[str, KDTree]:
+        db = self.session_factory()
+        try:
+            rows = db.execute(text("""
+                SELECT business_type, ST_Y(geom) AS lat, ST_X(geom) AS lng
+                FROM businesses
+                WHERE geom IS NOT NULL AND is_active = true
+            """)).fetchall()
+        finally:
+            db.close()
+
+        coords = defaultdict(list)
+        for row in rows:
+            # Enum labels are stored as member names ("GAS_STATION")
+            coords[str(row.business_type).lower()].append((row.lat, row.lng))
+
+        trees = {
+            category: KDTree(to_ecef(*np.asarray(points).T), leaf_size=self.leaf_size)
+            for category, points in coords.items()
+        }
+        logger.info(f"Built nearest-neighbor index: {len(rows)} businesses in {len(trees)} categories")
+        return trees
+
+    def kth_distances(self, category: str, lats, lngs, k: int = 1) -> np.ndarray:
+        """
+        (N, k) distances in meters to the 1st..k-th nearest business of `category`
+
+        Columns beyond the number of businesses in the category are inf.
+        """
+        self._ensure_fresh()
+        points = to_ecef(np.atleast_1d(lats), np.atleast_1d(lngs))
+        out = np.full((len(points), k), np.inf)
+        tree = self._trees.get(category)
+        if tree is None:
+            return out
+        available = min(k, tree.data.shape[0])
+        chord, _ = tree.query(points, k=available)
+        out[:, :available] = _chord_to_arc(chord)
+        return out
+
+    def nearest_distance(self, category: str, lat: float, lng: float) -> float:
+        return float(self.kth_distances(category, lat, lng, k=1)[0, 0])
+
+    def count_within(self, category: str, lats, lngs, radius: float) -> np.ndarray:
+        """Number of businesses of `category` within `radius` meters of each point"""
+        self._ensure_fresh()
+        points = to_ecef(np.atleast_1d(lats), np.atleast_1d(lngs))
+        tree = self._trees.get(category)
+        if tree is None:
+            return np.zeros(len(points), dtype=np.int64)
+        return tree.query_radius(points, _arc_to_chord(radius), count_only=True)
+
+    def invalidate(self):
+        """Force a rebuild on next use (e.g. after a bulk import)"""
+        with self._lock:
+            self._built_epoch = None
+            self._attempted_at = None
+
+# Global index instance (built lazily on first query)
+nearest_neighbors = NearestNeighborIndex(rebuild_interval=settings.KNN_REBUILD_MIN_INTERVAL_S)
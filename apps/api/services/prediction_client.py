@@ -0,0 +1,54 @@
+from typing import Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+class PredictionClient:
+    """
+    Thin async client for the standalone prediction server (prediction_server.py)
+
+    `url` is an HTTP base URL ("http://127.0.0.1:8100") or a Unix socket
+    ("unix:///tmp/lokascore-predict.sock"). Server errors are raised as
+    httpx.HTTPStatusError.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.timeout = timeout
+        if url.startswith("unix://"):
+            self._transport = httpx.AsyncHTTPTransport(uds=url[len("unix://"):])
+            self.base_url = "http://prediction-server"
+        else:
+            self._transport = None
+            self.base_url = url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, transport=self._transport
+            )
+        return self._client
+
+    async def score_location(self, lat: float, lng: float, business_type: str, radius: int = 500) -> Dict:
+        response = await self._http().post("/score", json={
+            "lat": lat, "lng": lng, "business_type": business_type, "radius": radius
+        })
+        response.raise_for_status()
+        return response.json()
+
+    async def analyze_sentiment(self, business_id: int) -> Dict:
+        response = await self._http().post(f"/sentiment/{business_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+# Global client instance; None runs inference inside the API process
+prediction_client: Optional[PredictionClient] = (
+    PredictionClient(settings.PREDICTION_SERVER_URL, timeout=settings.PREDICTION_SERVER_TIMEOUT_S)
+    if settings.PREDICTION_SERVER_URL else None
+)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from shapely.geometry import Point, box
+from shapely.prepared import prep
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+PLACES_MAX_RADIUS_M = 50000  # Places API nearby search limit
+
+class NearbySearchError(Exception):
+    """A nearby search failed part-way; carries the calls spent and pages already fetched"""
+
+    def __init__(self, message: str, api_calls: int = 0, places: Optional[List[Dict]] = None):
+        super().__init__(message)
+        self.api_calls = api_calls
+        self.places = places or []
+
+def _haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+@dataclass(frozen=True)
+class Tile:
+    """Lat/lng rectangle searched with the circle circumscribing it"""
+    south: float
+    west: float
+    north: float
+    east: float
+    depth: int = 0
+
+    @property
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    @property
+    def radius_m(self) -> float:
+        lat, lng = self.center
+        return _haversine_m(lat, lng, self.north, self.east)
+
+    @property
+    def min_side_m(self) -> float:
+        lat, _ = self.center
+        height = _haversine_m(self.south, self.west, self.north, self.west)
+        width = _haversine_m(lat, self.west, lat, self.east)
+        return min(height, width)
+
+    def geometry(self):
+        return box(self.west, self.south, self.east, self.north)
+
+    def children(self) -> List["Tile"]:
+        lat, lng = self.center
+        d = self.depth + 1
+        return [
+            Tile(self.south, self.west, lat, lng, d), Tile(self.south, lng, lat, self.east, d),
+            Tile(lat, self.west, self.north, lng, d), Tile(lat, lng, self.north, self.east, d),
+        ]
+
+def places_inside(region, places: List[Dict]) -> Dict[str, Dict]:
+    """Nearby-search results located inside `region` (prepared geometry), by place_id"""
+    inside = {}
+    for place in places:
+        location = place.get('geometry', {}).get('location', {})
+        place_id = place.get('place_id')
+        if place_id and 'lat' in location and region.covers(Point(location['lng'], location['lat'])):
+            inside[place_id] = place
+    return inside
+
+@dataclass
+class CrawlResult:
+    """Unique places found in a region (raw nearby-search results) and crawl statistics"""
+    places: Dict[str, Dict] = field(default_factory=dict)
+    api_calls: int = 0
+    tiles_searched: int = 0
+    tiles_split: int = 0
+    saturated_leaves: int = 0  # tiles still at the result cap at minimum size
+    failed_tiles: int = 0  # tiles whose search kept failing; coverage there is incomplete
+    max_depth: int = 0
+
+    def stats(self) -> Dict:
+        return {
+            'unique_places': len(self.places),
+            'api_calls': self.api_calls,
+            'places_per_call': round(len(self.places) / self.api_calls, 2) if self.api_calls else 0.0,
+            'tiles_searched': self.tiles_searched,
+            'tiles_split': self.tiles_split,
+            'saturated_leaves': self.saturated_leaves,
+            'failed_tiles': self.failed_tiles,
+            'max_depth': self.max_depth,
+        }
+
+class TilingCrawler:
+    """
+    Adaptive quadtree crawl of a region boundary with Places nearby search
+
+    Starts from the boundary's bounding box and searches each tile with the
+    circle that covers it. A tile whose search hits the result cap (~60) may be
+    missing places and is split into four; a tile below the cap returned every
+    match in its circle, so the crawl stops there. Sparse areas therefore cost
+    one call, dense ones are refined until results fit. Tiles outside the
+    boundary are never searched, and only places inside it are kept. A failed
+    search is retried with backoff; a tile that keeps failing is counted in
+    `failed_tiles` rather than taken as complete.
+    """
+
+    def __init__(self, scraper, result_cap: int = 60, max_depth: int = 6,
+                 min_tile_m: float = 150.0, delay: float = 0.0, retries: int = 2,
+                 retry_delay: float = 5.0):
+        self.scraper = scraper
+        self.result_cap = result_cap
+        self.max_depth = max_depth
+        self.min_tile_m = min_tile_m
+        self.delay = delay
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def can_split(self, tile: Tile) -> bool:
+        return tile.depth < self.max_depth and tile.min_side_m / 2 >= self.min_tile_m
+
+    def root_tiles(self, boundary) -> List[Tile]:
+        """Bounding box of the boundary, split until tiles fit the API's maximum radius"""
+        west, south, east, north = boundary.bounds
+        tiles = [Tile(south, west, north, east)]
+        while any(tile.radius_m > PLACES_MAX_RADIUS_M for tile in tiles):
+            tiles = [child for tile in tiles for child in tile.children()]
+        return [Tile(t.south, t.west, t.north, t.east, 0) for t in tiles]
+
+    async def search(self, query: str, tile: Tile):
+        """(places, api_calls) for one tile, retrying failed searches; raises NearbySearchError"""
+        calls = 0
+        for attempt in range(self.retries + 1):
+            try:
+                places, spent = await self.scraper._nearby_search_places(
+                    query, tile.center, int(math.ceil(tile.radius_m))
+                )
+                return places, calls + spent
+            except NearbySearchError as e:
+                calls += e.api_calls
+                if attempt == self.retries:
+                    raise NearbySearchError(str(e), calls, e.places) from e
+                logger.warning(f"Nearby search failed for '{query}' at depth {tile.depth}, retrying: {e}")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def crawl(self, boundary, query: str, result: Optional[CrawlResult] = None) -> CrawlResult:
+        """Crawl `boundary` (shapely geometry, lng/lat) for `query`; merges into `result` if given"""
+        result = result or CrawlResult()
+        region = prep(boundary)
+        queue = deque(self.root_tiles(boundary))
+
+        while queue:
+            tile = queue.popleft()
+            if not region.intersects(tile.geometry()):
+                continue
+
+            try:
+                places, calls = await self.search(query, tile)
+            except NearbySearchError as e:
+                # Keep what was fetched, but do not treat the tile as complete
+                logger.error(f"Giving up on tile at depth {tile.depth} for '{query}': {e}")
+                result.api_calls += e.api_calls
+                result.failed_tiles += 1
+                for place_id, place in places_inside(region, e.places).items():
+                    result.places.setdefault(place_id, place)
+                continue
+            result.api_calls += calls
+            result.tiles_searched += 1
+            result.max_depth = max(result.max_depth, tile.depth)
+
+            for place_id, place in places_inside(region, places).items():
+                result.places.setdefault(place_id, place)
+
+            if len(places) >= self.result_cap:
+                if self.can_split(tile):
+                    queue.extend(tile.children())
+                    result.tiles_split += 1
+                else:
+                    result.saturated_leaves += 1
+
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+        logger.info(f"Tiled crawl for '{query}': {result.stats()}")
+        return result
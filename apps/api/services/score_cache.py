@@ -0,0 +1,121 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Environmental features look up to 3x the analysis radius (parks), so a business
+# change can affect any cached score whose cell lies within that reach.
+FEATURE_REACH_FACTOR = 3
+
+class LocationScoreCache:
+    """
+    TTL + LRU cache for location scores keyed by a quantized grid cell
+
+    Keys are (cell_x, cell_y, business_type, radius, model_version). Points are
+    snapped to square cells of `cell_size_m` meters, so nudging a map pin within
+    a cell reuses the score computed for the first point in that cell.
+    """
+
+    def __init__(self, cell_size_m: float = 25.0, ttl_seconds: float = 600.0, max_entries: int = 10000):
+        self.cell_size_m = cell_size_m
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cell_for(self, lat: float, lng: float) -> Tuple[int, int]:
+        """Grid cell of a point; column width is scaled by the row's latitude"""
+        cell_y = math.floor(lat * METERS_PER_DEGREE_LAT / self.cell_size_m)
+        row_lat = (cell_y + 0.5) * self.cell_size_m / METERS_PER_DEGREE_LAT
+        meters_per_degree_lng = METERS_PER_DEGREE_LAT * math.cos(math.radians(row_lat))
+        cell_x = math.floor(lng * meters_per_degree_lng / self.cell_size_m)
+        return cell_x, cell_y
+
+    def cell_center(self, cell_x: int, cell_y: int) -> Tuple[float, float]:
+        lat = (cell_y + 0.5) * self.cell_size_m / METERS_PER_DEGREE_LAT
+        meters_per_degree_lng = METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))
+        lng = (cell_x + 0.5) * self.cell_size_m / meters_per_degree_lng
+        return lat, lng
+
+    def make_key(self, lat: float, lng: float, business_type: str, radius: int, model_version) -> Tuple:
+        cell_x, cell_y = self.cell_for(lat, lng)
+        return (cell_x, cell_y, business_type, radius, str(model_version))
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, result = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def set(self, key: Tuple, result: Dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_point(self, lat: float, lng: float) -> int:
+        """Drop cached scores whose feature reach covers a changed business at (lat, lng)"""
+        cell_half_diagonal = self.cell_size_m * math.sqrt(2) / 2
+        with self._lock:
+            stale = []
+            for key in self._entries:
+                cell_x, cell_y, _, radius, _ = key
+                center_lat, center_lng = self.cell_center(cell_x, cell_y)
+                reach = radius * FEATURE_REACH_FACTOR + cell_half_diagonal
+                if _approx_distance_m(lat, lng, center_lat, center_lng) <= reach:
+                    stale.append(key)
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached scores around ({lat}, {lng})")
+        return len(stale)
+
+    def invalidate_business_type(self, business_type: str) -> int:
+        """Drop all cached scores for a business type (e.g. a new model was activated)"""
+        with self._lock:
+            stale = [key for key in self._entries if key[2] == business_type]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+def _approx_distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Equirectangular distance; accurate to well under 1% at neighbourhood scale"""
+    mean_lat = math.radians((lat1 + lat2) / 2)
+    dx = (lng2 - lng1) * METERS_PER_DEGREE_LAT * math.cos(mean_lat)
+    dy = (lat2 - lat1) * METERS_PER_DEGREE_LAT
+    return math.hypot(dx, dy)
+
+# Global cache instance
+score_cache = LocationScoreCache(
+    cell_size_m=settings.SCORE_CACHE_CELL_M,
+    ttl_seconds=settings.SCORE_CACHE_TTL_S,
+    max_entries=settings.SCORE_CACHE_MAX_ENTRIES,
+)
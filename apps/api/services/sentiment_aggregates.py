@@ -0,0 +1,183 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from ..models import BusinessSentimentAggregate
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+# Compound scores within +-0.1 count as neutral
+NEUTRAL_BAND = 0.1
+
+# (compound, label, topics) of one processed review
+ReviewResult = Tuple[float, str, List[str]]
+
+def sentiment_label(compound: float) -> str:
+    if compound > NEUTRAL_BAND:
+        return "positive"
+    if compound < -NEUTRAL_BAND:
+        return "negative"
+    return "neutral"
+
+def sentiment_score(avg_sentiment: float, distribution: Dict, total_reviews: int) -> float:
+    """Calculate overall sentiment score (0-10 scale)"""
+    if total_reviews == 0:
+        return 5.0  # Neutral default
+    
+    # Base score from average sentiment (-1 to 1 -> 0 to 10)
+    base_score = (avg_sentiment + 1) * 5
+    
+    # Adjust for review volume (more reviews = more reliable)
+    confidence_multiplier = min(total_reviews / 20, 1.0)  # Max confidence at 20+ reviews
+    
+    # Adjust for distribution balance
+    pos_ratio = distribution['positive'] / total_reviews
+    neg_ratio = distribution['negative'] / total_reviews
+    
+    if pos_ratio > 0.7:  # Overwhelmingly positive
+        adjustment = 0.5
+    elif neg_ratio > 0.5:  # Mostly negative
+        adjustment = -0.5
+    else:
+        adjustment = 0
+    
+    final_score = base_score + (adjustment * confidence_multiplier)
+    return max(0, min(10, final_score))  # Clamp to 0-10
+
+def summarize(review_count: int, sentiment_sum: float, positive: int, negative: int, neutral: int,
+              topic_counts: Optional[Dict[str, int]], top_n: int = 10) -> Dict:
+    """Sentiment summary (the /ml/analyze-sentiment shape) from aggregate totals"""
+    avg_sentiment = sentiment_sum / review_count if review_count else 0.0
+    distribution = {'positive': positive, 'negative': negative, 'neutral': neutral}
+    return {
+        'avg_sentiment': avg_sentiment,
+        'sentiment_distribution': distribution,
+        'total_reviews_analyzed': review_count,
+        'top_topics': dict(Counter(topic_counts or {}).most_common(top_n)),
+        'sentiment_score': sentiment_score(avg_sentiment, distribution, review_count)
+    }
+
+def add_review_results(db_session, results: Dict[int, List[ReviewResult]]):
+    """
+    Fold newly processed reviews into their businesses' running aggregates
+
+    Rows are created on first use and locked for the update, so concurrent
+    processors of the same business add up instead of overwriting each other.
+    Runs in the caller's transaction.
+    """
+    if not results:
+        return
+    business_ids = sorted(results)
+    db_session.execute(
+        insert(BusinessSentimentAggregate)
+        .values([{'business_id': business_id, 'topic_counts': {}} for business_id in business_ids])
+        .on_conflict_do_nothing(index_elements=['business_id'])
+    )
+    aggregates = db_session.execute(
+        select(BusinessSentimentAggregate)
+        .where(BusinessSentimentAggregate.business_id.in_(business_ids))
+        .order_by(BusinessSentimentAggregate.business_id)
+        .with_for_update()
+    ).scalars()
+
+    for aggregate in aggregates:
+        topic_counts = Counter(aggregate.topic_counts or {})
+        for compound, label, topics in results[aggregate.business_id]:
+            aggregate.review_count += 1
+            aggregate.sentiment_sum += compound
+            if label == "positive":
+                aggregate.positive_count += 1
+            elif label == "negative":
+                aggregate.negative_count += 1
+            else:
+                aggregate.neutral_count += 1
+            topic_counts.update(topics)
+        # Reassign so the JSON column is flagged as changed
+        aggregate.topic_counts = dict(topic_counts)
+
+def load_aggregates(db_session, business_ids: Iterable[int]) -> Dict[int, BusinessSentimentAggregate]:
+    rows = db_session.execute(
+        select(BusinessSentimentAggregate)
+        .where(BusinessSentimentAggregate.business_id.in_(list(business_ids)))
+    ).scalars()
+    return {row.business_id: row for row in rows}
+
+_ROLLUP_SQL = """
+    WITH scoped AS (
+        SELECT b.business_type, a.review_count, a.sentiment_sum,
+               a.positive_count, a.negative_count, a.neutral_count, a.topic_counts
+        FROM business_sentiment_aggregates a
+        JOIN businesses b ON b.id = a.business_id
+        WHERE b.is_active = true AND a.review_count > 0 AND {scope}
+    )
+    SELECT business_type, NULL AS topic, count(*) AS businesses,
+           sum(review_count) AS review_count, sum(sentiment_sum) AS sentiment_sum,
+           sum(positive_count) AS positive, sum(negative_count) AS negative, sum(neutral_count) AS neutral
+    FROM scoped
+    GROUP BY business_type
+    UNION ALL
+    SELECT business_type, t.key AS topic, NULL, sum(t.value::int), NULL, NULL, NULL, NULL
+    FROM scoped, json_each_text(scoped.topic_counts) AS t
+    GROUP BY business_type, t.key
+"""
+
+def sentiment_rollup(db_session, region_id: Optional[int] = None, lat: Optional[float] = None,
+                     lng: Optional[float] = None, radius: Optional[float] = None) -> Dict:
+    """
+    Review sentiment across a region or a radius, overall and per business type
+
+    Sums the per-business aggregates in one grouped query (totals and topic
+    counts per business type), so the cost follows the number of businesses in
+    scope, not their reviews. Only processed reviews are included.
+    """
+    if region_id is not None:
+        scope, params = "b.region_id = :region_id", {"region_id": region_id}
+    else:
+        # Bounding-box test first so the geometry index is used
+        scope = (
+            "b.geom && ST_Expand(ST_SetSRID(ST_MakePoint(:lng, :lat), 4326), :radius_deg) "
+            "AND ST_DWithin(b.geom::geography, ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography, :radius)"
+        )
+        radius_deg = radius / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        params = {"lat": lat, "lng": lng, "radius": radius, "radius_deg": radius_deg}
+    rows = db_session.execute(text(_ROLLUP_SQL.format(scope=scope)), params).fetchall()
+
+    totals = {}
+    topics: Dict[str, Counter] = {}
+    for row in rows:
+        # Enum labels are stored as member names ("GAS_STATION")
+        business_type = str(row.business_type).lower()
+        if row.topic is None:
+            totals[business_type] = row
+        else:
+            # Topic rows carry the topic's count in the review_count column
+            topics.setdefault(business_type, Counter())[row.topic] += int(row.review_count)
+
+    by_type = {}
+    overall = Counter()
+    overall_topics = Counter()
+    for business_type, row in totals.items():
+        counts = {
+            'review_count': int(row.review_count), 'sentiment_sum': float(row.sentiment_sum),
+            'positive': int(row.positive), 'negative': int(row.negative), 'neutral': int(row.neutral),
+        }
+        type_topics = topics.get(business_type, Counter())
+        by_type[business_type] = {
+            'businesses_analyzed': int(row.businesses),
+            **summarize(topic_counts=type_topics, **counts)
+        }
+        overall.update(counts)
+        overall['businesses'] += int(row.businesses)
+        overall_topics.update(type_topics)
+
+    return {
+        'businesses_analyzed': overall['businesses'],
+        **summarize(
+            overall['review_count'], overall['sentiment_sum'],
+            overall['positive'], overall['negative'], overall['neutral'], overall_topics
+        ),
+        'by_business_type': by_type
+    }
@@ -0,0 +1,189 @@
+import logging
+import math
+import os
+import re
+from typing import Dict, List, Optional
+
+import joblib
+import nltk
+from nltk.sentiment import SentimentIntensityAnalyzer
+from textblob import TextBlob
+from langdetect import DetectorFactory, LangDetectException, detect
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+TURKISH_SENTIMENT_MODEL = "savasy/bert-base-turkish-sentiment-cased"
+SENTIMENT_BACKENDS = ('bert', 'bert_int8', 'linear', 'lexicon')
+
+# Polarity weights for common review words; stems match inflected forms ("lezzetliydi")
+TURKISH_LEXICON = {
+    'lezzetli': 2.0, 'harika': 2.5, 'mükemmel': 3.0, 'muhteşem': 3.0, 'güzel': 1.5,
+    'iyi': 1.0, 'temiz': 1.5, 'bakımlı': 1.0, 'güler yüzlü': 2.0, 'ilgili': 1.0,
+    'hızlı': 1.0, 'uygun': 1.0, 'ekonomik': 1.0, 'rahat': 1.0, 'tavsiye': 1.5,
+    'başarılı': 1.5, 'keyifli': 1.5, 'memnun': 1.5, 'süper': 2.0, 'şahane': 2.5,
+    'berbat': -3.0, 'kötü': -2.0, 'rezalet': -3.0, 'iğrenç': -3.0, 'pis': -2.0,
+    'kirli': -2.0, 'pahalı': -1.5, 'yavaş': -1.0, 'soğuk': -1.0, 'ilgisiz': -1.5,
+    'kaba': -2.0, 'bayat': -2.0, 'tatsız': -1.5, 'bekletme': -1.0, 'geç': -0.5,
+    'şikayet': -1.5, 'hayal kırıklığı': -2.5, 'memnun değil': -1.5, 'tavsiye etmem': -3.0,
+}
+NEGATIONS = ('değil', 'değildi', 'yok', 'hiç')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_STARS_RE = re.compile(r"^(\d)\s*stars?$")
+
+# langdetect is randomized; seed it so a review always routes the same way
+DetectorFactory.seed = 0
+
+def detect_language(text: str) -> str:
+    """ISO 639-1 code of a review ("tr", "en", "de", ...), or "unknown" """
+    try:
+        return detect(text)
+    except LangDetectException:
+        return 'unknown'
+
+def _scores(compound: float) -> Dict[str, float]:
+    """compound / pos / neu / neg dict in the shape VADER returns"""
+    return {
+        'compound': compound,
+        'pos': max(compound, 0.0),
+        'neg': max(-compound, 0.0),
+        'neu': 1.0 if compound == 0 else 0.0,
+    }
+
+def _label_compound(label: str, score: float) -> float:
+    """Signed compound from a classifier label (positive/negative/neutral or "N stars")"""
+    label = label.lower()
+    stars = _STARS_RE.match(label)
+    if stars:
+        return (int(stars.group(1)) - 3) / 2.0
+    if label.startswith('pos'):
+        return score
+    if label.startswith('neg'):
+        return -score
+    return 0.0
+
+class TransformerSentiment:
+    """Transformer classifier (Turkish BERT by default), optionally with int8 quantized linear layers"""
+
+    def __init__(self, model_name: str = TURKISH_SENTIMENT_MODEL, quantize: bool = False,
+                 batch_size: int = 16, max_length: int = 256):
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        if quantize:
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.pipeline = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def predict(self, texts: List[str]) -> List[Dict[str, float]]:
+        outputs = self.pipeline(
+            [text[:512] for text in texts],  # BERT input limit
+            batch_size=self.batch_size, truncation=True, max_length=self.max_length
+        )
+        return [_scores(_label_compound(output['label'], output['score'])) for output in outputs]
+
+class LexiconSentiment:
+    """
+    Weighted Turkish polarity lexicon with simple negation handling
+
+    Words followed by a negation ("temiz değil") flip sign. The summed valence
+    is squashed to [-1, 1] like VADER's compound. Texts without any lexicon hit
+    score 0 (neutral).
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None, alpha: float = 15.0):
+        lexicon = lexicon or TURKISH_LEXICON
+        self.phrases = {k: v for k, v in lexicon.items() if ' ' in k}
+        self.stems = sorted(((k, v) for k, v in lexicon.items() if ' ' not in k), key=lambda kv: -len(kv[0]))
+        self.alpha = alpha
+
+    def score(self, text: str) -> float:
+        text = text.lower()
+        total = 0.0
+        for phrase, weight in self.phrases.items():
+            if phrase in text:
+                total += weight
+                text = text.replace(phrase, ' ')
+        words = _WORD_RE.findall(text)
+        for i, word in enumerate(words):
+            for stem, weight in self.stems:
+                if word.startswith(stem):
+                    negated = i + 1 < len(words) and words[i + 1] in NEGATIONS
+                    total += -weight if negated else weight
+                    break
+        return total / math.sqrt(total * total + self.alpha) if total else 0.0
+
+    def predict(self, texts: List[str]) -> List[Dict[str, float]]:
+        return [_scores(self.score(text)) for text in texts]
+
+class LinearSentiment:
+    """
+    TF-IDF (character n-grams) + logistic regression trained on labeled reviews
+
+    Trained with scripts/benchmark_sentiment.py --fit-linear; compound is
+    P(positive) - P(negative).
+    """
+
+    def __init__(self, path: str):
+        bundle = joblib.load(path)
+        self.pipeline = bundle['pipeline']
+        self.classes = list(self.pipeline.classes_)
+
+    @staticmethod
+    def fit(texts: List[str], labels: List[int]):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+
+        pipeline = make_pipeline(
+            TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), min_df=2, sublinear_tf=True),
+            LogisticRegression(max_iter=1000, class_weight='balanced')
+        )
+        pipeline.fit(texts, labels)
+        return pipeline
+
+    @staticmethod
+    def save(pipeline, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump({'pipeline': pipeline}, path)
+
+    def predict(self, texts: List[str]) -> List[Dict[str, float]]:
+        probabilities = self.pipeline.predict_proba(texts)
+        pos = self.classes.index(1) if 1 in self.classes else None
+        neg = self.classes.index(-1) if -1 in self.classes else None
+        return [
+            _scores(float((row[pos] if pos is not None else 0.0) - (row[neg] if neg is not None else 0.0)))
+            for row in probabilities
+        ]
+
+class VaderSentiment:
+    """NLTK VADER (English lexicon and rules)"""
+
+    def __init__(self):
+        nltk.download('vader_lexicon', quiet=True)
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def predict(self, texts: List[str]) -> List[Dict[str, float]]:
+        return [self.analyzer.polarity_scores(text) for text in texts]
+
+class TextBlobSentiment:
+    """TextBlob pattern polarity; last-resort fallback"""
+
+    def predict(self, texts: List[str]) -> List[Dict[str, float]]:
+        return [_scores(TextBlob(text).sentiment.polarity) for text in texts]
+
+def load_backend(name: str):
+    """Instantiate a sentiment backend by name (see SENTIMENT_BACKENDS)"""
+    if name == 'bert':
+        return TransformerSentiment(batch_size=settings.SENTIMENT_BATCH_SIZE)
+    if name == 'bert_int8':
+        return TransformerSentiment(quantize=True, batch_size=settings.SENTIMENT_BATCH_SIZE)
+    if name == 'linear':
+        return LinearSentiment(settings.SENTIMENT_LINEAR_MODEL_PATH)
+    if name == 'lexicon':
+        return LexiconSentiment()
+    raise ValueError(f"Unknown sentiment backend: {name} (expected one of {', '.join(SENTIMENT_BACKENDS)})")
@@ -0,0 +1,189 @@
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, func
+
+from ..models import Business, BusinessType
+from .feature_schema import FeatureSchema, LOCATION_FEATURE_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+class StreamingColumnStats:
+    """
+    Per-column count, mean, std, min/max and median over streamed chunks
+
+    Mean and variance are exact (chunked Welford merge); medians come from a
+    fixed-size uniform reservoir per column, so memory is bounded by
+    `reservoir_size` rows no matter how many rows pass through.
+    """
+
+    def __init__(self, n_columns: int, reservoir_size: int = 10000, seed: int = 42):
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self._m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.reservoir = np.empty((reservoir_size, n_columns))
+        self._filled = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: np.ndarray):
+        k = len(chunk)
+        if k == 0:
+            return
+        chunk_mean = chunk.mean(axis=0)
+        chunk_m2 = ((chunk - chunk_mean) ** 2).sum(axis=0)
+        total = self.count + k
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * k / total
+        self._m2 = self._m2 + chunk_m2 + delta ** 2 * self.count * k / total
+        self.min = np.minimum(self.min, chunk.min(axis=0))
+        self.max = np.maximum(self.max, chunk.max(axis=0))
+
+        # Reservoir sampling (algorithm R), vectorized over the chunk
+        size = len(self.reservoir)
+        seen = self.count + np.arange(1, k + 1)
+        free = min(max(size - self._filled, 0), k)
+        if free:
+            self.reservoir[self._filled:self._filled + free] = chunk[:free]
+            self._filled += free
+        if free < k:
+            slots = (self._rng.random(k - free) * seen[free:]).astype(np.int64)
+            hit = slots < size
+            self.reservoir[slots[hit]] = chunk[free:][hit]
+        self.count = total
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self._m2 / self.count) if self.count else np.zeros_like(self.mean)
+
+    @property
+    def median(self) -> np.ndarray:
+        if not self._filled:
+            return np.zeros_like(self.mean)
+        return np.median(self.reservoir[:self._filled], axis=0)
+
+    def to_dict(self, columns) -> Dict[str, Dict[str, float]]:
+        """JSON-friendly per-column summary (stored with trained models)"""
+        median, std = self.median, self.std
+        return {
+            name: {
+                'mean': float(self.mean[i]), 'std': float(std[i]), 'median': float(median[i]),
+                'min': float(self.min[i]), 'max': float(self.max[i]),
+            }
+            for i, name in enumerate(columns)
+        }
+
+class TrainingSetBuilder:
+    """
+    Builds (X, y) for a business type without materializing ORM objects
+
+    Businesses are streamed from a server-side cursor in `chunk_size` batches;
+    each chunk's features are taken from the feature store when available or
+    computed as one matrix, and written into a preallocated array sized from a
+    COUNT query. Peak memory is the output arrays plus one chunk.
+    """
+
+    def __init__(self, feature_engineer, target_fn: Callable[[float, int], float],
+                 schema: FeatureSchema = LOCATION_FEATURE_SCHEMA, chunk_size: int = 500):
+        self.feature_engineer = feature_engineer
+        self.target_fn = target_fn
+        self.schema = schema
+        self.chunk_size = chunk_size
+
+    def _filters(self, business_type: str, region_id: Optional[int], updated_since: Optional[datetime] = None):
+        filters = [
+            Business.business_type == BusinessType(business_type),
+            Business.rating.isnot(None),
+            Business.review_count > 5,  # Minimum review threshold
+            Business.is_active == True,
+            Business.geom.isnot(None),
+        ]
+        if region_id:
+            filters.append(Business.region_id == region_id)
+        if updated_since is not None:
+            filters.append(Business.updated_at > updated_since)
+        return filters
+
+    def count(self, business_type: str, region_id: Optional[int], db_session,
+              updated_since: Optional[datetime] = None) -> int:
+        return db_session.execute(
+            select(func.count(Business.id)).where(*self._filters(business_type, region_id, updated_since))
+        ).scalar()
+
+    def build(self, business_type: str, region_id: Optional[int], stream_session, feature_session,
+              stored=None, updated_since: Optional[datetime] = None
+              ) -> Tuple[np.ndarray, np.ndarray, StreamingColumnStats]:
+        """
+        Stream businesses through `stream_session`; compute features on `feature_session`
+
+        Separate sessions keep feature queries (and their rollbacks on fallback)
+        off the connection holding the open server-side cursor. With
+        `updated_since`, only businesses changed after that time are included.
+        """
+        expected = self.count(business_type, region_id, stream_session, updated_since)
+        X = np.empty((expected, len(self.schema)), dtype=np.float64)
+        y = np.empty(expected, dtype=np.float64)
+        stats = StreamingColumnStats(len(self.schema))
+        filled = 0
+        from_store = 0
+
+        query = (
+            select(Business.id, Business.rating, Business.review_count,
+                   func.ST_Y(Business.geom).label('lat'), func.ST_X(Business.geom).label('lng'))
+            .where(*self._filters(business_type, region_id, updated_since))
+            .order_by(Business.id)
+            .execution_options(yield_per=self.chunk_size)
+        )
+        result = stream_session.execute(query)
+
+        for chunk in result.partitions():
+            chunk_X = np.empty((len(chunk), len(self.schema)), dtype=np.float64)
+            missing = np.ones(len(chunk), dtype=bool)
+            if stored is not None:
+                positions = stored.rows_for([row.id for row in chunk])
+                missing = positions < 0
+                found = ~missing
+                chunk_X[found] = stored.matrix[positions[found]]
+                from_store += int(found.sum())
+            if missing.any():
+                points = [(row.lat, row.lng) for row, m in zip(chunk, missing) if m]
+                chunk_X[missing] = self.feature_engineer.create_location_feature_matrix(
+                    points, business_type, self.schema, db_session=feature_session
+                )
+
+            # Rows inserted after the COUNT: grow instead of failing
+            end = filled + len(chunk)
+            if end > len(X):
+                capacity = max(end, 2 * len(X))
+                X = np.resize(X, (capacity, X.shape[1]))
+                y = np.resize(y, capacity)
+
+            X[filled:end] = chunk_X
+            y[filled:end] = [self.target_fn(row.rating, row.review_count) for row in chunk]
+            stats.update(chunk_X)
+            filled = end
+
+        logger.info(
+            f"Streamed training set for {business_type}: {filled} rows "
+            f"({from_store} from feature store), chunk size {self.chunk_size}"
+        )
+        return X[:filled], y[:filled], stats
+
+def feature_drift(baseline: Dict[str, Dict[str, float]], stats: StreamingColumnStats, columns,
+                  ignore=()) -> float:
+    """
+    Mean standardized shift of column means relative to a stored training baseline
+
+    |mean_new - mean_old| / std_old per column (capped at 10), averaged over
+    columns that varied in the baseline.
+    """
+    shifts = []
+    for i, name in enumerate(columns):
+        base = baseline.get(name)
+        if name in ignore or not base or base['std'] <= 0:
+            continue
+        shifts.append(min(abs(stats.mean[i] - base['mean']) / base['std'], 10.0))
+    return float(np.mean(shifts)) if shifts else 0.0
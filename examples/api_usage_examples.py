@@ -51,6 +51,18 @@ class LOKASCOREClient:
         response = self.session.get(f"{self.base_url}/analyze/basic", params=params)
         return response.json()
     
+    def ring_category_matrix(self, lat: float, lng: float,
+                             rings: List[int], categories: List[str]) -> Dict:
+        """Birden fazla halka ve kategori için tek çağrıda sayım matrisi"""
+        params = {
+            'lat': lat,
+            'lng': lng,
+            'rings': rings,
+            'categories': categories
+        }
+        response = self.session.get(f"{self.base_url}/analyze/matrix", params=params)
+        return response.json()
+    
     # AI/ML Analiz Endpoint'leri
     def ai_location_analysis(self, lat: float, lng: float, 
                            business_type: str, radius: int = 500,
@@ -105,6 +105,42 @@ class APITester:
             self.log_test("Basic Analysis", False, f"Request error: {str(e)}")
             return False
     
+    def test_ring_category_matrix(self) -> bool:
+        """Halka × kategori sayım matrisi testi"""
+        try:
+            params = {
+                'lat': 36.8851,
+                'lng': 30.7056,
+                'rings': [250, 500, 1000],
+                'categories': ['cafe', 'school', 'park']
+            }
+            
+            response = self.session.get(f"{self.base_url}/analyze/matrix",
+                                      params=params, timeout=15)
+            
+            if response.status_code == 200:
+                data = response.json()
+                counts = data.get('counts', {})
+                expected_cells = [(str(r), c) for r in params['rings'] for c in params['categories']]
+                missing = [f"{r}/{c}" for r, c in expected_cells if c not in counts.get(r, {})]
+                
+                if not missing:
+                    self.log_test("Ring × Category Matrix", True, 
+                                f"{len(expected_cells)} cells, cafe@500m: {counts['500']['cafe']}")
+                    return True
+                else:
+                    self.log_test("Ring × Category Matrix", False, 
+                                f"Missing cells: {missing}")
+                    return False
+            else:
+                self.log_test("Ring × Category Matrix", False, 
+                            f"HTTP {response.status_code}: {response.text}")
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_test("Ring × Category Matrix", False, f"Request error: {str(e)}")
+            return False
+    
     def test_ml_analyze_location(self) -> bool:
         """ML konum analizi testi"""
         try:
@@ -316,6 +352,7 @@ class APITester:
             ("API Erişimi", self.test_health_check),
             ("Ana Sayfa", self.test_root_endpoint),
             ("Temel Analiz", self.test_basic_analyze),
+            ("Halka × Kategori Matrisi", self.test_ring_category_matrix),
             ("ML Lokasyon Analizi", self.test_ml_analyze_location),
             ("Lokasyon Özellikleri", self.test_get_location_features),
             ("Scraping İstatistikleri", self.test_scraping_stats),